@@ -0,0 +1,96 @@
+"""
+Queries-per-second of the old connect-per-query pattern vs the pooled Database.
+
+Run from the repository root:
+    python -m benchmarks.bench_database [--queries 2000] [--concurrency 20]
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import aiosqlite
+
+from utils.database import Database
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kos (
+    username TEXT PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    reason TEXT NOT NULL
+);
+"""
+
+
+async def seed(path: str, rows: int):
+    async with aiosqlite.connect(path) as conn:
+        await conn.execute(SCHEMA)
+        await conn.executemany(
+            "INSERT OR REPLACE INTO kos (username, timestamp, message_id, reason) VALUES (?, ?, ?, ?)",
+            ((f"player{i}", 1700000000 + i, i, "benchmark") for i in range(rows))
+        )
+        await conn.commit()
+
+
+async def workload(n: int, concurrency: int, rows: int, lookup, write):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with sem:
+            if i % 10 == 0:
+                await write(f"bench{i}", i)
+            else:
+                await lookup(f"PLAYER{random.randrange(rows)}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return n / (time.perf_counter() - start)
+
+
+async def main(queries: int, concurrency: int, rows: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "kos.db")
+        await seed(path, rows)
+
+        async def naive_lookup(username):
+            async with aiosqlite.connect(path) as conn:
+                async with conn.execute("SELECT * FROM kos WHERE lower(username) = lower(?)", (username,)) as cursor:
+                    return await cursor.fetchone()
+
+        async def naive_write(username, i):
+            async with aiosqlite.connect(path) as conn:
+                await conn.execute("INSERT OR REPLACE INTO kos VALUES (?, ?, ?, ?)", (username, i, i, "bench"))
+                await conn.commit()
+
+        naive = await workload(queries, concurrency, rows, naive_lookup, naive_write)
+
+        database = Database()
+        pool = database[path]
+
+        async def pooled_lookup(username):
+            return await pool.fetchone("SELECT * FROM kos WHERE lower(username) = lower(?)", (username,))
+
+        async def pooled_write(username, i):
+            await pool.execute("INSERT OR REPLACE INTO kos VALUES (?, ?, ?, ?)", (username, i, i, "bench"))
+
+        await pool.open()
+        database.stats.reset()
+        pooled = await workload(queries, concurrency, rows, pooled_lookup, pooled_write)
+        stats = database.stats.snapshot()
+        await database.close()
+
+    print(f"rows={rows} queries={queries} concurrency={concurrency}")
+    print(f"connect-per-query: {naive:10.1f} qps")
+    print(f"pooled database:   {pooled:10.1f} qps  ({pooled / naive:.1f}x, avg {stats['avg_ms']} ms/query)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.queries, args.concurrency, args.rows))
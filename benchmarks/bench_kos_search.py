@@ -0,0 +1,81 @@
+"""
+Index build time and query latency of /kos search at scale.
+
+Run from the repository root:
+    python -m benchmarks.bench_kos_search [--rows 100000] [--queries 500]
+"""
+import argparse
+import asyncio
+import os
+import random
+import string
+import tempfile
+import time
+
+from utils import kos_search
+from utils.database import Database
+from utils.migrations import KOS_MIGRATIONS, migrate
+
+REASONS = [
+    "hacking with killaura", "xray mining in spawn", "griefed the base", "scammed diamonds",
+    "teaming in duels", "spawn killing new players", "alt of a banned player", "chat spam and toxicity",
+]
+
+
+def random_name(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_letters + string.digits + "_", k=rng.randint(5, 14)))
+
+
+def typo(rng: random.Random, name: str) -> str:
+    i = rng.randrange(len(name))
+    return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+async def timed(queries, fn):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        await fn(query)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def main(rows: int, queries: int):
+    rng = random.Random(1234)
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database()
+        pool = database[os.path.join(tmp, "kos.db")]
+        await migrate(pool, KOS_MIGRATIONS)
+
+        names = list({random_name(rng).lower(): None for _ in range(rows)})
+        async with pool.transaction() as tx:
+            await tx.executemany(
+                "INSERT INTO kos (username, timestamp, message_id, reason) VALUES (?, ?, ?, ?)",
+                ((name, 1700000000 + i, i, rng.choice(REASONS)) for i, name in enumerate(names))
+            )
+
+        start = time.perf_counter()
+        await kos_search.rebuild_index(pool)
+        build = time.perf_counter() - start
+
+        words = [w for reason in REASONS for w in reason.split()]
+        fts = await timed([rng.choice(words) for _ in range(queries)], lambda q: kos_search.search(pool, q))
+        fuzzy = await timed([typo(rng, rng.choice(names)) for _ in range(queries)], lambda q: kos_search.fuzzy(pool, q))
+        await database.close()
+
+    print(f"rows={len(names)} index build: {build:.2f}s")
+    for label, samples in (("full-text", fts), ("fuzzy", fuzzy)):
+        print(f"{label:>9}: p50 {percentile(samples, 50):.2f} ms  p99 {percentile(samples, 99):.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.queries))
@@ -0,0 +1,152 @@
+"""
+Resident memory of one large guild under each member cache policy in
+utils/members.py. Each policy runs in its own process, which feeds synthetic
+READY, GUILD_CREATE and (for chunking policies) GUILD_MEMBERS_CHUNK payloads
+through discord.py's ConnectionState offline. No token or network is needed.
+
+Run from the repository root:
+    python -m benchmarks.bench_members [--members 100000] [--online 0.2]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import random
+import subprocess
+import sys
+
+import discord
+from discord.state import ChunkRequest
+
+from utils.members import POLICIES, member_options
+
+GUILD_ID = 1414363675552252048
+BOT_ID = 1000
+LARGE_THRESHOLD = 250  # members the gateway includes in GUILD_CREATE itself
+CHUNK_SIZE = 1000  # members per GUILD_MEMBERS_CHUNK, like the gateway
+ROLES = 60
+CHANNELS = 120
+
+
+def rss_kib():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource  # no /proc: fall back to the peak, which is what we'd report at the end anyway
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def member_payload(user_id: int):
+    return {
+        "user": {"id": str(user_id), "username": f"member{user_id}", "global_name": f"Member {user_id}",
+                 "discriminator": "0", "avatar": f"{random.getrandbits(128):032x}"},
+        "roles": [str(GUILD_ID + 1 + random.randrange(ROLES)) for _ in range(random.randint(0, 3))],
+        "joined_at": "2025-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def presence_payload(user_id: int):
+    return {
+        "user": {"id": str(user_id)},
+        "status": "online",
+        "client_status": {"desktop": "online"},
+        "activities": [{"name": "Minecraft", "type": 0, "created_at": 1735689600000}],
+    }
+
+
+def guild_payload(members: int, presences: bool):
+    initial = [member_payload(BOT_ID)] + [member_payload(BOT_ID + 1 + i) for i in range(LARGE_THRESHOLD - 1)]
+    return {
+        "id": str(GUILD_ID),
+        "name": "Benchmark Guild",
+        "owner_id": str(BOT_ID + 1),
+        "member_count": members,
+        "large": True,
+        "features": [],
+        "emojis": [],
+        "stickers": [],
+        "verification_level": 1,
+        "roles": [
+            {"id": str(GUILD_ID + i), "name": f"role {i}", "color": 0, "hoist": False, "position": i,
+             "permissions": "0", "managed": False, "mentionable": False, "flags": 0}
+            for i in range(ROLES + 1)
+        ],
+        "channels": [
+            {"id": str(GUILD_ID + 10000 + i), "type": 0, "name": f"channel-{i}", "position": i,
+             "permission_overwrites": []}
+            for i in range(CHANNELS)
+        ],
+        "members": initial,
+        "presences": [presence_payload(BOT_ID + 1 + i) for i in range(LARGE_THRESHOLD - 1)] if presences else [],
+        "threads": [],
+    }
+
+
+async def child(policy: str, members: int, online: float):
+    random.seed(7)
+    options = member_options(policy)
+    client = discord.Client(**options)
+    state = client._connection
+    gc.collect()
+    before = rss_kib()
+
+    state.parse_ready({
+        "v": 10, "user": {"id": str(BOT_ID), "username": "bot", "discriminator": "0", "avatar": None, "bot": True},
+        "guilds": [{"id": str(GUILD_ID), "unavailable": True}], "session_id": "benchmark",
+        "application": {"id": str(BOT_ID), "flags": 0},
+    })
+    # Stand in for the gateway: take the guild straight through instead of waiting on ready timeouts.
+    state._ready_task.cancel()
+    del state._ready_state
+    chunk = state._chunk_guilds
+    state._chunk_guilds = False
+    state.parse_guild_create(guild_payload(members, options["intents"].presences))
+    guild = client.get_guild(GUILD_ID)
+
+    if chunk:
+        # The request chunk_guild would have sent; the responses are fed to it like the gateway would.
+        request = ChunkRequest(guild.id, guild.shard_id, asyncio.get_running_loop(), state._get_guild, cache=True)
+        state._chunk_requests[request.nonce] = request
+        starts = range(0, members, CHUNK_SIZE)
+        for index, start in enumerate(starts):
+            ids = range(BOT_ID + start, BOT_ID + min(start + CHUNK_SIZE, members))
+            data = {"guild_id": str(GUILD_ID), "nonce": request.nonce, "chunk_index": index,
+                    "chunk_count": len(starts), "members": [member_payload(user_id) for user_id in ids]}
+            if options["intents"].presences:
+                data["presences"] = [presence_payload(user_id) for user_id in ids if random.random() < online]
+            state.parse_guild_members_chunk(data)
+    gc.collect()
+    after = rss_kib()
+    print(json.dumps({"policy": policy, "cached": len(guild.members), "rss_kib": after, "delta_kib": after - before}))
+
+
+def main(members: int, online: float):
+    print(f"guild of {members} members, {online:.0%} online; one process per policy")
+    for policy in POLICIES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_members", "--child", policy,
+             "--members", str(members), "--online", str(online)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{policy:<8} {result['cached']:>8} members cached  RSS {result['rss_kib'] / 1024:7.1f} MiB  "
+              f"(+{result['delta_kib'] / 1024:.1f} MiB for the guild)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=100000)
+    parser.add_argument("--online", type=float, default=0.2, help="share of members with a presence when chunking")
+    parser.add_argument("--child", choices=list(POLICIES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(child(args.child, args.members, args.online))
+    else:
+        main(args.members, args.online)
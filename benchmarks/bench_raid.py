@@ -0,0 +1,88 @@
+"""
+Replays synthetic join traces through the raid detector: per-event cost, how
+quickly a raid trips the lockdown, and whether busy organic traffic does.
+
+Run from the repository root:
+    python -m benchmarks.bench_raid [--raid-joins 3000] [--raid-seconds 60]
+"""
+import argparse
+import random
+import string
+import time
+
+from utils.raid import LOCKDOWN_SCORE, RaidDetector
+
+DAY = 86400
+
+
+def organic(start: float, seconds: float, per_minute: float):
+    """Joins spread at random, real-looking names, accounts months to years old."""
+    t = start
+    while True:
+        t += random.expovariate(per_minute / 60)
+        if t >= start + seconds:
+            return
+        name = "".join(random.choices(string.ascii_lowercase, k=random.randint(4, 12)))
+        if random.random() < 0.3:
+            name += str(random.randint(1, 99))
+        created = t - random.uniform(60, 2000) * DAY
+        yield t, created, name, False
+
+
+def raid(start: float, seconds: float, joins: int):
+    """A wave of hours-old accounts sharing a few name stems with counters."""
+    stems = [random.choice(["raider", "revbot", "xxslayer", "ghost"]) for _ in range(3)]
+    for i in range(joins):
+        t = start + seconds * i / joins + random.uniform(0, 0.05)
+        name = f"{random.choice(stems)}_{random.randint(100, 99999)}"
+        created = t - random.uniform(0.1, 48) * 3600
+        yield t, created, name, True
+
+
+def replay(trace):
+    """Returns (events, seconds, first trip index or None, raid events seen before the trip, peak score)."""
+    detector = RaidDetector()
+    tripped_at = None
+    raid_seen = 0
+    start = time.perf_counter()
+    for i, (t, created, name, is_raid) in enumerate(trace):
+        score = detector.join(t, created, name)
+        raid_seen += is_raid and tripped_at is None
+        if tripped_at is None and score >= LOCKDOWN_SCORE:
+            tripped_at = i
+    elapsed = time.perf_counter() - start
+    return len(trace), elapsed, tripped_at, raid_seen, detector.peak
+
+
+def report(label: str, trace, expect_trip: bool):
+    events, elapsed, tripped_at, raid_seen, peak = replay(trace)
+    outcome = f"tripped after {raid_seen} raid joins" if tripped_at is not None and expect_trip else (
+        "tripped (false positive)" if tripped_at is not None else "no lockdown")
+    print(f"{label:<34} {events:>7} joins  {events / elapsed:>10.0f} joins/s  peak {peak:5.2f}  {outcome}")
+    return tripped_at is not None
+
+
+def main(raid_joins: int, raid_seconds: float):
+    random.seed(7)
+    hour = 3600.0
+    quiet = sorted(organic(0, hour, 2), key=lambda e: e[0])
+    busy = sorted(organic(0, hour, 20), key=lambda e: e[0])
+    attack = sorted(list(organic(0, hour, 2)) + list(raid(hour / 2, raid_seconds, raid_joins)), key=lambda e: e[0])
+    slow = sorted(list(organic(0, hour, 2)) + list(raid(hour / 2, 600, 150)), key=lambda e: e[0])
+    flood = list(raid(0, 60, 10000))
+
+    ok = True
+    ok &= not report("organic, 2 joins/min", quiet, False)
+    ok &= not report("organic event day, 20 joins/min", busy, False)
+    ok &= report(f"raid, {raid_joins} joins in {raid_seconds:.0f}s", attack, True)
+    ok &= report("slow raid, 150 joins in 10 min", slow, True)
+    ok &= report("flood, 10000 joins in 60s", flood, True)
+    print("OK" if ok else "UNEXPECTED RESULT")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--raid-joins", type=int, default=3000)
+    parser.add_argument("--raid-seconds", type=float, default=60)
+    args = parser.parse_args()
+    main(args.raid_joins, args.raid_seconds)
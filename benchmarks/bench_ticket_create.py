@@ -0,0 +1,87 @@
+"""
+Stress test for idempotent ticket creation: hundreds of concurrent "create
+ticket" clicks, split across two TicketStores on one tickets.db so both the
+in-process guards and the one-open-ticket-per-user index get exercised.
+
+Run from the repository root:
+    python -m benchmarks.bench_ticket_create [--users 50] [--clicks 8] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import tempfile
+import time
+
+from utils.database import Database
+from utils.migrations import TICKET_MIGRATIONS, migrate
+from utils.ticket_store import STATUS_OPEN, TicketStore
+
+
+async def main(users: int, clicks: int, latency: float):
+    channel_ids = itertools.count(1)
+    rest = {"created": 0, "deleted": 0}
+    answers = {"instant": 0, "linked": 0, "created": 0}
+
+    async def click(store: TicketStore, user_id: int):
+        # Mirrors TicketView.create_ticket -> open_ticket -> build_ticket.
+        await asyncio.sleep(random.random() * latency)  # clicks arrive spread out
+        if not store.reserve(user_id):
+            answers["instant"] += 1
+            return
+        async with store.creating(user_id) as existing:
+            if existing is not None:
+                answers["linked"] += 1
+                return
+            await asyncio.sleep(latency)  # create_text_channel
+            rest["created"] += 1
+            channel_id = next(channel_ids)
+            if not await store.open(channel_id, user_id, "bench", "channel"):
+                await asyncio.sleep(latency)  # channel.delete
+                rest["deleted"] += 1
+                answers["linked"] += 1
+                return
+            answers["created"] += 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tickets.db")
+        database = Database()
+        await migrate(database[path], TICKET_MIGRATIONS)
+        # A second Database stands in for a second bot process sharing the file.
+        other = Database()
+        stores = [TicketStore(), TicketStore()]
+        await stores[0].start(database[path])
+        await stores[1].start(other[path])
+
+        jobs = [click(stores[i % 2], user_id) for user_id in range(users) for i in range(clicks)]
+        random.shuffle(jobs)
+        start = time.perf_counter()
+        await asyncio.gather(*jobs)
+        elapsed = time.perf_counter() - start
+
+        rows = await database[path].fetchall(
+            "SELECT user_id, COUNT(*) FROM tickets WHERE status = ? GROUP BY user_id", (STATUS_OPEN,)
+        )
+        for store in stores:
+            await store.stop()
+        await database.close()
+        await other.close()
+
+    total = users * clicks
+    print(f"{total} clicks from {users} users in {elapsed:.2f}s")
+    print(f"tickets created: {answers['created']}, instant replies: {answers['instant']}, "
+          f"linked to existing: {answers['linked']}")
+    print(f"channel creates: {rest['created']}, duplicate channels deleted: {rest['deleted']}")
+    duplicates = [user_id for user_id, count in rows if count > 1]
+    assert len(rows) == users and not duplicates, f"users with duplicate open tickets: {duplicates}"
+    print("OK: exactly one open ticket per user")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--clicks", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated REST latency in seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.clicks, args.latency))
@@ -0,0 +1,62 @@
+"""
+Transcript archiver throughput on a synthetic ticket channel.
+
+Run from the repository root:
+    python -m benchmarks.bench_transcripts [--messages 50000] [--html]
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import tempfile
+import tracemalloc
+from types import SimpleNamespace
+
+from utils.transcripts import archive_channel
+
+AUTHORS = [SimpleNamespace(id=1000 + i, name=f"user{i}") for i in range(5)]
+CONTENT = "Hey, I still can't join the server after the update, it says my session is invalid. " * 2
+
+
+class FakeChannel:
+    """Yields synthetic messages page by page, like TextChannel.history does."""
+
+    def __init__(self, messages: int):
+        self.messages = messages
+
+    async def history(self, limit=None, oldest_first=False):
+        start = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        for page in range(0, self.messages, 100):
+            await asyncio.sleep(0)  # stand-in for the page request
+            for i in range(page, min(page + 100, self.messages)):
+                yield SimpleNamespace(
+                    id=1414000000000000000 + i,
+                    author=AUTHORS[i % len(AUTHORS)],
+                    content=f"{CONTENT} #{i}",
+                    created_at=start + datetime.timedelta(seconds=i),
+                    edited_at=None,
+                    attachments=[],
+                    embeds=[],
+                )
+
+
+async def main(messages: int, with_html: bool):
+    with tempfile.TemporaryDirectory() as tmp:
+        tracemalloc.start()
+        stats = await archive_channel(FakeChannel(messages), "ticket-bench", with_html=with_html, directory=tmp)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        html_bytes = os.path.getsize(stats["html_path"]) if stats["html_path"] else 0
+
+    print(f"messages={stats['messages']} html={with_html}")
+    print(f"throughput: {stats['rate']:.0f} msg/s ({stats['seconds']:.2f}s)")
+    print(f"transcript: {stats['bytes'] / 1024:.0f} KiB jsonl.gz" + (f", {html_bytes / 1024:.0f} KiB html.gz" if html_bytes else ""))
+    print(f"peak traced memory: {peak / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--html", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.html))
@@ -0,0 +1,75 @@
+"""
+Regression check: the kos and KOSRefresh cogs must serialise their KOS channel
+writes on one lock. Loads every extension the way main.py does (a fresh module
+per ``load_extension``), then reloads each KOS extension, and checks that both
+cogs still see the same ``KOSDB`` and lock.
+
+Run from the repository root:
+    python -m benchmarks.check_kos_extensions
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+import discord
+from discord.ext import commands
+
+from utils import kos_store
+from utils.database import db
+from utils.hot_reload import find_extensions
+from utils.migrations import KOS_MIGRATIONS, migrate
+
+EXTENSIONS = ("cogs.kos", "cogs.KOSRefresh")
+
+
+def shared_objects(bot: commands.Bot):
+    """``{extension: (KOSDB, lock)}`` as each loaded extension module sees them."""
+    found = {}
+    for name in EXTENSIONS:
+        module = bot.extensions[name]
+        if sys.modules.get(name) is not module:
+            raise SystemExit(f"FAIL: sys.modules[{name!r}] is not the loaded extension")
+        found[name] = (module.KOSDB, module.KOSDB.lock)
+    return found
+
+
+def check(bot: commands.Bot, when: str):
+    found = shared_objects(bot)
+    for name, (kosdb, lock) in found.items():
+        if kosdb is not kos_store.KOSDB or lock is not kos_store.KOSDB.lock:
+            raise SystemExit(f"FAIL ({when}): {name} uses its own KOSDB/lock")
+    print(f"ok ({when}): {', '.join(found)} share lock {id(kos_store.KOSDB.lock):#x}")
+
+
+async def run(root: str):
+    bot = commands.AutoShardedBot(command_prefix="!", intents=discord.Intents.default())  # as in main.py
+    bot.extension_state = {}
+    await migrate(db[kos_store.KOS_DATABASE], KOS_MIGRATIONS)
+    try:
+        async with bot:  # initialised as bot.run does, without logging in
+            for ext in find_extensions(os.path.join(root, "cogs"), "cogs"):
+                if ext in EXTENSIONS:
+                    await bot.load_extension(ext)
+            check(bot, "load")
+            for ext in EXTENSIONS:
+                await bot.reload_extension(ext)
+                check(bot, f"reload {ext}")
+    finally:
+        await db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # KOS_DATABASE is a relative path; keep the real kos.db out of it
+        try:
+            asyncio.run(run(root))
+        finally:
+            os.chdir(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Runs the bot as several worker processes ("clusters"), each connecting its
+own slice of the shards, so gateway decoding, embed building and SQLite work
+spread over several cores instead of sharing one GIL.
+
+    python cluster.py --clusters 4 [--shards 16]
+
+Without --shards the count Discord recommends for the token is used. Workers
+are `python main.py` with SHARD_IDS, SHARD_COUNT, CLUSTER_ID and
+CLUSTER_SOCKET set; they reach each other through the launcher's Unix socket
+(utils/ipc.py) and take a file lock around SQLite writes. A worker that exits
+is restarted with backoff. Unix only.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+import time
+
+import aiohttp
+from dotenv import load_dotenv
+
+from utils.ipc import IPCHub
+
+_log = logging.getLogger("cluster")
+
+# ---------- CONFIG ----------
+HOME_GUILD_ID = 1414363675552252048  # GUILD_ID in main.py
+SOCKET_PATH = "cluster.sock"
+RESTART_DELAY = 5.0  # seconds before restarting a worker that exited; doubles on each quick crash
+MAX_RESTART_DELAY = 300.0
+STABLE_AFTER = 600.0  # a worker up this long resets its restart delay
+STATS_LOG_INTERVAL = 60.0
+STOP_TIMEOUT = 90.0  # seconds a worker gets to flush and close before it is killed
+# ----------------------------
+
+
+async def recommended_shards(token: str) -> int:
+    async with aiohttp.ClientSession() as session:
+        async with session.get("https://discord.com/api/v10/gateway/bot",
+                               headers={"Authorization": f"Bot {token}"}) as response:
+            response.raise_for_status()
+            return (await response.json())["shards"]
+
+
+def plan(shard_count: int, clusters: int, home_shard: int):
+    """
+    Contiguous shard ranges, one per cluster, except that the home guild's
+    shard is moved into cluster 0 next to shard 0. DMs (and so the
+    verification modal) arrive on shard 0, and verification needs the home
+    guild's cache, so both must live in the same process.
+    """
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+    ranges, start = [], 0
+    for index in range(clusters):
+        count = size + (index < extra)
+        ranges.append(list(range(start, start + count)))
+        start += count
+    if home_shard not in ranges[0]:
+        owner = next(shards for shards in ranges if home_shard in shards)
+        owner.remove(home_shard)
+        if len(ranges[0]) > 1:
+            owner.append(ranges[0].pop())  # swap, keeping the clusters the same size
+            owner.sort()
+        ranges[0].append(home_shard)
+    return [shards for shards in ranges if shards]
+
+
+class Worker:
+    def __init__(self, cluster: int, shards, shard_count: int, socket_path: str):
+        self.cluster = cluster
+        self.shards = shards
+        self.env = {
+            **os.environ,
+            "SHARD_IDS": ",".join(map(str, shards)),
+            "SHARD_COUNT": str(shard_count),
+            "CLUSTER_ID": str(cluster),
+            "CLUSTER_SOCKET": os.path.abspath(socket_path),
+        }
+        self.process = None
+        self.restarts = 0
+
+    async def run(self, stopping: asyncio.Event):
+        delay = RESTART_DELAY
+        while not stopping.is_set():
+            started = time.monotonic()
+            # Own process group: a Ctrl-C in the launcher's terminal reaches workers only through stop(),
+            # so each gets one SIGINT; a second would cut its close() short.
+            self.process = await asyncio.create_subprocess_exec(sys.executable, "main.py", env=self.env,
+                                                                start_new_session=True)
+            _log.info(f"Cluster {self.cluster} started (pid {self.process.pid}, shards {self.shards})")
+            code = await self.process.wait()
+            if stopping.is_set():
+                return
+            if time.monotonic() - started >= STABLE_AFTER:
+                delay = RESTART_DELAY
+            _log.warning(f"Cluster {self.cluster} exited with {code}, restarting in {delay:.0f}s")
+            self.restarts += 1
+            try:
+                await asyncio.wait_for(stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, MAX_RESTART_DELAY)
+
+    async def stop(self):
+        """
+        SIGINT, not SIGTERM: it is what bot.run() turns into a clean close(),
+        which flushes the mod log, ticket activity and queued side effects.
+        """
+        if self.process is None or self.process.returncode is not None:
+            return
+        self.process.send_signal(signal.SIGINT)
+        try:
+            await asyncio.wait_for(self.process.wait(), STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            _log.warning(f"Cluster {self.cluster} didn't stop within {STOP_TIMEOUT:.0f}s, killing it")
+            self.process.kill()
+
+
+async def log_stats(hub: IPCHub, workers):
+    while True:
+        await asyncio.sleep(STATS_LOG_INTERVAL)
+        for worker in workers:
+            report = hub.stats.get(worker.cluster)
+            if report is None:
+                _log.info(f"Cluster {worker.cluster}: no report yet ({worker.restarts} restarts)")
+                continue
+            _log.info(f"Cluster {worker.cluster}: {report['guilds']} guilds, {report['events_per_s']} events/s, "
+                      f"latency {report['latency_ms']}, {worker.restarts} restarts, "
+                      f"report {time.time() - report['received']:.0f}s old")
+        _log.info(f"IPC: {hub.relayed} messages relayed")
+
+
+async def main(clusters: int, shards: int):
+    load_dotenv()
+    if shards is None:
+        shards = await recommended_shards(os.getenv("DISCORD_TOKEN"))
+    ranges = plan(shards, clusters, (HOME_GUILD_ID >> 22) % shards)
+    _log.info(f"{shards} shard(s) across {len(ranges)} cluster(s): {ranges}")
+
+    hub = IPCHub(SOCKET_PATH)
+    await hub.start()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    workers = [Worker(cluster, shard_ids, shards, SOCKET_PATH) for cluster, shard_ids in enumerate(ranges)]
+    runners = [asyncio.create_task(worker.run(stopping)) for worker in workers]
+    reporter = asyncio.create_task(log_stats(hub, workers))
+    await stopping.wait()
+    _log.info("Stopping clusters")
+    reporter.cancel()
+    await asyncio.gather(*(worker.stop() for worker in workers))
+    await asyncio.gather(*runners, return_exceptions=True)
+    await hub.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clusters", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shards", type=int, help="total shard count (default: Discord's recommendation)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main(args.clusters, args.shards))
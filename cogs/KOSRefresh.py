@@ -1,59 +1,281 @@
 import discord
-from discord.ext import commands
-from discord import app_commands
-import aiosqlite
+from discord.ext import commands, tasks
+import asyncio
 import datetime
-from datetime import datetime as dt
-import pytz
+import logging
+import math
+import time
 
-from cogs.kos import KOS_CHANNEL_ID
+from utils.database import db
+from utils.ipc import owns_guild
+from utils.kos_store import KOS_BOARD_MODE, KOS_DATABASE, KOSBoard, KOSDB, build_kos_embed, embed_hash
+from utils.resolver import resolver
 
 # -------- CONFIG ---------
-KOS_CHANNEL_ID = KOS_CHANNEL_ID
-TIMEZONE = pytz.timezone("America/Boise")
+KOS_GUILD_ID = 1414363675552252048  # GUILD_ID in main.py; the guild the KOS channel is in
+CHECKPOINT_EVERY = 25  # rows per transaction/checkpoint
+PROGRESS_INTERVAL = 5  # seconds between status message edits
+RECONCILE_INTERVAL_HOURS = 6  # background reconcile pass; 0 disables it
+RECONCILE_START_DELAY = datetime.timedelta(minutes=15)  # first background pass after startup
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=13, hours=23)  # Discord refuses bulk deletes past 14 days
 # -------------------------
 
+_log = logging.getLogger(__name__)
+
+
+def is_kos_post(message: discord.Message, bot_user) -> bool:
+    return (
+        message.author.id == bot_user.id
+        and bool(message.embeds)
+        and (message.embeds[0].title or "").startswith("⚔️ KOS")
+    )
+
+
 class KOSRefresher(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.lock = asyncio.Lock()  # one refresh or reconcile at a time; each also takes KOSDB.lock while it writes
+        self.resume_at = None  # next reconcile carried over a hot reload
+
+    async def cog_load(self):
+        state = self.bot.extension_state.pop(self.qualified_name, None)
+        if state:
+            # Keep holding a refresh that is still running, and don't reconcile again just because we reloaded.
+            self.lock = state["lock"]
+            self.resume_at = state["next_reconcile"]
+        if RECONCILE_INTERVAL_HOURS and owns_guild(self.bot, KOS_GUILD_ID):  # one cluster is enough
+            self.reconcile_task.change_interval(hours=RECONCILE_INTERVAL_HOURS)
+            self.reconcile_task.start()
+
+    async def cog_unload(self):
+        self.reconcile_task.cancel()
+
+    def cog_export_state(self):
+        return {"lock": self.lock, "next_reconcile": self.reconcile_task.next_iteration}
+
+    @staticmethod
+    async def _load_checkpoint():
+        return await db[KOS_DATABASE].fetchone(
+            "SELECT last_username, started_at, skipped, edited, reposted, failed FROM kos_refresh_checkpoint WHERE id = 1"
+        )
+
+    @staticmethod
+    async def _next_batch(after: str):
+        return await db[KOS_DATABASE].fetchall(
+            "SELECT username, timestamp, message_id, reason, embed_hash FROM kos "
+            "WHERE username > ? COLLATE NOCASE ORDER BY username COLLATE NOCASE LIMIT ?",
+            (after, CHECKPOINT_EVERY)
+        )
+
+    @staticmethod
+    async def _sync_entry(channel: discord.TextChannel, username, timestamp, message_id, reason, stored_hash):
+        """Bring one post up to date. Returns ``(outcome, message_id, hash)``; outcome is skipped/edited/reposted."""
+        embed = build_kos_embed(username, reason, timestamp)
+        new_hash = embed_hash(embed)
+        if message_id and stored_hash == new_hash:
+            return "skipped", message_id, new_hash
+
+        if message_id:
+            try:
+                await channel.get_partial_message(message_id).edit(embed=embed)
+                return "edited", message_id, new_hash
+            except discord.NotFound:
+                pass
+
+        msg = await channel.send(embed=embed)
+        return "reposted", msg.id, new_hash
+
+    @staticmethod
+    async def _delete_posts(channel: discord.TextChannel, messages):
+        """Delete with as few calls as possible: bulk for recent posts, one by one past the bulk-delete window."""
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        recent = [m for m in messages if m.created_at > cutoff]
+        old = [m for m in messages if m.created_at <= cutoff]
+        calls = 0
+        for i in range(0, len(recent), 100):
+            chunk = recent[i:i + 100]
+            if len(chunk) == 1:
+                old.append(chunk[0])
+                continue
+            await channel.delete_messages(chunk)
+            calls += 1
+        for message in old:
+            try:
+                await message.delete()
+            except discord.NotFound:
+                pass
+            calls += 1
+        return calls
+
+    async def reconcile(self, channel: discord.TextChannel) -> dict:
+        """
+        Make the KOS channel match kos.db using one paged history scan.
+
+        Orphaned posts (no row points at them) are bulk deleted, missing posts
+        are sent, and stale posts (embed differs from what the row renders) are
+        edited in place. API calls scale with channel pages, not with rows.
+        Callers hold ``KOSDB.lock``, so no add lands between the scan and the fixes.
+        """
+        posts = {}
+        scanned = 0
+        async for message in channel.history(limit=None):
+            scanned += 1
+            if is_kos_post(message, self.bot.user):
+                posts[message.id] = (message, embed_hash(message.embeds[0]))
+
+        stats = {"pages": max(1, math.ceil(scanned / 100)), "orphaned": 0, "missing": 0, "stale": 0, "calls": 0}
+        if KOS_BOARD_MODE:
+            board_ids = {row[0] for row in await db[KOS_DATABASE].fetchall("SELECT message_id FROM kos_board")}
+            live_hashes = {message_id: post[1] for message_id, post in posts.items() if message_id in board_ids}
+            changed = await KOSBoard.rebuild(channel, live_hashes)
+            stats["stale"] = changed
+            stats["calls"] += changed
+            for message_id in live_hashes:
+                posts.pop(message_id)
+        else:
+            await self._reconcile_entries(channel, posts, stats)
+
+        if posts:
+            stats["orphaned"] = len(posts)
+            stats["calls"] += await self._delete_posts(channel, [message for message, _ in posts.values()])
+        stats["calls"] += stats["pages"]
+        return stats
+
+    @staticmethod
+    async def _reconcile_entries(channel: discord.TextChannel, posts: dict, stats: dict):
+        """One post per entry: send missing posts and edit stale ones, consuming matched posts from ``posts``."""
+        rows = await db[KOS_DATABASE].fetchall("SELECT username, timestamp, message_id, reason FROM kos")
+        updates = []
+        for username, timestamp, message_id, reason in rows:
+            embed = build_kos_embed(username, reason, timestamp)
+            expected = embed_hash(embed)
+            post = posts.pop(message_id, None)
+            if post is None:
+                msg = await channel.send(embed=embed)
+                updates.append((msg.id, expected, username))
+                stats["missing"] += 1
+                stats["calls"] += 1
+            elif post[1] != expected:
+                await post[0].edit(embed=embed)
+                updates.append((message_id, expected, username))
+                stats["stale"] += 1
+                stats["calls"] += 1
+
+        if updates:
+            await KOSDB.set_message_ids(updates)
+
+    @tasks.loop(hours=6)
+    async def reconcile_task(self):
+        guild = resolver.guild(KOS_GUILD_ID)
+        channel = resolver.channel(guild, "kos") if guild else None
+        if not channel or self.lock.locked():
+            return
+        async with self.lock, KOSDB.lock:
+            try:
+                stats = await self.reconcile(channel)
+            except discord.HTTPException as e:
+                _log.warning(f"Background KOS reconcile failed: {e}")
+                return
+        if stats["orphaned"] or stats["missing"] or stats["stale"]:
+            _log.info(f"KOS reconcile: {stats}")
+
+    @reconcile_task.before_loop
+    async def before_reconcile(self):
+        await self.bot.wait_until_ready()
+        # A fresh start waits a while rather than scanning the whole channel on every boot.
+        await discord.utils.sleep_until(self.resume_at or discord.utils.utcnow() + RECONCILE_START_DELAY)
+
+    @commands.command(name="reconcile_kos")
+    @commands.has_permissions(administrator=True)
+    async def reconcile_kos(self, ctx: commands.Context):
+        """Fixes orphaned, missing and stale KOS posts from a single channel scan"""
+        channel = resolver.channel(ctx.guild, "kos")
+        if not channel:
+            return await ctx.channel.send("ur code is cooked buddy")
+        if self.lock.locked():
+            return await ctx.send("⏳ A KOS refresh or reconcile is already running.")
+        async with self.lock, KOSDB.lock:
+            stats = await self.reconcile(channel)
+        await ctx.send(
+            f"✅ Reconciled KOS channel ({stats['pages']} page(s), {stats['calls']} API call(s)): "
+            f"🗑️ {stats['orphaned']} orphaned, 📨 {stats['missing']} missing, ✏️ {stats['stale']} stale"
+        )
 
     @commands.command(name="refresh_kos")
     @commands.has_permissions(administrator=True)
-    async def refresh_kos(self, ctx: commands.Context):
-        """This refreshes the KOS perms"""
-        channel = ctx.guild.get_channel(KOS_CHANNEL_ID)
+    async def refresh_kos(self, ctx: commands.Context, mode: str = None):
+        """This refreshes the KOS perms (`!refresh_kos restart` ignores a saved checkpoint)"""
+        channel = resolver.channel(ctx.guild, "kos")
         if not channel:
-            await ctx.channel.send("ur code is cooked buddy")
-
-        refreshed = 0
-        failed = 0
-
-        async with aiosqlite.connect("kos.db") as db:
-            async with db.execute("SELECT username, timestamp, message_id, reason FROM kos") as cursor:
-                rows = await cursor.fetchall()
-            for username, timestamp, message_id, reason in rows:
-                try:
-                    msg = await channel.fetch_message(message_id)
-                    await msg.delete()
-                except Exception:
-                    failed += 1
-                    pass
-
-                embed = discord.Embed(
-                    title="⚔️ KOS Notice",
-                    color=discord.Colour.red()
-                )
-                embed.add_field(name="Usernames", value=username, inline=True)
-                embed.add_field(name="Reason", value=reason, inline=True)
-                embed.add_field(name="Date", value=f"<t:{timestamp}:F>", inline=True)
-                embed.set_thumbnail(url=f"https://mineskin.eu/helm/{username}/100.png")
-
-                new_msg = await channel.send(embed=embed)
-                await db.execute("UPDATE kos SET message_id = ? WHERE lower(username) = lower(?)", (new_msg.id, username,))
-                refreshed += 1
-
-            await db.commit()
-        await ctx.send(f"✅ Refresh {refreshed} KOS entries. ❌ Failed to delete {failed}")
+            return await ctx.channel.send("ur code is cooked buddy")
+        if self.lock.locked():
+            return await ctx.send("⏳ A KOS refresh or reconcile is already running.")
+        async with self.lock:
+            await self._refresh(ctx, channel, mode)
+
+    async def _refresh(self, ctx: commands.Context, channel: discord.TextChannel, mode: str):
+        if KOS_BOARD_MODE:
+            async with KOSDB.lock:
+                changed = await KOSBoard.rebuild(channel)
+            return await ctx.send(f"✅ Refreshed KOS board: ✏️ {changed} page(s) updated.")
+
+        checkpoint = None if mode == "restart" else await self._load_checkpoint()
+        if checkpoint:
+            last_username, started_at, skipped, edited, reposted, failed = checkpoint
+            resumed = f" (resuming after **{last_username}**)"
+        else:
+            last_username, started_at, skipped, edited, reposted, failed = "", int(time.time()), 0, 0, 0, 0
+            resumed = ""
+
+        total = await db[KOS_DATABASE].fetchval("SELECT COUNT(*) FROM kos", default=0)
+        status = await ctx.send(f"🔄 Refreshing {total} KOS entries{resumed}...")
+        last_progress = time.monotonic()
+
+        while True:
+            # A batch at a time, so /kos add and remove only ever wait for one batch.
+            async with KOSDB.lock:
+                rows = await self._next_batch(last_username)
+                if not rows:
+                    break
+
+                updates = []
+                for username, timestamp, message_id, reason, stored_hash in rows:
+                    try:
+                        outcome, new_id, new_hash = await self._sync_entry(
+                            channel, username, timestamp, message_id, reason, stored_hash
+                        )
+                    except discord.HTTPException as e:
+                        _log.warning(f"Failed to refresh KOS entry {username}: {e}")
+                        failed += 1
+                        continue
+                    if outcome == "skipped":
+                        skipped += 1
+                        continue
+                    if outcome == "edited":
+                        edited += 1
+                    else:
+                        reposted += 1
+                    updates.append((new_id, new_hash, username))
+
+                last_username = rows[-1][0]
+                async with db[KOS_DATABASE].transaction() as tx:
+                    await KOSDB.set_message_ids(updates, tx)
+                    await tx.execute(
+                        "INSERT OR REPLACE INTO kos_refresh_checkpoint "
+                        "(id, last_username, started_at, skipped, edited, reposted, failed) VALUES (1, ?, ?, ?, ?, ?, ?)",
+                        (last_username, started_at, skipped, edited, reposted, failed)
+                    )
+                KOSDB.cache_message_ids(updates)  # only once the batch is committed
+
+            if time.monotonic() - last_progress >= PROGRESS_INTERVAL:
+                done = skipped + edited + reposted + failed
+                await status.edit(content=f"🔄 Refreshing KOS entries{resumed}: {done}/{total} "
+                                          f"(✏️ {edited} edited, 📨 {reposted} reposted, ⏭️ {skipped} unchanged)")
+                last_progress = time.monotonic()
+
+        await db[KOS_DATABASE].execute("DELETE FROM kos_refresh_checkpoint WHERE id = 1")
+        await status.edit(content=f"✅ Refreshed KOS entries: ✏️ {edited} edited, 📨 {reposted} reposted, "
+                                  f"⏭️ {skipped} unchanged. ❌ Failed {failed}")
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(KOSRefresher(bot))
\ No newline at end of file
+    await bot.add_cog(KOSRefresher(bot))
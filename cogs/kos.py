@@ -1,47 +1,47 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import aiosqlite
 import datetime
-import pytz
+import logging
+
+from utils.database import db
+from utils.dm import STAFF, dm_dispatcher
+from utils.kos_cache import kos_cache
+from utils.kos_store import (
+    KOS_BOARD_MODE, KOS_DATABASE, TIMEZONE, KOSBoard, KOSDB, apply_kos_update, build_kos_embed, embed_hash,
+    reload_kos_cache,
+)
+from utils.members import get_user
+from utils.interactions import respond_first
+from utils.ipc import ipc
+from utils.metrics import metrics
+from utils.modlog import modlog
+from utils import kos_search as kos_index
+from utils.resolver import resolver
 
 # ---------- CONFIG ----------
 KOS_CHANNEL_ID = 1414380691994447912
 KOS_REQUEST_CHANNEL_ID = 1414435650790359160
-MOD_LOG_CHANNEL_ID = 1414435845615910933
 ROLE_KOS_ADD = 1414436081444847667
 ROLE_KOS_REQUEST = 1414369081405997178
 ROLE_KOS_REVIEW = 1414369811022086144
-TIMEZONE = pytz.timezone("America/Boise")
+# The database, board mode and timezone are configured in utils/kos_store.py.
 # ----------------------------
 
+_log = logging.getLogger(__name__)
 
-# ---------- Database Helpers ----------
-class KOSDB:
-    @staticmethod
-    async def add(username: str, reason: str, message_id: int):
-        timestamp = int(datetime.datetime.now(tz=TIMEZONE).timestamp())
-        async with aiosqlite.connect("kos.db") as db:
-            await db.execute(
-                "INSERT OR REPLACE INTO kos (username, timestamp, message_id, reason) VALUES (?, ?, ?, ?)",
-                (username, timestamp, message_id, reason)
-            )
-            await db.commit()
+resolver.add_channel("kos", id=KOS_CHANNEL_ID)
+resolver.add_channel("kos_requests", id=KOS_REQUEST_CHANNEL_ID)
+resolver.add_role("kos_add", id=ROLE_KOS_ADD)
+resolver.add_role("kos_request", id=ROLE_KOS_REQUEST)
+resolver.add_role("kos_review", id=ROLE_KOS_REVIEW)
 
-    @staticmethod
-    async def remove(username: str):
-        async with aiosqlite.connect("kos.db") as db:
-            await db.execute("DELETE FROM kos WHERE lower(username) = lower(?)", (username,))
-            await db.commit()
 
-    @staticmethod
-    async def get(username: str):
-        async with aiosqlite.connect("kos.db") as db:
-            async with db.execute(
-                "SELECT username, timestamp, message_id, reason FROM kos WHERE lower(username) = lower(?)",
-                (username,)
-            ) as cursor:
-                return await cursor.fetchone()
+async def notify_requester(client: discord.Client, requester_id: int, username: str, outcome: str):
+    """DM the requester how their KOS request went. Skipped if their account is gone."""
+    user = await get_user(client, requester_id)
+    if user is not None:
+        dm_dispatcher.send(user, STAFF, content=f"Your KOS request for **{username}** was {outcome}.")
 
 
 # ---------- Group ----------
@@ -49,18 +49,9 @@ class KOSGroup(app_commands.Group):
     def __init__(self):
         super().__init__(name="kos", description="Kill On Sight commands")
 
-    async def log_action(self, guild: discord.Guild, title: str, description: str, color=discord.Color.blurple()):
-        channel = guild.get_channel(MOD_LOG_CHANNEL_ID)
-        if channel:
-            embed = discord.Embed(
-                title=title, description=description,
-                color=color, timestamp=datetime.datetime.utcnow()
-            )
-            await channel.send(embed=embed)
-
     @app_commands.command(name="add", description="Add someone to the KOS list.")
     async def kos_add(self, interaction: discord.Interaction, username: str, reason: str):
-        if ROLE_KOS_ADD not in [r.id for r in interaction.user.roles]:
+        if not resolver.has_role(interaction.user, "kos_add"):
             return await interaction.response.send_message(embed=discord.Embed(
                 title="Permission Denied",
                 description="You don't have permission to add KOS entries.",
@@ -74,7 +65,7 @@ class KOSGroup(app_commands.Group):
                 color=discord.Color.orange()
             ), ephemeral=True)
 
-        channel = interaction.guild.get_channel(KOS_CHANNEL_ID)
+        channel = resolver.channel(interaction.guild, "kos")
         if not channel:
             return await interaction.response.send_message(embed=discord.Embed(
                 title="Error",
@@ -82,21 +73,30 @@ class KOSGroup(app_commands.Group):
                 color=discord.Color.red()
             ), ephemeral=True)
 
-        now_ts = int(datetime.datetime.now(tz=TIMEZONE).timestamp())
-        embed = discord.Embed(title="⚔️ KOS Notice", color=discord.Color.red())
-        embed.add_field(name="Username", value=username)
-        embed.add_field(name="Reason", value=reason)
-        embed.add_field(name="Date", value=f"<t:{now_ts}:F>")
-
-        msg = await channel.send(embed=embed)
-        await KOSDB.add(username, reason, msg.id)
+        async def post():
+            async with KOSDB.lock:
+                if await KOSDB.get(username):  # lost a race with a concurrent add
+                    return {"embed": discord.Embed(
+                        title="Already on KOS",
+                        description=f"**{username}** is already on the KOS list.",
+                        color=discord.Color.orange()
+                    )}
+                now_ts = int(datetime.datetime.now(tz=TIMEZONE).timestamp())
+                if KOS_BOARD_MODE:
+                    await KOSBoard.add(channel, username, reason, now_ts)
+                else:
+                    embed = build_kos_embed(username, reason, now_ts)
+                    msg = await channel.send(embed=embed)
+                    await KOSDB.add(username, reason, msg.id, now_ts, embed_hash(embed))
+
+            await modlog.log("KOS Added", f"{interaction.user.mention} added **{username}** for: {reason}", discord.Color.red())
+            return {"embed": discord.Embed(
+                title="KOS Added",
+                description=f"**{username}** has been added to the KOS list.",
+                color=discord.Color.green()
+            )}
 
-        await self.log_action(interaction.guild, "KOS Added", f"{interaction.user.mention} added **{username}** for: {reason}", discord.Color.red())
-        await interaction.response.send_message(embed=discord.Embed(
-            title="KOS Added",
-            description=f"**{username}** has been added to the KOS list.",
-            color=discord.Color.green()
-        ), ephemeral=True)
+        await respond_first(interaction, "/kos add", post)
 
     @app_commands.command(name="remove", description="Remove someone from the KOS list.")
     async def kos_remove(self, interaction: discord.Interaction, username: str):
@@ -108,33 +108,48 @@ class KOSGroup(app_commands.Group):
                 color=discord.Color.red()
             ), ephemeral=True)
 
-        message_id = entry[2]
-        channel = interaction.guild.get_channel(KOS_CHANNEL_ID)
-        if channel:
-            try:
-                msg = await channel.fetch_message(message_id)
-                await msg.delete()
-            except:
-                pass
-
-        await KOSDB.remove(username)
-        await self.log_action(interaction.guild, "KOS Removed", f"{interaction.user.mention} removed **{username}**", discord.Color.green())
-        await interaction.response.send_message(embed=discord.Embed(
-            title="KOS Removed",
-            description=f"**{username}** has been removed from the KOS list.",
-            color=discord.Color.green()
-        ), ephemeral=True)
+        channel = resolver.channel(interaction.guild, "kos")
+
+        async def remove():
+            async with KOSDB.lock:  # may wait out a refresh batch or reconcile, hence respond_first
+                entry = await KOSDB.get(username)
+                if not entry:  # removed while we waited
+                    return {"embed": discord.Embed(
+                        title="Not Found",
+                        description=f"**{username}** is not on the KOS list.",
+                        color=discord.Color.red()
+                    )}
+                message_id = entry[2]
+                if KOS_BOARD_MODE and channel:
+                    await KOSBoard.remove(channel, username)
+                else:
+                    if channel and message_id:
+                        try:
+                            await channel.get_partial_message(message_id).delete()
+                        except discord.NotFound:
+                            pass
+                        except discord.HTTPException as e:
+                            _log.warning(f"Failed to delete KOS post {message_id} for {username}: {e}")
+                    await KOSDB.remove(username)
+            await modlog.log("KOS Removed", f"{interaction.user.mention} removed **{username}**", discord.Color.green())
+            return {"embed": discord.Embed(
+                title="KOS Removed",
+                description=f"**{username}** has been removed from the KOS list.",
+                color=discord.Color.green()
+            )}
+
+        await respond_first(interaction, "/kos remove", remove)
 
     @app_commands.command(name="request", description="Request to add someone to KOS.")
     async def kos_request(self, interaction: discord.Interaction, username: str, reason: str, attachment: discord.Attachment = None):
-        if ROLE_KOS_REQUEST not in [r.id for r in interaction.user.roles]:
+        if not resolver.has_role(interaction.user, "kos_request"):
             return await interaction.response.send_message(embed=discord.Embed(
                 title="Permission Denied",
                 description="You don't have permission to request KOS.",
                 color=discord.Color.red()
             ), ephemeral=True)
 
-        channel = interaction.guild.get_channel(KOS_REQUEST_CHANNEL_ID)
+        channel = resolver.channel(interaction.guild, "kos_requests")
         if not channel:
             return await interaction.response.send_message(embed=discord.Embed(
                 title="Error",
@@ -149,11 +164,11 @@ class KOSGroup(app_commands.Group):
         if attachment:
             embed.set_image(url=attachment.url)
 
-        view = KOSApprovalView(username, reason, self, requester=interaction.user)
-        request_msg = await channel.send(embed=embed, view=view)
-        view.message = request_msg
+        request_id = await KOSDB.create_request(username, reason, interaction.user.id)
+        request_msg = await channel.send(embed=embed, view=review_view(request_id))
+        await KOSDB.set_request_message(request_id, channel.id, request_msg.id)
 
-        await self.log_action(interaction.guild, "KOS Request Submitted", f"{interaction.user.mention} requested KOS for **{username}**", discord.Color.orange())
+        await modlog.log("KOS Request Submitted", f"{interaction.user.mention} requested KOS for **{username}**", discord.Color.orange())
         await interaction.response.send_message(embed=discord.Embed(
             title="Request Sent",
             description="Your KOS request has been submitted for review.",
@@ -178,81 +193,214 @@ class KOSGroup(app_commands.Group):
 
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    @app_commands.command(name="list", description="Browse the KOS list.")
+    async def kos_list(self, interaction: discord.Interaction):
+        view = KOSListView(interaction.user.id)
+        embed = await view.load()
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+
+    @app_commands.command(name="search", description="Search KOS usernames and reasons.")
+    @app_commands.describe(query="Words from a reason, or a (possibly misspelled) username")
+    async def kos_search(self, interaction: discord.Interaction, query: str):
+        matches = await kos_index.search(db[KOS_DATABASE], query)
+        found = {row[0] for row in matches}
+        similar = [
+            (username, ratio) for username, ratio in await kos_index.fuzzy(db[KOS_DATABASE], query)
+            if username not in found
+        ]
+        if not matches and not similar:
+            return await interaction.response.send_message(embed=discord.Embed(
+                title="No Results",
+                description=f"Nothing on the KOS list matches **{query}**.",
+                color=discord.Color.green()
+            ), ephemeral=True)
 
-# ---------- View ----------
-class KOSApprovalView(discord.ui.View):
-    def __init__(self, username: str, reason: str, group: KOSGroup, requester: discord.User):
-        super().__init__(timeout=None)
-        self.username = username
-        self.reason = reason
-        self.group = group
-        self.requester = requester
-        self.message = None  # will be assigned after sending
+        embed = discord.Embed(title="🔎 KOS Search", color=discord.Color.red())
+        if matches:
+            embed.add_field(name="Matches", value="\n".join(
+                f"**{username}** — {reason} • <t:{timestamp}:d>" for username, timestamp, reason in matches
+            )[:1024], inline=False)
+        if similar:
+            embed.add_field(name="Did you mean", value="\n".join(
+                f"**{username}** ({ratio:.0%})" for username, ratio in similar
+            )[:1024], inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @kos_status.autocomplete("username")
+    @kos_remove.autocomplete("username")
+    @kos_request.autocomplete("username")
+    async def username_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [app_commands.Choice(name=name, value=name) for name in kos_cache.complete(current)]
+
+
+# ---------- Views ----------
+class KOSListView(discord.ui.View):
+    """Keyset-paginated browser over kos.db; only the visible page is ever loaded."""
+
+    def __init__(self, owner_id: int):
+        super().__init__(timeout=300)
+        self.owner_id = owner_id
+        self.page = 0
+        self.first_key = None
+        self.last_key = None
+
+    async def load(self, after: str = None, before: str = None) -> discord.Embed:
+        rows, more = await KOSDB.page(after=after, before=before)
+        if before is not None:
+            has_prev, has_next = more, True
+        else:
+            has_prev, has_next = after is not None, more
+        if rows:
+            self.first_key, self.last_key = rows[0][0], rows[-1][0]
+        self.previous_page.disabled = not has_prev
+        self.next_page.disabled = not has_next
+
+        total = len(kos_cache) if kos_cache.loaded else await db[KOS_DATABASE].fetchval("SELECT COUNT(*) FROM kos")
+        embed = discord.Embed(title="⚔️ KOS List", color=discord.Color.red())
+        embed.description = "\n".join(
+            f"**{username}** — {reason} • <t:{timestamp}:d>" for username, timestamp, _, reason in rows
+        ) or "The KOS list is empty."
+        embed.set_footer(text=f"Page {self.page + 1} • {total} entries")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.owner_id
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    @metrics.timed("KOS list page")
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(self.page - 1, 0)
+        embed = await self.load(before=self.first_key)
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    @metrics.timed("KOS list page")
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        embed = await self.load(after=self.last_key)
+        await interaction.response.edit_message(embed=embed, view=self)
+
+
+class KOSReviewButton(discord.ui.DynamicItem[discord.ui.Button], template=r"kos:review:(?P<action>accept|deny):(?P<request_id>\d+)"):
+    """
+    Approve/deny button for a stored KOS request. Everything it needs lives in
+    its custom id and the kos_requests table, so buttons keep working after a
+    restart without keeping a view object alive per pending request.
+    """
+
+    def __init__(self, action: str, request_id: int):
+        accept = action == "accept"
+        super().__init__(discord.ui.Button(
+            label="✅ Accept" if accept else "❌ Deny",
+            style=discord.ButtonStyle.green if accept else discord.ButtonStyle.red,
+            custom_id=f"kos:review:{action}:{request_id}"
+        ))
+        self.action = action
+        self.request_id = request_id
 
-    @discord.ui.button(label="✅ Accept", style=discord.ButtonStyle.green)
-    async def accept(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if ROLE_KOS_REVIEW not in [r.id for r in interaction.user.roles]:
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["action"], int(match["request_id"]))
+
+    @metrics.timed("KOS review")
+    async def callback(self, interaction: discord.Interaction):
+        if not resolver.has_role(interaction.user, "kos_review"):
             return await interaction.response.send_message(embed=discord.Embed(
                 title="Permission Denied",
-                description="You don't have permission to approve requests.",
+                description=f"You don't have permission to {self.action} requests.",
                 color=discord.Color.red()
             ), ephemeral=True)
 
-        channel = interaction.guild.get_channel(KOS_CHANNEL_ID)
+        request = await KOSDB.get_request(self.request_id)
+        status = "accepted" if self.action == "accept" else "denied"
+        if not request or not await KOSDB.resolve_request(self.request_id, status, interaction.user.id):
+            return await interaction.response.send_message("This request has already been reviewed.", ephemeral=True)
+        username, reason, requester_id, _ = request
+
+        if self.action == "accept":
+            await self.accept(interaction, username, reason, requester_id)
+        else:
+            await self.deny(interaction, username, requester_id)
+
+    async def accept(self, interaction: discord.Interaction, username: str, reason: str, requester_id: int):
+        channel = resolver.channel(interaction.guild, "kos")
+
+        async def post():
+            # The click already claimed the request as accepted; give it back if no entry gets added.
+            async with KOSDB.lock:
+                added = False
+                if await KOSDB.get(username):
+                    content = f"{username} is already on the KOS list."
+                elif not channel:
+                    await KOSDB.reopen_request(self.request_id)
+                    return {"content": "❌ KOS channel not found. The request is still pending."}
+                else:
+                    try:
+                        await self.add_entry(channel, interaction.user, username, reason)
+                    except BaseException:  # including the job's timeout
+                        await KOSDB.reopen_request(self.request_id)
+                        raise
+                    content = f"{username} has been approved and added to the KOS list."
+                    added = True
+            if added:
+                await modlog.log(
+                    "KOS Approved",
+                    f"{interaction.user.mention} approved **{username}** (requested by <@{requester_id}>)",
+                    discord.Color.red()
+                )
+            await notify_requester(interaction.client, requester_id, username, "approved")
+
+            # Edit original request message to reflect approval
+            if interaction.message and interaction.message.embeds:
+                approved_embed = interaction.message.embeds[0].copy()
+                approved_embed.title = "✅ KOS Request Approved"
+                approved_embed.color = discord.Color.green()
+                approved_embed.add_field(name="Reviewed By", value=interaction.user.mention, inline=False)
+                await interaction.message.edit(embed=approved_embed, view=None)
+
+            return {"content": content}
+
+        await respond_first(interaction, "KOS approve", post)
+
+    @staticmethod
+    async def add_entry(channel: discord.TextChannel, reviewer: discord.abc.User, username: str, reason: str):
         now_ts = int(datetime.datetime.now(tz=TIMEZONE).timestamp())
+        if KOS_BOARD_MODE:
+            await KOSBoard.add(channel, username, reason, now_ts)
+            return
         embed = discord.Embed(title="⚔️ KOS Approved", color=discord.Color.red())
-        embed.add_field(name="Username", value=self.username)
-        embed.add_field(name="Reason", value=self.reason)
-        embed.add_field(name="Approved By", value=interaction.user.mention)
+        embed.add_field(name="Username", value=username)
+        embed.add_field(name="Reason", value=reason)
+        embed.add_field(name="Approved By", value=reviewer.mention)
         embed.add_field(name="Date", value=f"<t:{now_ts}:F>")
-
         msg = await channel.send(embed=embed)
-        await KOSDB.add(self.username, self.reason, msg.id)
-
-        await self.group.log_action(
-            interaction.guild,
-            "KOS Approved",
-            f"{interaction.user.mention} approved **{self.username}** (requested by {self.requester.mention})",
-            discord.Color.red()
-        )
-
-        # Edit original request message to reflect approval
-        if self.message:
-            approved_embed = self.message.embeds[0]
-            approved_embed.title = "✅ KOS Request Approved"
-            approved_embed.color = discord.Color.green()
-            approved_embed.add_field(name="Reviewed By", value=interaction.user.mention, inline=False)
-            await self.message.edit(embed=approved_embed, view=None)
-
-        await interaction.response.send_message(f"{self.username} has been approved and added to the KOS list.",
-                                                ephemeral=True)
-        self.stop()
-
-    @discord.ui.button(label="❌ Deny", style=discord.ButtonStyle.red)
-    async def deny(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if ROLE_KOS_REVIEW not in [r.id for r in interaction.user.roles]:
-            return await interaction.response.send_message(embed=discord.Embed(
-                title="Permission Denied",
-                description="You don't have permission to deny requests.",
-                color=discord.Color.red()
-            ), ephemeral=True)
+        await KOSDB.add(username, reason, msg.id, now_ts)
+
+    async def deny(self, interaction: discord.Interaction, username: str, requester_id: int):
+        async def post():
+            await modlog.log(
+                "KOS Denied",
+                f"{interaction.user.mention} denied KOS for **{username}**",
+                discord.Color.dark_grey()
+            )
+            await notify_requester(interaction.client, requester_id, username, "denied")
+
+            if interaction.message and interaction.message.embeds:
+                denied_embed = interaction.message.embeds[0]
+                denied_embed.title = "❌ KOS Request Denied"
+                denied_embed.color = discord.Color.dark_grey()
+                denied_embed.add_field(name="Reviewed By", value=interaction.user.mention, inline=False)
+                await interaction.message.edit(embed=denied_embed, view=None)
 
-        await self.group.log_action(
-            interaction.guild,
-            "KOS Denied",
-            f"{interaction.user.mention} denied KOS for **{self.username}**",
-            discord.Color.dark_grey()
-        )
+            return {"content": f"KOS request for {username} has been denied."}
 
-        if self.message:
-            denied_embed = self.message.embeds[0]
-            denied_embed.title = "❌ KOS Request Denied"
-            denied_embed.color = discord.Color.dark_grey()
-            denied_embed.add_field(name="Reviewed By", value=interaction.user.mention, inline=False)
-            await self.message.edit(embed=denied_embed, view=None)
+        await respond_first(interaction, "KOS deny", post)
 
-        await interaction.response.send_message(f"KOS request for {self.username} has been denied.", ephemeral=True)
-        self.stop()
+def review_view(request_id: int) -> discord.ui.View:
+    view = discord.ui.View(timeout=None)
+    view.add_item(KOSReviewButton("accept", request_id))
+    view.add_item(KOSReviewButton("deny", request_id))
+    return view
 
 
 # ---------- Cog ----------
@@ -260,12 +408,19 @@ class KOSCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-    @commands.Cog.listener()
-    async def on_ready(self):
-        if not hasattr(self.bot, "kos_synced"):
-            self.bot.tree.add_command(KOSGroup())
-            await self.bot.tree.sync()
-            self.bot.kos_synced = True
+    async def cog_load(self):
+        if not kos_cache.loaded:
+            await kos_cache.load(db[KOS_DATABASE])
+        self.bot.add_dynamic_items(KOSReviewButton)
+        self.bot.tree.add_command(KOSGroup(), override=True)
+        ipc.subscribe("kos", apply_kos_update)
+        ipc.add_connect_hook(reload_kos_cache)
+
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(KOSReviewButton)
+        self.bot.tree.remove_command("kos")
+        ipc.unsubscribe("kos", apply_kos_update)
+        ipc.remove_connect_hook(reload_kos_cache)
 
 
 async def setup(bot: commands.Bot):
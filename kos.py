@@ -1,23 +1,13 @@
-import aiosqlite
 import asyncio
-import os
 
-async def create_kos_db():
-    if os.path.exists("kos.db"):
-        os.remove("kos.db")
-        print("Existing database deleted.")
+from utils.kos_store import KOS_DATABASE
+from utils.database import db
+from utils.migrations import KOS_MIGRATIONS, migrate
 
-    async with aiosqlite.connect("kos.db") as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS kos (
-                username TEXT PRIMARY KEY,
-                timestamp INTEGER NOT NULL,
-                message_id INTEGER NOT NULL,
-                reason TEXT NOT NULL
-            );
-        """)
-        await db.commit()
-        print("New kos.db created with UNIX timestamp support.")
+async def create_kos_db():
+    applied = await migrate(db[KOS_DATABASE], KOS_MIGRATIONS)
+    await db.close()
+    print(f"kos.db is up to date ({applied} migration(s) applied).")
 
 # Run the DB setup
 if __name__ == "__main__":
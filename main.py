@@ -1,65 +1,150 @@
+# === Startup Timing (opt-in, see utils/startup.py) ===
+from utils.startup import STARTED, startup
+startup.install()
+
 # === Standard Library Imports ===
-import asyncio
-import base64
-import datetime
-import json
+import collections
 import logging
+import math
 import os
-import io
-import random
-import re
-import sys
-import subprocess
-from datetime import datetime, timedelta
-from io import BytesIO
+import time
+from datetime import datetime
 
 # === Third-Party Imports ===
-import aiohttp
-import aiosqlite
 import discord
-from openai import OpenAI
-import requests
-from charset_normalizer.md import getLogger
-from discord import app_commands, ButtonStyle, Webhook
-from discord.ext import commands, tasks
-from discord.ui import Button, View
-from discord.utils import get
-from discord import FFmpegPCMAudio
+from discord import app_commands
+from discord.ext import commands
+from discord.ui import View
 from dotenv import load_dotenv
-from PIL import Image, ImageDraw, ImageFont
-from sympy import false
-from termcolor import colored
 
 # == Local Imports ===
-from cogs.kos import KOSGroup
+from utils.challenges import CHALLENGE_TTL, challenges
+from utils.command_sync import command_sync
+from utils.database import db
+from utils.dm import VERIFICATION, DMDropped, dm_dispatcher
+from utils.hot_reload import find_extensions, hot_reload
+from utils.interactions import ack_times, respond_first, side_effects, task_times
+from utils.ipc import STATS_INTERVAL, ipc, owns_guild
+from utils.kos_store import KOS_DATABASE, MOD_LOG_CHANNEL_ID
+from utils.members import get_member, member_options
+from utils.metrics import metrics
+from utils.migrations import BOT_MIGRATIONS, KOS_MIGRATIONS, TICKET_MIGRATIONS, migrate
+from utils.modlog import modlog
+from utils.panels import panels
+from utils.raid import raid_monitor
+from utils.resolver import resolver
+from utils.ticket_slots import CategoryPool, is_category_full
+from utils.ticket_store import AUTO_CLOSE_AFTER, REMIND_AFTER, STATUS_OPEN, idle_scheduler, ticket_store
 
-# === Runtime Cleanup & Signal Handling ===
-import atexit
-import signal
+startup.mark("imports")
 
 TICKET_DATABASE = "tickets.db"
+BOT_DATABASE = "bot.db"
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
+VERIFICATION_SECRET = os.getenv("VERIFICATION_SECRET") or DISCORD_TOKEN  # keys the stored verification code hashes
+MOD_LOG_WEBHOOK_URL = os.getenv("MOD_LOG_WEBHOOK_URL")  # optional; falls back to the mod-log channel
+TRANSCRIPT_HTML = True  # also render a readable .html.gz transcript next to the .jsonl.gz
+DELETE_TICKET_AFTER_ARCHIVE = False  # delete the channel once its transcript is saved instead of moving it to the archive
+MEMBER_POLICY = os.getenv("MEMBER_POLICY", "lean")  # full / lean / minimal, see utils/members.py
+HOT_RELOAD = os.getenv("HOT_RELOAD") == "1"  # reload edited cogs in place instead of restarting (dev/ops)
+# Set by cluster.py for each worker process; a plain `python main.py` runs every shard itself.
+SHARD_IDS = [int(shard) for shard in os.getenv("SHARD_IDS", "").split(",") if shard] or None
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+CLUSTER_ID = int(os.getenv("CLUSTER_ID", "0"))
+CLUSTER_SOCKET = os.getenv("CLUSTER_SOCKET")
+db.shared = CLUSTER_SOCKET is not None  # clusters write the same SQLite files
+METRICS_PORT = int(os.getenv("METRICS_PORT")) + CLUSTER_ID if os.getenv("METRICS_PORT") else None  # one port per cluster
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+TICKET_MODE = "channel"  # "channel": one text channel per ticket; "thread": a private thread in the support channel
+TICKET_SUPPORT_CHANNEL_ID = None  # parent channel for thread tickets; None uses the channel the panel was clicked in
+TICKET_CATEGORY_IDS = [1414397759729172590]  # open ticket categories, filled in order; add more to overflow
+ARCHIVE_CATEGORY_IDS = [1414429643003527339]  # archived ticket categories, filled in order
+GUILD_ID = 1414363675552252048
+resolver.add_role("verified_role", id=1414392497383149639)  # checked before verifying
+resolver.add_role("verified", name="verified")  # granted on verification
+resolver.add_role("team_lead", name="|  Team Lead")
+resolver.add_channel("join_log", id=1414393765350604800)
+resolver.add_channel("joins", name="〔➕〕joins")
+resolver.add_channel("raid_panel", id=1414393765350604800)  # where the anti-raid panel goes on lockdown
+LOCKDOWN_VERIFICATION_LEVEL = discord.VerificationLevel.highest
+ticket_categories = CategoryPool("open", TICKET_CATEGORY_IDS)
+archive_categories = CategoryPool("archive", ARCHIVE_CATEGORY_IDS)
 _log = logging.getLogger("discord")
 
-intents = discord.Intents.all()
-bot = commands.AutoShardedBot(command_prefix="!", intents=intents,
-                              activity=discord.Streaming(name='ADF coding me!', url="https://nauticalhosting.org"))
-class VerificationChallengeView(discord.ui.View):
-    def __init__(self, user: discord.Member, code: int):
-        super().__init__(timeout=300)
-        self.user = user
-        self.code = code
-    @discord.ui.button(label="Enter Code", style=discord.ButtonStyle.red, custom_id="verify_code")
-    async def verify_code(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if interaction.user != self.user:
+class RevelationBot(commands.AutoShardedBot):
+    async def setup_hook(self):
+        self.db = db
+        self.extension_state = {}  # cog name -> state handed across a hot reload
+        resolver.attach(self)
+        if METRICS_PORT:
+            db.stats.observe = metrics.db_query_seconds.observe
+            await metrics.start(self, METRICS_PORT, METRICS_HOST)
+        await db.open(KOS_DATABASE, TICKET_DATABASE, BOT_DATABASE)
+        await migrate(db[KOS_DATABASE], KOS_MIGRATIONS)
+        await migrate(db[TICKET_DATABASE], TICKET_MIGRATIONS)
+        await migrate(db[BOT_DATABASE], BOT_MIGRATIONS)
+        await panels.load(db[BOT_DATABASE])
+        await challenges.start(db[BOT_DATABASE], VERIFICATION_SECRET)
+        self.add_dynamic_items(VerificationCodeButton)
+        modlog.start(self, MOD_LOG_CHANNEL_ID, MOD_LOG_WEBHOOK_URL)
+        side_effects.start()
+        dm_dispatcher.start()
+        # Runs once per process, before the first connect; on_ready fires again on every reconnect.
+        await load_extensions("cogs")
+        self.add_view(VerificationView(self, GUILD_ID))
+        self.add_view(TicketView())
+        if CLUSTER_SOCKET:
+            ipc.subscribe("lockdown", apply_remote_lockdown)
+            ipc.start(CLUSTER_SOCKET, CLUSTER_ID, cluster_stats)
+        await command_sync.load(db[BOT_DATABASE])
+        if CLUSTER_ID == 0:  # the command tree is per application; one cluster syncing it is enough
+            await command_sync.sync(self.tree, GUILD_ID)
+        if owns_guild(self, GUILD_ID):  # only this cluster sees ticket messages, so only it may judge them idle
+            await ticket_store.start(db[TICKET_DATABASE])
+            await ticket_categories.start(db[TICKET_DATABASE])
+            await archive_categories.start(db[TICKET_DATABASE])
+            idle_scheduler.start(self, remind_idle_ticket, auto_close_ticket)
+        if HOT_RELOAD:
+            hot_reload.start(self, "cogs", "cogs", sync_guilds=(GUILD_ID,), sync_commands=CLUSTER_ID == 0)
+        startup.mark("setup_hook", command_syncs=command_sync.calls)
+
+    async def close(self):
+        hot_reload.stop()
+        await ipc.close()
+        idle_scheduler.stop()
+        challenges.stop()
+        await dm_dispatcher.close()
+        await side_effects.close()
+        await modlog.close()
+        await super().close()
+        await ticket_store.stop()
+        await db.close()
+        await metrics.close()
+
+
+bot = RevelationBot(command_prefix="!", **member_options(MEMBER_POLICY), shard_ids=SHARD_IDS, shard_count=SHARD_COUNT,
+                    activity=discord.Streaming(name="Looking for KOS players", url="https://nauticalhosting.com"))
+class VerificationCodeButton(discord.ui.DynamicItem[discord.ui.Button], template=r"verify:code:(?P<user_id>\d+)"):
+    """The "Enter Code" button on a verification DM; the code itself lives in the challenge store."""
+    def __init__(self, user_id: int):
+        super().__init__(discord.ui.Button(label="Enter Code", style=discord.ButtonStyle.red,
+                                           custom_id=f"verify:code:{user_id}"))
+        self.user_id = user_id
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["user_id"]))
+    @metrics.timed("verify code")
+    async def callback(self, interaction: discord.Interaction):
+        if interaction.user.id != self.user_id:
             return await interaction.response.send_message("This challenge isn't for you.", ephemeral=True)
-        modal = VerificationModal(self.code)
-        await interaction.response.send_modal(modal)
+        if not challenges.is_pending(self.user_id):
+            return await interaction.response.send_message(
+                "⌛ This verification code has expired. Press the verify button again for a new one.", ephemeral=True)
+        await interaction.response.send_modal(VerificationModal())
 class VerificationModal(discord.ui.Modal, title="Enter Verification Code"):
-    def __init__(self, code: int):
+    def __init__(self):
         super().__init__()
-        self.code = code
         self.username_input = discord.ui.TextInput(
             label="Minecraft Username",
             placeholder="Enter your Minecraft username here...",
@@ -74,38 +159,49 @@ class VerificationModal(discord.ui.Modal, title="Enter Verification Code"):
             max_length=6
         )
         self.add_item(self.code_input)
+    @metrics.timed("verification")
     async def on_submit(self, interaction: discord.Interaction):
-        guild_id = 1414363675552252048
-        if self.code_input.value == str(self.code):
-            guild = await interaction.client.fetch_guild(guild_id)
-            if guild:
-                role = guild.get_role(int("1414392497383149639"))
-                if role:
-                    server = bot.get_guild(guild_id)
-                    role = discord.utils.get(server.roles, name="verified")
-                    member = server.get_member(interaction.user.id)
-                    await member.add_roles(role)
-                    await edit_verification_embed(member, "Verified", self.username_input)
-                    await interaction.response.send_message("✅ Verification successful! You are now awaiting approval.\nBe sure to checkout <#1414381158740922568> and <#1414384922113867826>!",
-                                                            ephemeral=True)
-                else:
-                    await interaction.response.send_message("❌ Role not found.", ephemeral=True)
-            else:
-                await interaction.response.send_message("❌ Couldn't find the server. Please try again later.",
-                                                        ephemeral=True)
+        result = await challenges.check(interaction.user.id, self.code_input.value)
+        if result == "ok":
+            await respond_first(interaction, "verification", lambda: self.verify(interaction))
+        elif result == "expired":
+            await interaction.response.send_message(
+                "⌛ This verification code has expired. Press the verify button again for a new one.", ephemeral=True)
         else:
             await interaction.response.send_message("❌ Incorrect code. Please try again.", ephemeral=True)
+    async def verify(self, interaction: discord.Interaction):
+        guild = resolver.guild(GUILD_ID)
+        if not guild:
+            return {"content": "❌ Couldn't find the server. Please try again later."}
+        if not resolver.role(guild, "verified_role"):
+            return {"content": "❌ Role not found."}
+        role = resolver.role(guild, "verified")
+        member = await get_member(guild, interaction.user.id)  # submitted from a DM, so interaction.user is a User
+        if member is None:
+            return {"content": "❌ You need to be in the server to verify."}
+        await member.add_roles(role)
+        await edit_verification_embed(member, "Verified", self.username_input)
+        await modlog.log("Member Verified", f"{member.mention} verified as **{self.username_input.value}**",
+                         discord.Color.green())
+        return {"content": "✅ Verification successful! You are now awaiting approval.\nBe sure to checkout <#1414381158740922568> and <#1414384922113867826>!"}
 class VerificationView(discord.ui.View):
     def __init__(self, bot, guild_id):
         super().__init__(timeout=None)
     @discord.ui.button(label="Verify & Send Application", style=discord.ButtonStyle.red, custom_id="verify_button")
+    @metrics.timed("verify button")
     async def verify_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         guild = interaction.guild  # Get the guild from the interaction
-        member = guild.get_member(interaction.user.id)
-        verify_role_id = 1414392497383149639
-        verify_role = guild.get_role(verify_role_id)
-        if verify_role in member.roles:
-            channel = discord.utils.get(guild.text_channels, id=1414393765350604800)
+        member = interaction.user  # guild interactions carry the member, cached or not
+        if raid_monitor.attempt(guild.id, time.time()):
+            await start_lockdown(guild, f"Verification attempt rate tripped the raid detector "
+                                        f"(score {raid_monitor.detectors[guild.id].score:.2f})")
+        if raid_monitor.is_locked(guild.id):
+            await interaction.response.send_message(
+                "⚠️ |  Sorry, a raid has been detected and verification is paused. Please wait for this raid to be resolved.",
+                ephemeral=True)
+            return
+        if resolver.has_role(member, "verified_role"):
+            channel = resolver.channel(guild, "join_log")
             if channel:
                 await channel.send(f"🚫 {member.mention} tried to verify but already has the verified role.")
             await interaction.response.send_message(
@@ -113,22 +209,65 @@ class VerificationView(discord.ui.View):
                 ephemeral=True)
             return
         await interaction.response.send_message("📩 Check your DMs for the verification challenge!", ephemeral=True)
-        verification_code = random.randint(100000, 999999)
+        verification_code, expires_at = await challenges.issue(interaction.user.id)
         embed = discord.Embed(
             title="Verification Challenge",
-            description=f"To verify your identity, please enter your Minecraft username and the following code in the challenge panel:\n\n`{verification_code}`",
+            description=f"To verify your identity, please enter your Minecraft username and the following code in the challenge panel:\n\n`{verification_code}`\n\nExpires <t:{expires_at}:R>.",
             color=discord.Color.red()
         )
-        embed.set_footer(text="This verification code expires in 5 minutes.")
+        embed.set_footer(text=f"This verification code expires in {CHALLENGE_TTL // 60} minutes.")
+        view = discord.ui.View(timeout=None)
+        view.add_item(VerificationCodeButton(interaction.user.id))
+        sent = dm_dispatcher.send(interaction.user, VERIFICATION, key=("verify", interaction.user.id), embed=embed, view=view)
         try:
-            await interaction.user.send(embed=embed,
-                                        view=VerificationChallengeView(interaction.user, verification_code))
+            if sent is None:
+                raise DMDropped()
+            await sent
         except discord.Forbidden:
             await interaction.followup.send("⚠ Unable to send DM. Please enable direct messages and try again.",
                                             ephemeral=True)
+        except DMDropped:
+            await interaction.followup.send("⏳ We're sending a lot of verification messages right now. "
+                                            "Please try again in a minute.", ephemeral=True)
+async def start_lockdown(guild: discord.Guild, reason: str) -> bool:
+    """Raise the verification level, pause DM challenges and post the anti-raid panel. False if already locked."""
+    if raid_monitor.is_locked(guild.id):
+        return False
+    raid_monitor.locked[guild.id] = guild.verification_level  # marked before any await so it only fires once
+    ipc.publish("lockdown", {"guild_id": guild.id, "locked": True, "level": guild.verification_level.value,
+                             "reason": reason})
+    async def apply():
+        try:
+            await guild.edit(verification_level=LOCKDOWN_VERIFICATION_LEVEL, reason="Raid lockdown")
+        except discord.Forbidden:
+            _log.warning(f"Missing permission to raise the verification level in {guild.name}")
+        channel = resolver.channel(guild, "raid_panel")
+        if channel:
+            await panels.deploy("arp", channel)
+        await modlog.log("Lockdown Started", reason, discord.Color.red())
+    await side_effects.submit("lockdown", apply)
+    return True
+async def end_lockdown(guild: discord.Guild, lifted_by: discord.abc.User) -> bool:
+    if not raid_monitor.is_locked(guild.id):
+        return False
+    previous = raid_monitor.locked.pop(guild.id)
+    ipc.publish("lockdown", {"guild_id": guild.id, "locked": False})
+    try:
+        await guild.edit(verification_level=previous, reason=f"Lockdown lifted by {lifted_by}")
+    except discord.Forbidden:
+        _log.warning(f"Missing permission to restore the verification level in {guild.name}")
+    await modlog.log("Lockdown Lifted", f"{lifted_by.mention} lifted the lockdown", discord.Color.green())
+    return True
+def apply_remote_lockdown(data: dict):
+    """Keep this cluster's lockdown flags in step with the cluster that started or lifted one."""
+    if data["locked"]:
+        raid_monitor.locked[data["guild_id"]] = discord.VerificationLevel(data["level"])
+        _log.warning(f"Guild {data['guild_id']} locked down by another cluster: {data['reason']}")
+    else:
+        raid_monitor.locked.pop(data["guild_id"], None)
 async def edit_verification_embed(member, status, username):
-    joinLogChannel = discord.utils.get(member.guild.text_channels, id=1414393765350604800)
-    welcomeChannel = discord.utils.get(member.guild.text_channels, name="〔➕〕joins")  # Adjust this as needed
+    joinLogChannel = resolver.channel(member.guild, "join_log")
+    welcomeChannel = resolver.channel(member.guild, "joins")
     if joinLogChannel:
         verified_embed = discord.Embed(title=f"Member {member.name} has been verified.",
                                        description=f"» **Member**: {member.name} **[{member.id}]** ({member.mention})\n» **Account Created**: {member.created_at}\n\n**Verification**:\n> **Status**: Verified ✅",
@@ -141,24 +280,52 @@ async def edit_verification_embed(member, status, username):
 class TicketView(discord.ui.View):
     def __init__(self):
         super().__init__(timeout=None)
+    @staticmethod
+    async def already_open(interaction: discord.Interaction) -> bool:
+        """Answer straight away if the user already has a ticket open or on the way."""
+        existing = ticket_store.open_by_user.get(interaction.user.id)
+        if existing is not None:
+            await interaction.response.send_message(f"You already have an open ticket: <#{existing}>", ephemeral=True)
+            return True
+        if interaction.user.id in ticket_store.pending:
+            await interaction.response.send_message("⏳ Your ticket is already being created.", ephemeral=True)
+            return True
+        return False
     async def create_ticket(self, interaction: discord.Interaction, reason: str, answers: str):
+        if not ticket_store.reserve(interaction.user.id):
+            await self.already_open(interaction)
+            return
+        try:
+            await respond_first(interaction, f"ticket: {reason.lower()}", lambda: self.open_ticket(interaction, reason, answers))
+        except Exception:
+            ticket_store.pending.discard(interaction.user.id)
+            raise
+    async def open_ticket(self, interaction: discord.Interaction, reason: str, answers: str):
+        async with ticket_store.creating(interaction.user.id) as existing:
+            if existing is not None:
+                return {"content": f"You already have an open ticket: <#{existing}>"}
+            return await self.build_ticket(interaction, reason, answers)
+    async def build_ticket(self, interaction: discord.Interaction, reason: str, answers: str):
         guild = interaction.guild
         user = interaction.user
-        staff = discord.utils.get(guild.roles, name="|  Team Lead")
+        staff = resolver.role(guild, "team_lead")
         overwrites = {
             guild.default_role: discord.PermissionOverwrite(view_channel=False),  # Hide for everyone
             user: discord.PermissionOverwrite(view_channel=True, send_messages=True),  # Allow user
             staff: discord.PermissionOverwrite(view_channel=True, send_messages=True)  # Allow user
         }
-        channel = await guild.create_text_channel(
-            name=f"ticket-{user.name.replace('.', '-')}-{reason.lower().replace(' ', '-')}",
-            category=guild.get_channel(1414397759729172590),
-            overwrites=overwrites
-        )
-        async with aiosqlite.connect(TICKET_DATABASE) as db:
-            await db.execute("INSERT INTO tickets (channel_id, user_id, reason) VALUES (?, ?, ?)",
-                             (channel.id, user.id, reason))
-            await db.commit()
+        name = f"ticket-{user.name.replace('.', '-')}-{reason.lower().replace(' ', '-')}"
+        channel = None
+        if TICKET_MODE == "channel":
+            channel = await self.create_ticket_channel(guild, name, overwrites)
+        if channel is None:  # thread mode, or every ticket category is full
+            channel = await self.create_ticket_thread(interaction, name, user)
+        kind = "thread" if isinstance(channel, discord.Thread) else "channel"
+        if not await ticket_store.open(channel.id, user.id, reason, kind, channel.category_id if kind == "channel" else None):
+            await channel.delete(reason="Duplicate ticket")
+            return {"content": f"You already have an open ticket: <#{ticket_store.open_by_user.get(user.id)}>"}
+        idle_scheduler.schedule(channel.id)
+        await modlog.log("Ticket Opened", f"{user.mention} opened {channel.mention} ({reason})", discord.Color.purple())
         embed = discord.Embed(title="Welcome to the support channel!",
                               colour=0xae00ff)
         embed.set_author(name="Tickets")
@@ -198,30 +365,59 @@ class TicketView(discord.ui.View):
                 colour=0xae00ff
             )
             await channel.send(embed=embed)
-        else:
-            return
-        await interaction.response.send_message(
-            f"✅ Your ticket has been created: {channel.mention}", ephemeral=True
-        )
+        return {"content": f"✅ Your ticket has been created: {channel.mention}"}
+    async def create_ticket_channel(self, guild: discord.Guild, name: str, overwrites):
+        """Create the ticket channel in the first category with room; None once every category is full."""
+        while True:
+            category = ticket_categories.acquire(guild)
+            if category is None:
+                _log.warning("All ticket categories are full, falling back to a private thread")
+                return None
+            try:
+                channel = await guild.create_text_channel(name=name, category=category, overwrites=overwrites)
+            except discord.HTTPException as e:
+                full = is_category_full(e)
+                ticket_categories.settle(category.id, full=full)
+                if full:
+                    continue
+                raise
+            ticket_categories.settle(category.id)
+            await ticket_categories.record(category)
+            return channel
+    async def create_ticket_thread(self, interaction: discord.Interaction, name: str, user: discord.Member):
+        parent = interaction.guild.get_channel(TICKET_SUPPORT_CHANNEL_ID) if TICKET_SUPPORT_CHANNEL_ID else interaction.channel
+        thread = await parent.create_thread(name=name[:100], type=discord.ChannelType.private_thread, invitable=False)
+        await thread.add_user(user)  # staff join when their roles are mentioned in the greeting
+        return thread
     @discord.ui.button(label="Become a member", emoji="⭐", style=discord.ButtonStyle.green, custom_id="become_a_member")
+    @metrics.timed("ticket form: become a member")
     async def become_a_member(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if await self.already_open(interaction):
+            return
         await interaction.response.send_modal(
             TicketMemberModal(reason="become a member", interaction=interaction, parent_view=self))
     @discord.ui.button(label="Ask a Question", emoji="❓", style=discord.ButtonStyle.primary, custom_id="ask_question")
+    @metrics.timed("ticket: ask a question")
     async def ask_question(self, interaction: discord.Interaction, button: discord.ui.Button):
         await self.create_ticket(interaction, "Ask a Question", "")
     @discord.ui.button(label="Need Support", emoji="🧩", style=discord.ButtonStyle.primary, custom_id="need_support")
+    @metrics.timed("ticket: need support")
     async def need_support(self, interaction: discord.Interaction, button: discord.ui.Button):
         await self.create_ticket(interaction, "Need Support", "")
     @discord.ui.button(label="Report a Bug", emoji="🐛", style=discord.ButtonStyle.blurple, custom_id="report_bug")
+    @metrics.timed("ticket: report a bug")
     async def report_bug(self, interaction: discord.Interaction, button: discord.ui.Button):
         await self.create_ticket(interaction, "Report a Bug", "")
     @discord.ui.button(label="Report a User", emoji="⛑️", style=discord.ButtonStyle.danger, custom_id="report_user")
+    @metrics.timed("ticket form: report a user")
     async def report_user(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if await self.already_open(interaction):
+            return
         await interaction.response.send_modal(
             TicketReportModal(reason="report a user", interaction=interaction, parent_view=self))
     @discord.ui.button(label="Appeal Punishment", emoji="⚠️", style=discord.ButtonStyle.danger,
                        custom_id="appeal_punishment")
+    @metrics.timed("ticket: appeal punishment")
     async def appeal_punishment(self, interaction: discord.Interaction, button: discord.ui.Button):
         await self.create_ticket(interaction, "Appeal Punishment", "")
 class TicketCloseView(View):
@@ -231,35 +427,93 @@ class TicketCloseView(View):
         self.channel_id = channel_id
         self.ticket_creator_id = ticket_creator_id
     @discord.ui.button(label="Confirm", style=discord.ButtonStyle.green)
+    @metrics.timed("ticket close")
     async def confirm_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Handle the 'Confirm' button click."""
         await self.close_ticket(interaction)
     @discord.ui.button(label="Leave Open/Cancel", style=discord.ButtonStyle.red)
+    @metrics.timed("ticket close cancel")
     async def cancel_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Handle the 'Cancel' button click."""
         await interaction.response.send_message("Ticket closure has been canceled.", ephemeral=True)
     async def close_ticket(self, interaction: discord.Interaction):
         """Function to close and archive the ticket."""
-        async with aiosqlite.connect(TICKET_DATABASE) as db:
-            cursor = await db.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (self.channel_id,))
-            result = await cursor.fetchone()
-            if not result:
-                await interaction.response.send_message("This channel is not a ticket.", ephemeral=True)
-                return
-            ticket_creator_id = result[0]
-            await db.execute("DELETE FROM tickets WHERE channel_id = ?", (self.channel_id,))
-            await db.commit()
-            channel = interaction.channel
-            user_to_remove = interaction.guild.get_member(self.ticket_creator_id)
-            if user_to_remove:
-                await channel.set_permissions(user_to_remove, view_channel=False)
-            archive_category = discord.utils.get(interaction.guild.categories, id=1414429643003527339)
-            if archive_category:
-                await channel.edit(category=archive_category)
-                await channel.send("🔒 This ticket has been archived and is now private.")
-            else:
-                await channel.send("⚠️ Archive category not found. Please check the category ID.")
-            await interaction.response.send_message("Ticket has been closed and archived.", ephemeral=True)
+        result = await db[TICKET_DATABASE].fetchone("SELECT user_id FROM tickets WHERE channel_id = ? AND status = ?",
+                                                     (self.channel_id, STATUS_OPEN))
+        if not result:
+            await interaction.response.send_message("This channel is not a ticket.", ephemeral=True)
+            return
+        # No timeout: streaming a long ticket's history can take minutes, and a cut-off archive is worthless.
+        await respond_first(interaction, "ticket close", lambda: self.archive_ticket(interaction, result[0]),
+                            timeout=None)
+    async def archive_ticket(self, interaction: discord.Interaction, ticket_creator_id: int):
+        if DELETE_TICKET_AFTER_ARCHIVE:
+            await interaction.followup.send("Ticket transcript saved, deleting this channel...", ephemeral=True)
+        return await archive_ticket(interaction.channel, interaction.user, ticket_creator_id)
+async def archive_ticket(channel, closed_by: discord.abc.User, ticket_creator_id: int):
+    """Save the transcript, mark the ticket closed, then delete or archive the channel."""
+    from utils.transcripts import archive_channel  # loaded on the first close, not at startup
+    transcript = await archive_channel(channel, f"ticket-{channel.id}", with_html=TRANSCRIPT_HTML)
+    async with db[TICKET_DATABASE].transaction() as tx:
+        await tx.execute(
+            "INSERT OR REPLACE INTO ticket_transcripts (channel_id, user_id, reason, path, html_path, message_count, "
+            "compressed_bytes, closed_by, archived_at) "
+            "SELECT channel_id, user_id, reason, ?, ?, ?, ?, ?, ? FROM tickets WHERE channel_id = ?",
+            (transcript["path"], transcript["html_path"], transcript["messages"], transcript["bytes"],
+             closed_by.id, int(datetime.now().timestamp()), channel.id)
+        )
+        await ticket_store.close(tx, channel.id)
+    await modlog.log("Ticket Closed", f"{closed_by.mention} closed {channel.mention} "
+                                      f"(opened by <@{ticket_creator_id}>, {transcript['messages']} messages archived)",
+                     discord.Color.dark_grey())
+    if DELETE_TICKET_AFTER_ARCHIVE:
+        await channel.delete(reason=f"Ticket closed by {closed_by}")
+        return None
+    user_to_remove = await get_member(channel.guild, ticket_creator_id)
+    if isinstance(channel, discord.Thread):
+        await channel.send("🔒 This ticket has been archived and is now private.")
+        if user_to_remove:
+            await channel.remove_user(user_to_remove)
+        await channel.edit(archived=True, locked=True)
+        return {"content": "Ticket has been closed and archived."}
+    if user_to_remove:
+        await channel.set_permissions(user_to_remove, view_channel=False)
+    archive_category = archive_categories.acquire(channel.guild)
+    if archive_category:
+        try:
+            await channel.edit(category=archive_category)
+        except discord.HTTPException as e:
+            archive_categories.settle(archive_category.id, full=is_category_full(e))
+            raise
+        archive_categories.settle(archive_category.id)
+        await archive_categories.record(archive_category)
+        await channel.send("🔒 This ticket has been archived and is now private.")
+    else:
+        await channel.send("⚠️ Every archive category is full or missing. Please add another archive category.")
+    return {"content": "Ticket has been closed and archived."}
+async def remind_idle_ticket(channel_id: int):
+    channel = bot.get_channel(channel_id)
+    if channel is None:
+        return
+    await channel.send(f"⏰ This ticket has been quiet for a while. It will be closed automatically after "
+                       f"{AUTO_CLOSE_AFTER // 3600} hours without activity.")
+async def auto_close_ticket(channel_id: int):
+    result = await db[TICKET_DATABASE].fetchone(
+        "SELECT user_id, last_activity_at FROM tickets WHERE channel_id = ? AND status = ?", (channel_id, STATUS_OPEN))
+    if not result:
+        return
+    ticket_store.seen(channel_id, result[1])
+    due = idle_scheduler.deadline(channel_id)
+    if due and due[0] > time.time():  # active since it was scheduled, just not through this process
+        idle_scheduler.schedule(channel_id)
+        return
+    try:
+        channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
+    except discord.NotFound:
+        async with db[TICKET_DATABASE].transaction() as tx:
+            await ticket_store.close(tx, channel_id)
+        return
+    await archive_ticket(channel, bot.user, result[0])
 class TicketReportModal(discord.ui.Modal, title="Player Report Form"):
     name = discord.ui.TextInput(
         label="What is your Minecraft username?",
@@ -296,6 +550,7 @@ class TicketReportModal(discord.ui.Modal, title="Player Report Form"):
         self.reason = reason
         self.interaction = interaction
         self.parent_view = parent_view
+    @metrics.timed("ticket: report a user")
     async def on_submit(self, interaction: discord.Interaction):
         answers = {
             "name": self.name.value,
@@ -341,6 +596,7 @@ class TicketMemberModal(discord.ui.Modal, title="Revelation Member Application")
         self.reason = reason
         self.interaction = interaction
         self.parent_view = parent_view
+    @metrics.timed("ticket: become a member")
     async def on_submit(self, interaction: discord.Interaction):
         answers = {
             "name": self.name.value,
@@ -351,6 +607,191 @@ class TicketMemberModal(discord.ui.Modal, title="Revelation Member Application")
 
         }
         await self.parent_view.create_ticket(interaction, self.reason, answers)
+def verification_panel():
+    embed = discord.Embed(
+        title="Welcome to Revelation",
+        description=(
+            "Please verify by pressing the button below to ensure you are not a bot!\n\n**⸻⸻⸻⸻⸻⸻⸻⸻⸻⸻**\n\n"
+            "> **Welcome to Revelation!**  \n\n"
+            "```\nPvP | Building | Training\n```\n\n"
+            "**Revelations** is a multi-server PvP team created by **ADF**, dedicated to exploring and dominating"
+            "Minecraft servers!  \n\n"
+            "We're powerful and feared among many, home to some of EYserver's best PvP-ers.\n"
+            "- ADF\n"
+            "- 1111KING\n"
+            "- NSH\n"
+            "- Biga252\n"
+            "- and more"
+            "\n\nGet ready to experience the raw power of REVELATION"
+        ),
+        colour=discord.Color.red(),
+        timestamp=datetime.now()
+    )
+    embed.set_author(name="Verification required")
+    embed.set_image(url="https://cdn.discordapp.com/banners/1414399114816393246/573ed7d1738cb1327e0a3db5a117aa45.png?size=512")
+    embed.set_thumbnail(url="https://dan.onl/images/emptysong.jpg")
+    embed.set_footer(text="Powered by: ADF Industries, LLC", icon_url="https://slate.dan.onl/slate.png")
+    return [embed]
+def information_panel():
+    embed = discord.Embed(title="Welcome to ADF Industries!",
+                          description="Welcome to the ADF Industries official discord server! Whether you're here to chat or are seeking support for one of our products, we have something for everyone.\n\n**Who are we?**\n    ADF Industries began as a small organization in 2021 founded by Rylen Reis, with Jordan Kadi as the co-founder. The organization consisted of 6 people. Rylen, Jordan, Johnathan, Ayden, Emileo, and Kile, offering configurations or setup for common things. Minecraft servers, websites, or even game creation - We had you covered!\n    As we got more and more experience throughout the years, we decided that we should expand our services to a greater audience. In 2023, we migrated to discord. This allowed us to reach a greater audience when advertising, and gave us yet another service to offer; Discord server setup. \n    In October of 2023, Rylen, the founder of ADF Industries decided that he wanted to do more than to just set things up. He wanted to experiment with things; To make them rather than configure them. One of the very first projects he launched in ADF Industries was The Game Space. The Game Space was a collection of games and entertaining apps that we developed over the years all compiled into one page. \n    The project was later archived in November. Replaced with a new project: ADF Private Chat. ADF Private Chat was one of the most worked on apps of the time and was not later released until early December. ADF Private Chat was a simple yet appealing chat application that allowed users to chat with one another. Rylen's main motive for this was to be able to seamlessly communicate with classmates while in school, as they tend to block most forms of communication. Unfortunately, one of the websites that the app ran off of was shut down, and the project fell into dis-repair.\n    After ADF Private Chat went offline, the company shifted, into Minecraft. Creating servers and plugins, and since then, they've split into departments. Rylen; Head of operations, Jordan; Head of Departments, Johnathan; Head of website development, Ayden; Head of Backend programming, Kile; Head of Frontend programming, Emileo; Head of Minecraft Development. Since then, ADF Industries has created several plugins, apps, servers, websites, and Discord bots!",
+                          colour=0x00ff9d,
+                          timestamp=datetime.now())
+    embed.set_author(name="Information!")
+    embed.add_field(name="Additional information",
+                    value="🛍️|  Interested in our products? Check out: <#1346597134153027675>!\n🗨️|  Wanna chat with ADF? Go to: <#1330798539239985203>\n🧩|  Need support? <#1346510921023094814> is the place to go!\n🐛|  Found a bug? Post it in <#1346511753516941333>!",
+                    inline=False)
+    embed.add_field(name="Links",
+                    value="[Coming soon!](https://www.example.com)\n[Coming soon!](https://www.example.com)\n[Coming soon!](https://www.example.com)\n[Coming soon!](https://www.example.com)",
+                    inline=False)
+    embed.set_image(url="https://cubedhuang.com/images/alex-knight-unsplash.webp")
+    embed.set_footer(text="ADF Industries, LLC",
+                     icon_url="https://slate.dan.onl/slate.png")
+    return [embed]
+def tickets_panel():
+    embed = discord.Embed(title="Need support?",
+                          colour=0xffc800,
+                          timestamp=datetime.now())
+    embed.set_author(name="Tickets")
+    embed.add_field(name="What to make a ticket for:",
+                    value="⭐|  Looking to become a member?\n❓|  Have questions for us?\n🧩|  Reporting someone/Need support?\n🐛|  Found a bug?\n⚠️|  Punishment Appeals?",
+                    inline=True)
+
+    embed.set_image(url="https://cdn.discordapp.com/banners/1414399114816393246/573ed7d1738cb1327e0a3db5a117aa45.png?size=512")
+    embed.set_footer(text="ADF Industries, LLC",
+                     icon_url="https://slate.dan.onl/slate.png")
+    return [embed]
+def rules_panel():
+    embed1 = discord.Embed(
+        title="Server Rules - Part 1",
+        description="Please follow the rules to ensure a great experience for everyone.",
+        color=discord.Color.blue()
+    )
+    embed1.add_field(name="1. Be respectful", value="Treat everyone with kindness and respect.", inline=False)
+    embed1.add_field(name="2. Abide by Discord ToS", value="Follow Discord's Terms of Service at all times.",
+                     inline=False)
+    embed1.add_field(name="3. Use family-friendly language",
+                     value="Keep your language appropriate for all audiences.", inline=False)
+    embed1.add_field(name="4. No advertising", value="No unsolicited advertising or self-promotion.", inline=False)
+    embed2 = discord.Embed(
+        title="Server Rules - Part 2",
+        description="Please continue to follow the rules for a better experience.",
+        color=discord.Color.green()
+    )
+    embed2.add_field(name="5. Abide by our ToS", value="Ensure you follow our Terms of Service.", inline=False)
+    embed2.add_field(name="6. Do NOT ask for support in #﹝🌍﹞chat",
+                     value="Support requests should be handled in the proper channels.", inline=False)
+    embed2.add_field(name="7. Do not ping staff", value="Avoid unnecessarily pinging staff members.", inline=False)
+    embed2.add_field(name="8. Keep channels respective to their purpose",
+                     value="Each channel has a specific purpose. Stay on-topic.", inline=False)
+    embed3 = discord.Embed(
+        title="Server Rules - Part 3",
+        description="Please be mindful of the community rules.",
+        color=discord.Color.orange()
+    )
+    embed3.add_field(name="9. No spamming, chatwalling, flooding, or disruptions of chat",
+                     value="Do not spam, flood, or disrupt the chat.", inline=False)
+    embed3.add_field(name="10. Do NOT DM staff for support",
+                     value="Contact support through the appropriate channels.", inline=False)
+
+    embed4 = discord.Embed(
+        title="Server Rules - Part 4",
+        description="Please respect these rules, they're important!",
+        color=discord.Color.red()
+    )
+    embed4.add_field(name="11. Do not ping Nicole/N1nsoka",
+                     value="Do not ping them, including reply pings! You **will** be punished!", inline=False)
+    embed4.add_field(name="12. Do NOT ask for support for other servers.",
+                     value="Support requests should be directly related to this server. (**NOT EYSERVER**)",
+                     inline=False)
+    embed6 = discord.Embed(
+        title="Server Rules - Part 5",
+        description="Respect everyone's privacy.",
+        color=discord.Color.teal()
+    )
+    embed6.add_field(
+        name="13. Do not share or ask about personal information",
+        value="Do not discuss or ask about someone's private information (e.g., age, real name, face) unless they explicitly allow it.",
+        inline=False
+    )
+    embed7 = discord.Embed(
+        title="Server Rules - Part 6",
+        description="Ethical behavior is expected from all members.",
+        color=discord.Color.gold()
+    )
+    embed7.add_field(
+        name="14. Maintain ethical conduct",
+        value="Treat others fairly and act with integrity. Toxic, manipulative, or unethical behavior will not be tolerated.",
+        inline=False
+    )
+    embed7.add_field(
+        name=" **14**.1 Dox, SWATs, DDoS",
+        value="Attempting to or threatening to dox, SWAT, or DDoS will **not** be tolorated, and will result in a permanent ban.",
+        inline=False
+    )
+    embed8 = discord.Embed(
+        title="Server Rules - Part 7",
+        description="Certain client modifications are not allowed.",
+        color=discord.Color.dark_red()
+    )
+    embed8.add_field(
+        name="15. Vencord plugin restrictions",
+        value="Use of any Vencord plugins that display hidden channels or deleted/edited messages is strictly prohibited. "
+              "You will receive two warnings. After the third offense, a punishment will be issued.",
+        inline=False
+    )
+    embed9 = discord.Embed(
+        title="Server Rules - Part 8",
+        description="Use your best judgment.",
+        color=discord.Color.dark_purple()
+    )
+    embed9.add_field(
+        name="16. Use common sense",
+        value="Not every rule can cover every situation. Use common sense and act in a way that maintains a positive, safe community.",
+        inline=False
+    )
+    tosEmbed = discord.Embed(
+        title="Terms of Service",
+        description="Please review our Terms of Service here.",
+        color=discord.Color.purple()
+    )
+    tosEmbed.add_field(name="Terms of Service",
+                     value="[Click here to read our Terms of Service](https://docs.google.com/document/d/1L3DsEAZ-ojuh1Fe7UmjCqgYajyv1mv3oyCWzkslv2JQ/edit?pli=1&tab=t.0#heading=h.xaiwsnsomrhf)",
+                     inline=False)
+    return [embed1, embed2, embed3, embed4, embed6, embed7, embed8, embed9, tosEmbed]
+def anti_raid_panel():
+    embed = discord.Embed(
+        title="🚨 A Raid Has Been Detected! 🚨",
+        description=(
+            "### Immediate Action Required!\n\n"
+            "---\n\n"
+            "> **A potential raid has been detected on ADF Industries!**\n\n"
+            "```\nSecurity | Protection | Stability\n```\n\n"
+            "Our automated security system has flagged **unusual activity** that may indicate a coordinated attack. "
+            "To protect our community, additional **security measures** have been activated.\n\n"
+            "**What does this mean?**\n"
+            "🔹 Temporary restrictions may apply.\n"
+            "🔹 New users will require manual verification.\n"
+            "🔹 Staff intervention may be necessary.\n\n"
+            "If you believe this is a false alarm, please contact an **Administrator** immediately.\n\n"
+            "[🛡️ Learn More About Security](https://example.com)\n\n"
+            "**Stay vigilant and keep our community safe!**\n\n"
+            "||Our systems continuously monitor and improve to prevent threats.||"
+        ),
+        color=0xFF0000,
+        timestamp=datetime.now()
+    )
+    embed.set_author(name="Security Alert", icon_url="https://example.com/security-icon.png")
+    embed.set_image(url="https://cubedhuang.com/images/security-alert.webp")
+    embed.set_thumbnail(url="https://dan.onl/images/warning-icon.jpg")
+    embed.set_footer(text="ADF Industries Security", icon_url="https://slate.dan.onl/slate.png")
+    return [embed]
+# Panels are built once at startup; /master only posts or edits what's cached here.
+panels.register("vp", "Verification Panel", verification_panel(), view=lambda: VerificationView(bot, 1414363675552252048))
+panels.register("ip", "Informations Panel", information_panel())
+panels.register("tp", "Tickets Panel", tickets_panel(), view=TicketView)
+panels.register("rp", "Rules Panel", rules_panel())
+panels.register("arp", "Anti-Raid Panel", anti_raid_panel())
 @bot.tree.command(name="master", description="Master command")
 @app_commands.describe(
     action="Choose an action.",
@@ -368,238 +809,206 @@ async def master(interaction: discord.Interaction, action: str):
     if interaction.user.id != 1248492933875765328:
         await interaction.response.send_message("You are not permitted to use this command", ephemeral=True)
         return
-    if action == "vp":
-        embed = discord.Embed(
-            title="Welcome to Revelation",
-            description=(
-                "Please verify by pressing the button below to ensure you are not a bot!\n\n**⸻⸻⸻⸻⸻⸻⸻⸻⸻⸻**\n\n"
-                "> **Welcome to Revelation!**  \n\n"
-                "```\nPvP | Building | Training\n```\n\n"
-                "**Revelations** is a multi-server PvP team created by **ADF**, dedicated to exploring and dominating"
-                "Minecraft servers!  \n\n"
-                "We're powerful and feared among many, home to some of EYserver's best PvP-ers.\n"
-                "- ADF\n"
-                "- 1111KING\n"
-                "- NSH\n"
-                "- Biga252\n"
-                "- and more"
-                "\n\nGet ready to experience the raw power of REVELATION"
-            ),
-            colour=discord.Color.red(),
-            timestamp=datetime.now()
-        )
-        embed.set_author(name="Verification required")
-        embed.set_image(url="https://cdn.discordapp.com/banners/1414399114816393246/573ed7d1738cb1327e0a3db5a117aa45.png?size=512")
-        embed.set_thumbnail(url="https://dan.onl/images/emptysong.jpg")
-        embed.set_footer(text="Powered by: ADF Industries, LLC", icon_url="https://slate.dan.onl/slate.png")
-        view = VerificationView(bot, 1414363675552252048)
-        await interaction.response.send_message("Sending Verification Panel...", ephemeral=True)
-        await interaction.channel.send(embed=embed, view=view)
-    elif action == "ip":
-        embed = discord.Embed(title="Welcome to ADF Industries!",
-                              description="Welcome to the ADF Industries official discord server! Whether you're here to chat or are seeking support for one of our products, we have something for everyone.\n\n**Who are we?**\n    ADF Industries began as a small organization in 2021 founded by Rylen Reis, with Jordan Kadi as the co-founder. The organization consisted of 6 people. Rylen, Jordan, Johnathan, Ayden, Emileo, and Kile, offering configurations or setup for common things. Minecraft servers, websites, or even game creation - We had you covered!\n    As we got more and more experience throughout the years, we decided that we should expand our services to a greater audience. In 2023, we migrated to discord. This allowed us to reach a greater audience when advertising, and gave us yet another service to offer; Discord server setup. \n    In October of 2023, Rylen, the founder of ADF Industries decided that he wanted to do more than to just set things up. He wanted to experiment with things; To make them rather than configure them. One of the very first projects he launched in ADF Industries was The Game Space. The Game Space was a collection of games and entertaining apps that we developed over the years all compiled into one page. \n    The project was later archived in November. Replaced with a new project: ADF Private Chat. ADF Private Chat was one of the most worked on apps of the time and was not later released until early December. ADF Private Chat was a simple yet appealing chat application that allowed users to chat with one another. Rylen's main motive for this was to be able to seamlessly communicate with classmates while in school, as they tend to block most forms of communication. Unfortunately, one of the websites that the app ran off of was shut down, and the project fell into dis-repair.\n    After ADF Private Chat went offline, the company shifted, into Minecraft. Creating servers and plugins, and since then, they've split into departments. Rylen; Head of operations, Jordan; Head of Departments, Johnathan; Head of website development, Ayden; Head of Backend programming, Kile; Head of Frontend programming, Emileo; Head of Minecraft Development. Since then, ADF Industries has created several plugins, apps, servers, websites, and Discord bots!",
-                              colour=0x00ff9d,
-                              timestamp=datetime.now())
-        embed.set_author(name="Information!")
-        embed.add_field(name="Additional information",
-                        value="🛍️|  Interested in our products? Check out: <#1346597134153027675>!\n🗨️|  Wanna chat with ADF? Go to: <#1330798539239985203>\n🧩|  Need support? <#1346510921023094814> is the place to go!\n🐛|  Found a bug? Post it in <#1346511753516941333>!",
-                        inline=False)
-        embed.add_field(name="Links",
-                        value="[Coming soon!](https://www.example.com)\n[Coming soon!](https://www.example.com)\n[Coming soon!](https://www.example.com)\n[Coming soon!](https://www.example.com)",
-                        inline=False)
-        embed.set_image(url="https://cubedhuang.com/images/alex-knight-unsplash.webp")
-        embed.set_footer(text="ADF Industries, LLC",
-                         icon_url="https://slate.dan.onl/slate.png")
-        await interaction.response.send_message("Sending Informations Panel...", ephemeral=True)
-        await interaction.channel.send(embed=embed)
-    elif action == "tp":
-        embed = discord.Embed(title="Need support?",
-                              colour=0xffc800,
-                              timestamp=datetime.now())
-        embed.set_author(name="Tickets")
-        embed.add_field(name="What to make a ticket for:",
-                        value="⭐|  Looking to become a member?\n❓|  Have questions for us?\n🧩|  Reporting someone/Need support?\n🐛|  Found a bug?\n⚠️|  Punishment Appeals?",
-                        inline=True)
+    panel = panels.panels.get(action)
+    if panel is None:
+        await interaction.response.send_message("Invalid action!", ephemeral=True)
+        return
+    async def deploy():
+        result = await panels.deploy(action, interaction.channel)
+        return {"content": {
+            "posted": f"{panel.label} sent.",
+            "edited": f"{panel.label} updated in place.",
+            "unchanged": f"{panel.label} is already up to date.",
+        }[result]}
+    await respond_first(interaction, f"master: {action}", deploy)
+@bot.tree.command(name="close", guild=discord.Object(id=int(1414363675552252048)))
+async def close(interaction: discord.Interaction):
+    """Closes a ticket by making it private and moving it to an archive category."""
+    result = await db[TICKET_DATABASE].fetchone("SELECT user_id FROM tickets WHERE channel_id = ? AND status = ?",
+                                                 (interaction.channel.id, STATUS_OPEN))
+    if not result:
+        await interaction.response.send_message("This channel is not a ticket.", ephemeral=True)
+        return
+    embed = discord.Embed(title="Are you sure?", description="Do you want to close and archive this ticket?",
+                          color=discord.Color.dark_red())
+    view = TicketCloseView(interaction, interaction.channel.id, interaction.user.id)
+    await interaction.response.send_message(embed=embed, view=view)
 
-        embed.set_image(url="https://cdn.discordapp.com/banners/1414399114816393246/573ed7d1738cb1327e0a3db5a117aa45.png?size=512")
-        embed.set_footer(text="ADF Industries, LLC",
-                         icon_url="https://slate.dan.onl/slate.png")
-        view = TicketView()
-        await interaction.response.send_message("Sending Informations Panel...", ephemeral=True)
-        await interaction.channel.send(embed=embed, view=view)
-    elif action == "rp":
-        embed1 = discord.Embed(
-            title="Server Rules - Part 1",
-            description="Please follow the rules to ensure a great experience for everyone.",
-            color=discord.Color.blue()
-        )
-        embed1.add_field(name="1. Be respectful", value="Treat everyone with kindness and respect.", inline=False)
-        embed1.add_field(name="2. Abide by Discord ToS", value="Follow Discord's Terms of Service at all times.",
-                         inline=False)
-        embed1.add_field(name="3. Use family-friendly language",
-                         value="Keep your language appropriate for all audiences.", inline=False)
-        embed1.add_field(name="4. No advertising", value="No unsolicited advertising or self-promotion.", inline=False)
-        embed2 = discord.Embed(
-            title="Server Rules - Part 2",
-            description="Please continue to follow the rules for a better experience.",
-            color=discord.Color.green()
-        )
-        embed2.add_field(name="5. Abide by our ToS", value="Ensure you follow our Terms of Service.", inline=False)
-        embed2.add_field(name="6. Do NOT ask for support in #﹝🌍﹞chat",
-                         value="Support requests should be handled in the proper channels.", inline=False)
-        embed2.add_field(name="7. Do not ping staff", value="Avoid unnecessarily pinging staff members.", inline=False)
-        embed2.add_field(name="8. Keep channels respective to their purpose",
-                         value="Each channel has a specific purpose. Stay on-topic.", inline=False)
-        embed3 = discord.Embed(
-            title="Server Rules - Part 3",
-            description="Please be mindful of the community rules.",
-            color=discord.Color.orange()
-        )
-        embed3.add_field(name="9. No spamming, chatwalling, flooding, or disruptions of chat",
-                         value="Do not spam, flood, or disrupt the chat.", inline=False)
-        embed3.add_field(name="10. Do NOT DM staff for support",
-                         value="Contact support through the appropriate channels.", inline=False)
+@bot.tree.command(name="claim", guild=discord.Object(id=int(1414363675552252048)))
+async def claim(interaction: discord.Interaction):
+    """Claims the ticket in this channel so other staff know it's handled."""
+    if not ticket_store.is_open(interaction.channel.id):
+        await interaction.response.send_message("This channel is not an open ticket.", ephemeral=True)
+        return
+    if not await ticket_store.claim(interaction.channel.id, interaction.user.id):
+        await interaction.response.send_message("This ticket has already been claimed.", ephemeral=True)
+        return
+    await interaction.response.send_message(f"🙋 {interaction.user.mention} has claimed this ticket.")
 
-        embed4 = discord.Embed(
-            title="Server Rules - Part 4",
-            description="Please respect these rules, they're important!",
-            color=discord.Color.red()
-        )
-        embed4.add_field(name="11. Do not ping Nicole/N1nsoka",
-                         value="Do not ping them, including reply pings! You **will** be punished!", inline=False)
-        embed4.add_field(name="12. Do NOT ask for support for other servers.",
-                         value="Support requests should be directly related to this server. (**NOT EYSERVER**)",
-                         inline=False)
-        embed6 = discord.Embed(
-            title="Server Rules - Part 5",
-            description="Respect everyone's privacy.",
-            color=discord.Color.teal()
-        )
-        embed6.add_field(
-            name="13. Do not share or ask about personal information",
-            value="Do not discuss or ask about someone's private information (e.g., age, real name, face) unless they explicitly allow it.",
-            inline=False
-        )
-        embed7 = discord.Embed(
-            title="Server Rules - Part 6",
-            description="Ethical behavior is expected from all members.",
-            color=discord.Color.gold()
-        )
-        embed7.add_field(
-            name="14. Maintain ethical conduct",
-            value="Treat others fairly and act with integrity. Toxic, manipulative, or unethical behavior will not be tolerated.",
-            inline=False
-        )
-        embed7.add_field(
-            name=" **14**.1 Dox, SWATs, DDoS",
-            value="Attempting to or threatening to dox, SWAT, or DDoS will **not** be tolorated, and will result in a permanent ban.",
-            inline=False
-        )
-        embed8 = discord.Embed(
-            title="Server Rules - Part 7",
-            description="Certain client modifications are not allowed.",
-            color=discord.Color.dark_red()
-        )
-        embed8.add_field(
-            name="15. Vencord plugin restrictions",
-            value="Use of any Vencord plugins that display hidden channels or deleted/edited messages is strictly prohibited. "
-                  "You will receive two warnings. After the third offense, a punishment will be issued.",
-            inline=False
-        )
-        embed9 = discord.Embed(
-            title="Server Rules - Part 8",
-            description="Use your best judgment.",
-            color=discord.Color.dark_purple()
-        )
-        embed9.add_field(
-            name="16. Use common sense",
-            value="Not every rule can cover every situation. Use common sense and act in a way that maintains a positive, safe community.",
-            inline=False
-        )
-        tosEmbed = discord.Embed(
-            title="Terms of Service",
-            description="Please review our Terms of Service here.",
-            color=discord.Color.purple()
-        )
-        tosEmbed.add_field(name="Terms of Service",
-                         value="[Click here to read our Terms of Service](https://docs.google.com/document/d/1L3DsEAZ-ojuh1Fe7UmjCqgYajyv1mv3oyCWzkslv2JQ/edit?pli=1&tab=t.0#heading=h.xaiwsnsomrhf)",
-                         inline=False)
-        await interaction.response.send_message("Sending Rules Panel...", ephemeral=True)
-        await interaction.channel.send(embeds=[embed1, embed2, embed3, embed4, embed6, embed7, embed8, embed9, tosEmbed])
-    if action == "arp":
-        embed = discord.Embed(
-            title="🚨 A Raid Has Been Detected! 🚨",
-            description=(
-                "### Immediate Action Required!\n\n"
-                "---\n\n"
-                "> **A potential raid has been detected on ADF Industries!**\n\n"
-                "```\nSecurity | Protection | Stability\n```\n\n"
-                "Our automated security system has flagged **unusual activity** that may indicate a coordinated attack. "
-                "To protect our community, additional **security measures** have been activated.\n\n"
-                "**What does this mean?**\n"
-                "🔹 Temporary restrictions may apply.\n"
-                "🔹 New users will require manual verification.\n"
-                "🔹 Staff intervention may be necessary.\n\n"
-                "If you believe this is a false alarm, please contact an **Administrator** immediately.\n\n"
-                "[🛡️ Learn More About Security](https://example.com)\n\n"
-                "**Stay vigilant and keep our community safe!**\n\n"
-                "||Our systems continuously monitor and improve to prevent threats.||"
-            ),
-            color=0xFF0000,
-            timestamp=datetime.now()
+@bot.command(name="ticketstats")
+@commands.has_permissions(administrator=True)
+async def ticketstats(ctx: commands.Context):
+    """Shows ticket counts by status and the longest-idle open tickets."""
+    counts = await ticket_store.counts()
+    lines = [" — ".join(f"**{status}**: {count}" for status, count in sorted(counts.items())) or "No tickets yet."]
+    for channel_id, user_id, last_activity in await ticket_store.stale(REMIND_AFTER):
+        lines.append(f"<#{channel_id}> (<@{user_id}>) idle since <t:{last_activity}:R>")
+    lines.append(f"Activity: {ticket_store.touches} messages, {ticket_store.writes} row writes")
+    await ctx.send("\n".join(lines))
+
+@bot.command(name="lockdown")
+@commands.has_permissions(administrator=True)
+async def lockdown(ctx: commands.Context, action: str = "status"):
+    """`!lockdown on|off|status`: start or lift a raid lockdown, or show the detector's current score."""
+    detector = raid_monitor.detectors[ctx.guild.id]
+    if action == "on":
+        started = await start_lockdown(ctx.guild, f"{ctx.author.mention} started a manual lockdown")
+        await ctx.send("🔒 Lockdown started." if started else "Already in lockdown.")
+    elif action == "off":
+        await ctx.send("🔓 Lockdown lifted." if await end_lockdown(ctx.guild, ctx.author) else "Not in lockdown.")
+    else:
+        await ctx.send(
+            f"{'🔒 Locked down' if raid_monitor.is_locked(ctx.guild.id) else '🔓 Normal'} — "
+            f"score {detector.score:.2f} (peak {detector.peak:.2f}), {detector.joins.count} joins and "
+            f"{detector.attempts.count} verification attempts in the last window, {detector.events} events seen"
         )
-        embed.set_author(name="Security Alert", icon_url="https://example.com/security-icon.png")
-        embed.set_image(url="https://cubedhuang.com/images/security-alert.webp")
-        embed.set_thumbnail(url="https://dan.onl/images/warning-icon.jpg")
-        embed.set_footer(text="ADF Industries Security", icon_url="https://slate.dan.onl/slate.png")
-        view = None
-        await interaction.response.send_message("Sending Anti-Raid Panel...", ephemeral=True)
-        await interaction.channel.send(embed=embed, view=view)
+
+@bot.command(name="dmstats")
+@commands.has_permissions(administrator=True)
+async def dmstats(ctx: commands.Context):
+    """Shows the outbound DM queue: depth per priority, wait and send latency, and drops."""
+    depth = dm_dispatcher.depth()
+    lines = ["**DM queue**: " + ", ".join(f"{name} {count}" for name, count in depth.items()),
+             ", ".join(f"{event} {count}" for event, count in sorted(dm_dispatcher.stats.items())) or "Nothing sent yet."]
+    for name, (count, p50, p99) in sorted(dm_dispatcher.wait_times.summary().items()):
+        _, send_p50, send_p99 = dm_dispatcher.send_times.summary()[name]
+        lines.append(f"`{name}`: {count} — queued {p50:.0f} / {p99:.0f} ms, send {send_p50:.0f} / {send_p99:.0f} ms (p50 / p99)")
+    await ctx.send("\n".join(lines))
+
+@bot.command(name="dbstats")
+@commands.has_permissions(administrator=True)
+async def dbstats(ctx: commands.Context, reset: str = None):
+    """Shows database throughput since the last reset (`!dbstats reset` to start a new window)."""
+    stats = db.stats.snapshot()
+    await ctx.send(
+        f"🗄️ {stats['queries']} queries in {stats['window_s']}s — "
+        f"**{stats['qps']} qps** (avg {stats['avg_ms']} ms, {stats['busy_qps']} qps while busy)"
+    )
+    if reset == "reset":
+        db.stats.reset()
+
+@bot.command(name="ackstats")
+@commands.has_permissions(administrator=True)
+async def ackstats(ctx: commands.Context):
+    """Shows time-to-acknowledge and background side effect timings per command."""
+    lines = ["**Time to ack** (n, p50, p99)"]
+    for name, (count, p50, p99) in sorted(ack_times.summary().items()):
+        lines.append(f"`{name}`: {count} — {p50:.0f} ms / {p99:.0f} ms")
+    lines.append("**Side effects** (n, p50, p99, failures)")
+    for name, (count, p50, p99) in sorted(task_times.summary().items()):
+        lines.append(f"`{name}`: {count} — {p50:.0f} ms / {p99:.0f} ms, {side_effects.failures[name]} failed")
+    await ctx.send("\n".join(lines))
+
+@bot.command(name="reloads")
+@commands.has_permissions(administrator=True)
+async def reloads(ctx: commands.Context):
+    """Shows recent hot reloads and how long each extension takes to reload (needs HOT_RELOAD=1)."""
+    if not HOT_RELOAD:
+        return await ctx.send("Hot reload is off; start the bot with `HOT_RELOAD=1` to watch `cogs/`.")
+    lines = [f"`{name}`: {count} reload(s), {p50:.0f} / {p99:.0f} ms (p50 / p99)"
+             for name, (count, p50, p99) in sorted(hot_reload.times.summary().items())]
+    lines += [f"<t:{at}:T> `{name}` {outcome} in {ms:.0f} ms" for at, name, ms, outcome in list(hot_reload.history)[-10:]]
+    await ctx.send("\n".join(lines) or "No reloads yet.")
+
+@bot.command(name="clusters")
+@commands.has_permissions(administrator=True)
+async def clusters(ctx: commands.Context):
+    """Shows each cluster's shards, guilds, gateway latency and event rate."""
+    if ipc.enabled:
+        stats = await ipc.cluster_stats()
+        if stats is None:
+            return await ctx.send("❌ Couldn't reach the cluster launcher.")
     else:
-        await interaction.followup.send("Invalid action!", ephemeral=True)
-@bot.tree.command(name="close", guild=discord.Object(id=int(1414363675552252048)))
-async def close(interaction: discord.Interaction):
-    async with aiosqlite.connect(TICKET_DATABASE) as db:
-        cursor = await db.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
-        result = await cursor.fetchone()
-        if not result:
-            await interaction.response.send_message("This channel is not a ticket.", ephemeral=True)
-            return
-        """Closes a ticket by making it private and moving it to an archive category."""
-        embed = discord.Embed(title="Are you sure?", description="Do you want to close and archive this ticket?",
-                              color=discord.Color.dark_red())
-        view = TicketCloseView(interaction, interaction.channel.id, interaction.user.id)
-        await interaction.response.send_message(embed=embed, view=view)
+        stats = {CLUSTER_ID: {**cluster_stats(), "received": time.time()}}
+    lines = []
+    for cluster, report in sorted(stats.items(), key=lambda item: int(item[0])):
+        healthy = report["ready"] and time.time() - report["received"] < 3 * STATS_INTERVAL
+        latency = ", ".join(f"#{shard} {ms} ms" if ms is not None else f"#{shard} down"
+                            for shard, ms in report["latency_ms"].items())
+        rate = f", {report['events_per_s']} events/s" if "events_per_s" in report else ""
+        lines.append(f"{'🟢' if healthy else '🔴'} **Cluster {cluster}**: {report['guilds']} guilds, "
+                     f"{report['events']} events{rate}, {report['db_lock_waits']} DB lock waits, "
+                     f"up {report['uptime_s'] // 60} min — {latency}")
+    await ctx.send("\n".join(lines))
 
 async def load_extensions(folder: str, package: str = "cogs"):
     """Recursively load all cogs inside the given folder."""
-    for root, _, files in os.walk(folder):
-        for file in files:
-            if file.endswith(".py"):
-                relative_path = os.path.relpath(os.path.join(root, file), folder)
-                module = relative_path.replace(os.sep, ".")[:-3]  # strip .py
-                ext = f"{package}.{module}"
-                try:
-                    await bot.load_extension(ext)
-                    print(f"✅ Loaded {ext}")
-                except Exception as e:
-                    print(f"❌ Failed to load {ext}: {e}")
+    for ext in find_extensions(folder, package):
+        try:
+            await bot.load_extension(ext)
+            print(f"✅ Loaded {ext}")
+        except Exception as e:
+            print(f"❌ Failed to load {ext}: {e}")
+@bot.listen("on_guild_channel_delete")
+async def release_ticket_slot(channel):
+    if isinstance(channel, discord.CategoryChannel):
+        await ticket_categories.forget(channel.id)
+        await archive_categories.forget(channel.id)
+        return
+    await ticket_categories.channel_removed(channel.guild, channel.category_id)
+    await archive_categories.channel_removed(channel.guild, channel.category_id)
+    if ticket_store.is_open(channel.id):
+        async with db[TICKET_DATABASE].transaction() as tx:
+            await ticket_store.close(tx, channel.id)
+@bot.listen("on_guild_available")
+async def sync_ticket_categories(guild: discord.Guild):
+    if guild.id == GUILD_ID:
+        await ticket_categories.sync(guild)
+        await archive_categories.sync(guild)
+@bot.listen("on_raw_message_delete")
+async def forget_panel(payload: discord.RawMessageDeleteEvent):
+    await panels.forget(payload.message_id)
+@bot.listen("on_member_join")
+async def watch_joins(member: discord.Member):
+    if raid_monitor.join(member.guild.id, time.time(), member.created_at.timestamp(), member.name):
+        await start_lockdown(member.guild, f"Join rate tripped the raid detector "
+                                           f"(score {raid_monitor.detectors[member.guild.id].score:.2f})")
+gateway_events = collections.Counter()
+metrics.counter("revelation_gateway_events_total", "Gateway dispatch events received, by type.", ("event",),
+                collect=lambda: {(event,): count for event, count in gateway_events.items()})
+@bot.listen("on_socket_event_type")
+async def count_gateway_event(event: str):
+    gateway_events[event] += 1
+def cluster_stats() -> dict:
+    """This process's health and throughput, reported to the launcher and shown by !clusters."""
+    return {
+        "cluster": CLUSTER_ID,
+        "ready": bot.is_ready(),
+        "guilds": len(bot.guilds),
+        "latency_ms": {shard: round(latency * 1000) if math.isfinite(latency) else None
+                       for shard, latency in bot.latencies},
+        "events": sum(gateway_events.values()),
+        "top_events": gateway_events.most_common(3),
+        "db_lock_waits": db.lock_waits(),
+        "uptime_s": int(time.perf_counter() - STARTED),
+    }
+@bot.listen("on_message")
+async def track_ticket_activity(message: discord.Message):
+    if not message.author.bot:
+        ticket_store.touch(message.channel.id, message.created_at.timestamp())
+@bot.listen("on_guild_channel_update")
+async def move_ticket_slot(before, after):
+    if before.category_id != after.category_id:
+        await ticket_categories.channel_removed(after.guild, before.category_id)
+        await archive_categories.channel_removed(after.guild, before.category_id)
 @bot.event
 async def on_ready():
     _log.info(f"{bot.user} has connected to Discord!")
-    await load_extensions("cogs")
-    bot.tree.add_command(KOSGroup())
-    synced_commands = await bot.tree.sync()
-    _log.info(f"Synced {len(synced_commands)} global slash command(s).")
-    guild = discord.Object(id=1414363675552252048)
-    await bot.tree.sync(guild=guild)
-    _log.info("REVELATIONS' specific commands have been registered & synced!\n")
-    _log.info(f"Successfully loaded Revelation Bot (v1)!")
-    for guild in bot.guilds:
-        bot.add_view(VerificationView(bot, guild.id))
-    bot.add_view(TicketView())
-    activity = discord.Streaming(name="Looking for KOS players", url="https://nauticalhosting.com")
-    await bot.change_presence(
-        activity=discord.Streaming(name="Looking for KOS players", url="https://nauticalhosting.com"))
+    if "on_ready" in startup.phases:
+        return  # a reconnect; extensions, views and commands were set up once in setup_hook
+    startup.mark("on_ready")
+    _log.info(f"Successfully loaded Revelation Bot (v1) in {startup.phases['on_ready']:.1f}s "
+              f"with {command_sync.calls} command sync call(s)")
+    startup.report()
 
 bot.run(DISCORD_TOKEN)
\ No newline at end of file
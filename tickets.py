@@ -1,19 +1,14 @@
-import aiosqlite
 import asyncio
-import os
+
+from utils.database import db
+from utils.migrations import TICKET_MIGRATIONS, migrate
+
+TICKET_DATABASE = "tickets.db"
 
 async def create_ticket_db():
-    if os.path.exists("tickets.db"):
-        os.remove("tickets.db")
-        print("Existing database deleted.")
-    async with aiosqlite.connect("tickets.db") as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS tickets (
-                channel_id INTEGER PRIMARY KEY,
-                user_id INTEGER NOT NULL,
-                reason TEXT NOT NULL
-            );
-        """)
-        await db.commit()
-        print("New ticket database created.")
-asyncio.run(create_ticket_db())
+    applied = await migrate(db[TICKET_DATABASE], TICKET_MIGRATIONS)
+    await db.close()
+    print(f"tickets.db is up to date ({applied} migration(s) applied).")
+
+if __name__ == "__main__":
+    asyncio.run(create_ticket_db())
@@ -0,0 +1,101 @@
+import hashlib
+import heapq
+import hmac
+import logging
+import secrets
+import time
+
+from discord.ext import tasks
+
+from utils.database import ConnectionPool
+
+_log = logging.getLogger(__name__)
+
+# ---------- CONFIG ----------
+CHALLENGE_TTL = 300  # seconds a verification code stays valid
+SWEEP_INTERVAL = 30  # seconds between expiry sweeps
+# ----------------------------
+
+
+class ChallengeStore:
+    """
+    Pending verification codes, one per user. Only a keyed hash of each code
+    is kept, next to its expiry, in a dict plus a min-heap of expiries that
+    the sweeper pops from; every change is written through to bot.db so a
+    restart picks up where it left off.
+    """
+
+    def __init__(self, ttl: int = CHALLENGE_TTL):
+        self.ttl = ttl
+        self.pool = None
+        self.key = b""
+        self.pending = {}  # user_id -> (code digest, expires_at)
+        self.heap = []  # (expires_at, user_id); entries for re-issued challenges are skipped when popped
+        self.issued = 0
+        self.passed = 0
+        self.expired = 0
+
+    async def start(self, pool: ConnectionPool, secret: str):
+        self.pool = pool
+        self.key = hashlib.blake2b(secret.encode(), digest_size=32).digest()
+        now = int(time.time())
+        await pool.execute("DELETE FROM verification_challenges WHERE expires_at <= ?", (now,))
+        rows = await pool.fetchall("SELECT user_id, code_hash, expires_at FROM verification_challenges")
+        self.pending = {user_id: (code_hash, expires_at) for user_id, code_hash, expires_at in rows}
+        self.heap = [(expires_at, user_id) for user_id, _, expires_at in rows]
+        heapq.heapify(self.heap)
+        if not self.sweep.is_running():
+            self.sweep.start()
+
+    def stop(self):
+        self.sweep.cancel()
+
+    def _digest(self, user_id: int, code: str) -> bytes:
+        return hashlib.blake2b(f"{user_id}:{code}".encode(), key=self.key, digest_size=16).digest()
+
+    async def issue(self, user_id: int):
+        """Replace any pending challenge for ``user_id`` with a fresh one. Returns ``(code, expires_at)``."""
+        code = str(secrets.randbelow(900000) + 100000)
+        expires_at = int(time.time()) + self.ttl
+        digest = self._digest(user_id, code)
+        self.pending[user_id] = (digest, expires_at)
+        heapq.heappush(self.heap, (expires_at, user_id))
+        self.issued += 1
+        await self.pool.execute(
+            "INSERT OR REPLACE INTO verification_challenges (user_id, code_hash, expires_at) VALUES (?, ?, ?)",
+            (user_id, digest, expires_at)
+        )
+        return code, expires_at
+
+    def is_pending(self, user_id: int) -> bool:
+        entry = self.pending.get(user_id)
+        return entry is not None and entry[1] > time.time()
+
+    async def check(self, user_id: int, code: str) -> str:
+        """``"ok"`` (and the challenge is used up), ``"wrong"`` or ``"expired"``."""
+        entry = self.pending.get(user_id)
+        if entry is None or entry[1] <= time.time():
+            return "expired"
+        if not hmac.compare_digest(entry[0], self._digest(user_id, code.strip())):
+            return "wrong"
+        del self.pending[user_id]
+        self.passed += 1
+        await self.pool.execute("DELETE FROM verification_challenges WHERE user_id = ?", (user_id,))
+        return "ok"
+
+    @tasks.loop(seconds=SWEEP_INTERVAL)
+    async def sweep(self):
+        now = time.time()
+        dropped = 0
+        while self.heap and self.heap[0][0] <= now:
+            expires_at, user_id = heapq.heappop(self.heap)
+            entry = self.pending.get(user_id)
+            if entry is not None and entry[1] == expires_at:
+                del self.pending[user_id]
+                dropped += 1
+        if dropped:
+            self.expired += dropped
+            await self.pool.execute("DELETE FROM verification_challenges WHERE expires_at <= ?", (int(now),))
+
+
+challenges = ChallengeStore()
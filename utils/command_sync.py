@@ -0,0 +1,62 @@
+import hashlib
+import json
+import logging
+import time
+
+import discord
+from discord import app_commands
+
+from utils.database import ConnectionPool
+
+_log = logging.getLogger(__name__)
+
+
+def payload_hash(tree: app_commands.CommandTree, guild=None) -> str:
+    """Stable hash of what ``tree.sync(guild=guild)`` would upload."""
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+                     key=lambda data: (data.get("type", 1), data["name"]))
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode()).hexdigest()
+
+
+class CommandSync:
+    """
+    Syncs the command tree only when the uploaded payload changed since the
+    last successful sync of that scope (global, or one guild), so restarts and
+    reconnects with unchanged commands never touch the heavily rate-limited
+    bulk-overwrite endpoints. The hashes live in ``command_sync`` and are
+    keyed by application id too, so a different token still syncs.
+    """
+
+    def __init__(self):
+        self.pool = None
+        self.hashes = {}  # scope -> payload hash last synced
+        self.calls = 0  # sync requests made this boot
+
+    async def load(self, pool: ConnectionPool):
+        self.pool = pool
+        rows = await pool.fetchall("SELECT scope, payload_hash FROM command_sync")
+        self.hashes = dict(rows)
+
+    async def sync(self, tree: app_commands.CommandTree, *guild_ids: int) -> int:
+        """Sync the global scope and each of ``guild_ids`` if it changed. Returns how many were synced."""
+        synced = 0
+        for guild_id in (None, *guild_ids):
+            guild = discord.Object(id=guild_id) if guild_id else None
+            scope = f"{tree.client.application_id}:{guild_id or 'global'}"
+            digest = payload_hash(tree, guild)
+            if self.hashes.get(scope) == digest:
+                continue
+            commands = await tree.sync(guild=guild)
+            self.calls += 1
+            synced += 1
+            self.hashes[scope] = digest
+            await self.pool.execute(
+                "INSERT OR REPLACE INTO command_sync (scope, payload_hash, synced_at) VALUES (?, ?, ?)",
+                (scope, digest, int(time.time()))
+            )
+            _log.info(f"Synced {len(commands)} {'global' if guild is None else f'guild {guild_id}'} command(s)")
+        return synced
+
+
+command_sync = CommandSync()
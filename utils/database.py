@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+try:
+    import fcntl
+except ImportError:  # Windows; clustering needs a Unix host anyway
+    fcntl = None
+
+_log = logging.getLogger(__name__)
+
+# ---------- CONFIG ----------
+POOL_SIZE = 3  # reader connections per database file (plus one writer)
+STATEMENT_CACHE = 256  # prepared statements kept per connection
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA mmap_size=67108864",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+)
+# ----------------------------
+
+
+class QueryStats:
+    """Running query counters, shared by every pool of a Database. ``observe`` also gets every statement's time."""
+
+    __slots__ = ("queries", "total_time", "started", "observe")
+
+    def __init__(self):
+        self.observe = None
+        self.reset()
+
+    def reset(self):
+        self.queries = 0
+        self.total_time = 0.0
+        self.started = time.perf_counter()
+
+    def record(self, elapsed: float):
+        self.queries += 1
+        self.total_time += elapsed
+        if self.observe is not None:
+            self.observe(elapsed)
+
+    def snapshot(self) -> dict:
+        window = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "queries": self.queries,
+            "window_s": round(window, 3),
+            "qps": round(self.queries / window, 2),
+            "busy_qps": round(self.queries / self.total_time, 2) if self.total_time else 0.0,
+            "avg_ms": round(self.total_time / self.queries * 1000, 3) if self.queries else 0.0,
+        }
+
+
+class Session:
+    """Thin wrapper around a pooled connection that times every statement."""
+
+    __slots__ = ("conn", "stats")
+
+    def __init__(self, conn: aiosqlite.Connection, stats: QueryStats):
+        self.conn = conn
+        self.stats = stats
+
+    async def execute(self, sql: str, params=()) -> int:
+        start = time.perf_counter()
+        cursor = await self.conn.execute(sql, params)
+        rowcount = cursor.rowcount
+        await cursor.close()
+        self.stats.record(time.perf_counter() - start)
+        return rowcount
+
+    async def execute_lastrowid(self, sql: str, params=()) -> int:
+        start = time.perf_counter()
+        cursor = await self.conn.execute(sql, params)
+        rowid = cursor.lastrowid
+        await cursor.close()
+        self.stats.record(time.perf_counter() - start)
+        return rowid
+
+    async def executemany(self, sql: str, seq) -> int:
+        start = time.perf_counter()
+        cursor = await self.conn.executemany(sql, seq)
+        rowcount = cursor.rowcount
+        await cursor.close()
+        self.stats.record(time.perf_counter() - start)
+        return rowcount
+
+    async def executescript(self, script: str):
+        start = time.perf_counter()
+        await self.conn.executescript(script)
+        self.stats.record(time.perf_counter() - start)
+
+    async def fetchone(self, sql: str, params=()):
+        start = time.perf_counter()
+        async with self.conn.execute(sql, params) as cursor:
+            row = await cursor.fetchone()
+        self.stats.record(time.perf_counter() - start)
+        return row
+
+    async def fetchall(self, sql: str, params=()):
+        start = time.perf_counter()
+        async with self.conn.execute(sql, params) as cursor:
+            rows = await cursor.fetchall()
+        self.stats.record(time.perf_counter() - start)
+        return rows
+
+    async def fetchval(self, sql: str, params=(), default=None):
+        row = await self.fetchone(sql, params)
+        return row[0] if row else default
+
+
+class ConnectionPool:
+    """
+    A small pool of long-lived connections to one SQLite file.
+
+    SQLite only allows one writer at a time, so writes go through a single
+    dedicated connection guarded by a lock while reads are spread across
+    ``size`` reader connections. Every connection runs in WAL mode so
+    readers never block the writer.
+
+    A ``shared`` pool is one of several processes writing the same file (a
+    clustered bot). Its writer also holds an exclusive ``flock`` on
+    ``<path>.write-lock`` for each write, so the processes queue for the
+    write lock in order instead of retrying on SQLITE_BUSY.
+    """
+
+    def __init__(self, path: str, size: int = POOL_SIZE, stats: QueryStats = None, shared: bool = False):
+        self.path = path
+        self.size = size
+        self.stats = stats or QueryStats()
+        self.shared = shared
+        self.lock_waits = 0  # writes that found another process holding the file lock
+        self._lock_fd = None
+        self._readers: asyncio.Queue = asyncio.Queue()
+        self._connections = []
+        self._writer = None
+        self._write_lock = asyncio.Lock()
+        self._open_lock = asyncio.Lock()
+        self._opened = False
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.path, isolation_level=None, cached_statements=STATEMENT_CACHE)
+        for pragma in PRAGMAS:
+            await conn.execute(pragma)
+        self._connections.append(conn)
+        return conn
+
+    async def open(self):
+        if self._opened:
+            return
+        async with self._open_lock:
+            if self._opened:
+                return
+            if self.shared:
+                if fcntl is None:
+                    raise RuntimeError("Sharing a database between processes needs fcntl (a Unix host)")
+                self._lock_fd = os.open(self.path + ".write-lock", os.O_RDWR | os.O_CREAT, 0o644)
+            self._writer = await self._connect()
+            for _ in range(self.size):
+                self._readers.put_nowait(await self._connect())
+            self._opened = True
+            _log.info(f"Opened {self.size + 1} connection(s) to {self.path}")
+
+    async def close(self):
+        for conn in self._connections:
+            await conn.close()
+        self._connections.clear()
+        self._readers = asyncio.Queue()
+        self._writer = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self._opened = False
+
+    @asynccontextmanager
+    async def reader(self):
+        await self.open()
+        conn = await self._readers.get()
+        try:
+            yield Session(conn, self.stats)
+        finally:
+            self._readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def writer(self):
+        """Exclusive access to the writer connection in autocommit mode."""
+        await self.open()
+        async with self._write_lock:
+            if self._lock_fd is None:
+                yield Session(self._writer, self.stats)
+                return
+            await self._lock_file()
+            try:
+                yield Session(self._writer, self.stats)
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    async def _lock_file(self):
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            self.lock_waits += 1
+        fd = self._lock_fd
+        waiter = asyncio.ensure_future(asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX))
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            # The thread still gets the lock eventually; hand it straight back.
+            waiter.add_done_callback(lambda _: fcntl.flock(fd, fcntl.LOCK_UN))
+            raise
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Run several writes atomically; rolls back if the block raises."""
+        async with self.writer() as session:
+            await self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                yield session
+            except BaseException:
+                await self._writer.execute("ROLLBACK")
+                raise
+            await self._writer.execute("COMMIT")
+
+    # ---------- Helpers ----------
+    async def execute(self, sql: str, params=()) -> int:
+        async with self.writer() as session:
+            return await session.execute(sql, params)
+
+    async def executemany(self, sql: str, seq) -> int:
+        async with self.transaction() as session:
+            return await session.executemany(sql, seq)
+
+    async def fetchone(self, sql: str, params=()):
+        async with self.reader() as session:
+            return await session.fetchone(sql, params)
+
+    async def fetchall(self, sql: str, params=()):
+        async with self.reader() as session:
+            return await session.fetchall(sql, params)
+
+    async def fetchval(self, sql: str, params=(), default=None):
+        async with self.reader() as session:
+            return await session.fetchval(sql, params, default)
+
+
+class Database:
+    """Registry of connection pools keyed by database file, created once at startup."""
+
+    def __init__(self, pool_size: int = POOL_SIZE, shared: bool = False):
+        self.pool_size = pool_size
+        self.shared = shared  # set before the first pool is created when other processes write the same files
+        self.stats = QueryStats()
+        self._pools = {}
+
+    def __getitem__(self, path: str) -> ConnectionPool:
+        pool = self._pools.get(path)
+        if pool is None:
+            pool = self._pools[path] = ConnectionPool(path, self.pool_size, self.stats, self.shared)
+        return pool
+
+    def lock_waits(self) -> int:
+        return sum(pool.lock_waits for pool in self._pools.values())
+
+    async def open(self, *paths: str):
+        for path in paths:
+            await self[path].open()
+
+    async def close(self):
+        for pool in self._pools.values():
+            await pool.close()
+        _log.info("Closed all database connections.")
+
+
+db = Database()
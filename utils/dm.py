@@ -0,0 +1,185 @@
+import asyncio
+import collections
+import logging
+import time
+
+import discord
+
+from utils.interactions import Timings
+
+_log = logging.getLogger(__name__)
+
+# ---------- CONFIG ----------
+RATE = 4.0  # DMs per second, sustained
+BURST = 10  # DMs that may go out back to back after a quiet spell
+WORKERS = 2  # concurrent sends, so one slow request doesn't stall the bucket
+MAX_QUEUE = 500  # DMs waiting across all priorities
+# ----------------------------
+
+# Lower sends first.
+STAFF = 0
+VERIFICATION = 1
+WELCOME = 2
+PRIORITY_NAMES = {STAFF: "staff", VERIFICATION: "verification", WELCOME: "welcome"}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    async def take(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DMDropped(Exception):
+    """The DM was pushed out of a full queue by a higher priority one."""
+
+
+def _retrieve(future: asyncio.Future):
+    # Fire-and-forget callers never await the future; mark its exception as seen.
+    if not future.cancelled():
+        future.exception()
+
+
+class _Outgoing:
+    __slots__ = ("priority", "key", "user", "kwargs", "future", "queued_at")
+
+    def __init__(self, priority: int, key, user, kwargs):
+        self.priority = priority
+        self.key = key
+        self.user = user
+        self.kwargs = kwargs
+        self.future = asyncio.get_running_loop().create_future()
+        self.future.add_done_callback(_retrieve)
+        self.queued_at = time.perf_counter()
+
+
+class DMDispatcher:
+    """
+    The one place the bot sends DMs from. Messages wait in a FIFO per
+    priority and go out through a token bucket, staff first. A message queued
+    under a ``key`` that is already waiting replaces that message's content
+    instead of queueing a second DM (e.g. a user clicking Verify repeatedly).
+    When the queue is full, a new message pushes out the newest one of a
+    lower priority, or is refused if there is none.
+    """
+
+    def __init__(self):
+        self.queues = {priority: collections.deque() for priority in PRIORITY_NAMES}
+        self.waiting = {}  # key -> _Outgoing still queued
+        self.size = 0
+        self.bucket = TokenBucket(RATE, BURST)
+        self.ready = asyncio.Event()
+        self.wait_times = Timings()
+        self.send_times = Timings()
+        self.stats = collections.Counter()
+        self._workers = []
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(WORKERS)]
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        for queue in self.queues.values():
+            for item in queue:
+                if not item.future.done():
+                    item.future.cancel()
+            queue.clear()
+        self.waiting.clear()
+        self.size = 0
+
+    def depth(self):
+        """``{priority name: queued DMs}``."""
+        return {PRIORITY_NAMES[priority]: len(queue) for priority, queue in self.queues.items()}
+
+    def send(self, user: discord.abc.User, priority: int, key=None, **kwargs):
+        """
+        Queue a DM. Returns a future for the sent ``Message`` (it raises what
+        ``user.send`` raised, or ``DMDropped`` if the DM was pushed out), or
+        None when the queue is full of equal or higher priority DMs.
+        """
+        if key is not None and key in self.waiting:
+            item = self.waiting[key]
+            item.user = user
+            item.kwargs = kwargs
+            self.stats["deduped"] += 1
+            return item.future
+        if self.size >= MAX_QUEUE and not self._make_room(priority):
+            self.stats["rejected"] += 1
+            return None
+        item = _Outgoing(priority, key, user, kwargs)
+        self.queues[priority].append(item)
+        self.size += 1
+        if key is not None:
+            self.waiting[key] = item
+        self.ready.set()
+        return item.future
+
+    def _make_room(self, priority: int) -> bool:
+        for lower in sorted(self.queues, reverse=True):
+            if lower <= priority:
+                return False
+            queue = self.queues[lower]
+            if queue:
+                victim = queue.pop()
+                self._forget(victim)
+                victim.future.set_exception(DMDropped())
+                self.stats["dropped"] += 1
+                _log.warning(f"DM queue full, dropped a {PRIORITY_NAMES[lower]} DM to {victim.user}")
+                return True
+        return False
+
+    def _forget(self, item: _Outgoing):
+        self.size -= 1
+        if item.key is not None and self.waiting.get(item.key) is item:
+            del self.waiting[item.key]
+
+    def _next(self):
+        for queue in self.queues.values():  # dicts keep insertion order: STAFF, VERIFICATION, WELCOME
+            if queue:
+                item = queue.popleft()
+                self._forget(item)
+                return item
+        return None
+
+    async def _worker(self):
+        while True:
+            await self.ready.wait()
+            if not self.size:
+                self.ready.clear()
+                continue
+            await self.bucket.take()
+            item = self._next()
+            if item is None:
+                continue  # another worker took it while we waited for a token
+            name = PRIORITY_NAMES[item.priority]
+            self.wait_times.record(name, (time.perf_counter() - item.queued_at) * 1000)
+            start = time.perf_counter()
+            try:
+                message = await item.user.send(**item.kwargs)
+            except Exception as e:
+                self.stats["failed"] += 1
+                if not item.future.done():
+                    item.future.set_exception(e)
+            else:
+                self.stats["sent"] += 1
+                if not item.future.done():
+                    item.future.set_result(message)
+            finally:
+                self.send_times.record(name, (time.perf_counter() - start) * 1000)
+
+
+dm_dispatcher = DMDispatcher()
@@ -0,0 +1,150 @@
+import collections
+import logging
+import os
+import sys
+import time
+
+import discord
+from discord.ext import tasks
+
+from utils.command_sync import command_sync
+from utils.interactions import Timings
+
+_log = logging.getLogger(__name__)
+
+# ---------- CONFIG ----------
+POLL_INTERVAL = 0.5  # seconds between mtime scans
+DEBOUNCE = 1.0  # a file must sit unchanged this long before it is reloaded; editors save in bursts
+HISTORY = 20  # reloads kept for !reloads
+# ----------------------------
+
+
+def find_extensions(folder: str, package: str):
+    """``{extension name: path}`` for every module under ``folder``."""
+    found = {}
+    for root, _, files in os.walk(folder):
+        for file in files:
+            if file.endswith(".py"):
+                path = os.path.join(root, file)
+                module = os.path.relpath(path, folder).replace(os.sep, ".")[:-3]  # strip .py
+                found[f"{package}.{module}"] = path
+    return found
+
+
+def _mtime(path: str):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None  # mid-save (some editors delete and rename); keep the last version loaded
+
+
+class HotReloader:
+    """
+    Dev/ops mode: polls the extension files' mtimes and reloads only the
+    extensions whose file changed, plus the loaded extensions that imported
+    from them. A file that disappears is left loaded, and a new file is
+    loaded. State several extensions share belongs in ``utils`` instead
+    (``utils.kos_store`` for the KOS cogs): ``load_extension`` executes a
+    fresh copy of the module, so a plain import of an extension elsewhere
+    gets different objects from the loaded one.
+
+    Before a reload each of the extension's cogs may return a value from
+    ``cog_export_state()``; it is kept in ``bot.extension_state`` under the
+    cog's name for the new instance to pop in ``cog_load``. Commands are
+    re-synced afterwards through ``command_sync``, which skips unchanged trees.
+    """
+
+    def __init__(self):
+        self.bot = None
+        self.folder = None
+        self.package = None
+        self.paths = {}
+        self.mtimes = {}
+        self.changed = {}  # extension -> monotonic time its file was last seen changing
+        self.sync_guilds = ()
+        self.sync_commands = True
+        self.times = Timings()
+        self.history = collections.deque(maxlen=HISTORY)  # (unix time, extension, ms, outcome)
+
+    def start(self, bot, folder: str, package: str, sync_guilds=(), sync_commands: bool = True):
+        self.bot = bot
+        self.folder = folder
+        self.package = package
+        self.sync_guilds = sync_guilds
+        self.sync_commands = sync_commands
+        self.paths = find_extensions(folder, package)
+        self.mtimes = {name: _mtime(path) for name, path in self.paths.items()}
+        self.watch.start()
+        _log.info(f"Hot reload watching {len(self.paths)} extension(s) in {folder}/")
+
+    def stop(self):
+        self.watch.cancel()
+
+    @tasks.loop(seconds=POLL_INTERVAL)
+    async def watch(self):
+        now = time.monotonic()
+        self.paths = find_extensions(self.folder, self.package)
+        for name, path in self.paths.items():
+            mtime = _mtime(path)
+            if mtime is not None and mtime != self.mtimes.get(name):
+                self.mtimes[name] = mtime
+                self.changed[name] = now
+        settled = [name for name, seen in self.changed.items() if now - seen >= DEBOUNCE]
+        if settled:
+            for name in settled:
+                del self.changed[name]
+            await self.reload(*settled)
+
+    def _dependents(self, name: str):
+        module = sys.modules.get(name)
+        return [
+            other for other, lib in self.bot.extensions.items()
+            if other != name and any(
+                value is module or getattr(value, "__module__", None) == name for value in vars(lib).values()
+            )
+        ]
+
+    def _export(self, name: str):
+        exported = []
+        for cog in list(self.bot.cogs.values()):
+            if type(cog).__module__ == name and hasattr(cog, "cog_export_state"):
+                self.bot.extension_state[cog.qualified_name] = cog.cog_export_state()
+                exported.append(cog.qualified_name)
+        return exported
+
+    async def reload(self, *names: str):
+        """Reload ``names`` and their dependents in order. Returns ``[(extension, ms, outcome)]``."""
+        order = list(names)
+        for name in names:
+            order += [other for other in self._dependents(name) if other not in order]
+        results = []
+        for name in order:
+            start = time.perf_counter()
+            exported = self._export(name)
+            try:
+                if name in self.bot.extensions:
+                    await self.bot.reload_extension(name)
+                else:
+                    await self.bot.load_extension(name)
+                outcome = "reloaded"
+            except Exception as e:
+                # reload_extension puts the previous version back when the new one fails to load.
+                _log.exception(f"Hot reload of {name} failed")
+                outcome = f"failed: {type(e).__name__}"
+            finally:
+                for cog_name in exported:
+                    self.bot.extension_state.pop(cog_name, None)
+            ms = (time.perf_counter() - start) * 1000
+            self.times.record(name, ms)
+            self.history.append((int(time.time()), name, ms, outcome))
+            results.append((name, ms, outcome))
+            _log.info(f"Hot reload: {name} {outcome} in {ms:.0f} ms")
+        if self.sync_commands and any(outcome == "reloaded" for _, _, outcome in results):
+            try:
+                await command_sync.sync(self.bot.tree, *self.sync_guilds)
+            except discord.HTTPException as e:
+                _log.warning(f"Command sync after hot reload failed: {e}")
+        return results
+
+
+hot_reload = HotReloader()
@@ -0,0 +1,154 @@
+import asyncio
+import collections
+import logging
+import time
+
+import discord
+
+from utils.metrics import metrics
+
+_log = logging.getLogger(__name__)
+
+# ---------- CONFIG ----------
+WORKERS = 4
+MAX_QUEUE = 200
+TASK_TIMEOUT = 60.0  # seconds per side effect
+SAMPLES = 1000  # timings kept per command/task
+# ----------------------------
+
+
+class Timings:
+    """Bounded per-name latency samples (milliseconds) with percentile summaries."""
+
+    def __init__(self):
+        self.samples = collections.defaultdict(lambda: collections.deque(maxlen=SAMPLES))
+
+    def record(self, name: str, ms: float):
+        self.samples[name].append(ms)
+
+    def summary(self):
+        """``{name: (count, p50, p99)}`` over the retained samples."""
+        result = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            result[name] = (
+                len(ordered),
+                ordered[len(ordered) // 2],
+                ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+            )
+        return result
+
+
+ack_times = Timings()
+task_times = Timings()
+
+
+class SideEffectQueue:
+    """
+    Bounded worker pool for the slow part of an interaction: channel sends,
+    role edits, DB writes. Each job runs once and is timed under its name.
+    Jobs are not retried as a whole: discord.py already retries 429s and 5xx
+    inside each request, and re-running a job would repeat the sends and
+    inserts that did succeed.
+    """
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_QUEUE)
+        self.failures = collections.Counter()
+        self._workers = []
+        self._spawned = set()
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(WORKERS)]
+
+    async def submit(self, name: str, job, timeout: float = TASK_TIMEOUT):
+        """
+        Queue ``job`` (a no-argument coroutine function), cancelled after
+        ``timeout`` seconds; None if the job bounds itself. Waits for room
+        when the queue is full.
+        """
+        await self.queue.put((name, job, timeout))
+
+    def spawn(self, name: str, job):
+        """
+        Run ``job`` as its own task with no timeout, for work that can
+        legitimately take minutes (archiving a long ticket) and would
+        otherwise hold a worker or be cut off part way.
+        """
+        task = asyncio.create_task(self._run(name, job, None))
+        self._spawned.add(task)
+        task.add_done_callback(self._spawned.discard)
+
+    async def _run(self, name: str, job, timeout: float):
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(job(), timeout)
+        except Exception:
+            self.failures[name] += 1
+            _log.exception(f"Side effect {name} failed")
+        finally:
+            task_times.record(name, (time.perf_counter() - start) * 1000)
+
+    async def _worker(self):
+        while True:
+            name, job, timeout = await self.queue.get()
+            try:
+                await self._run(name, job, timeout)
+            finally:
+                self.queue.task_done()
+
+    async def close(self):
+        """Let queued and spawned jobs finish, then stop the workers."""
+        if self._workers:
+            try:
+                await asyncio.wait_for(self.queue.join(), TASK_TIMEOUT)
+            except asyncio.TimeoutError:
+                _log.warning(f"Stopping with {self.queue.qsize()} side effect(s) still queued")
+        if self._spawned:
+            _, pending = await asyncio.wait(self._spawned, timeout=TASK_TIMEOUT)
+            for task in pending:
+                _log.warning("Cancelling a long-running side effect on shutdown")
+                task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+
+side_effects = SideEffectQueue()
+
+
+def record_ack(interaction: discord.Interaction, name: str):
+    """Record how long after Discord created the interaction we acknowledged it."""
+    seconds = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    ack_times.record(name, seconds * 1000)
+    metrics.interaction_ack_seconds.labels(name).observe(seconds)
+
+
+async def respond_first(interaction: discord.Interaction, name: str, work, ephemeral: bool = True,
+                        timeout: float = TASK_TIMEOUT):
+    """
+    Defer ``interaction`` straight away, then run ``work`` on the side effect
+    queue. ``work`` is a coroutine function returning the keyword arguments
+    for the follow-up message (e.g. ``{"embed": ...}``). With ``timeout=None``
+    it runs on its own task instead, for work that may outlast a worker.
+    """
+    await interaction.response.defer(ephemeral=ephemeral, thinking=True)
+    record_ack(interaction, name)
+    metrics.claim(interaction)  # timed when the job ends, not when the handler returns
+
+    async def job():
+        try:
+            reply = await asyncio.wait_for(work(), timeout)
+        except Exception:
+            metrics.observe_interaction(interaction, name, "error")
+            await interaction.followup.send("❌ Something went wrong, please try again.", ephemeral=ephemeral)
+            raise
+        if reply:
+            await interaction.followup.send(**reply, ephemeral=ephemeral)
+        metrics.observe_interaction(interaction, name)
+
+    if timeout is None:
+        side_effects.spawn(name, job)
+    else:
+        await side_effects.submit(name, job, timeout=None)
@@ -0,0 +1,242 @@
+import asyncio
+import collections
+import itertools
+import json
+import logging
+import os
+import time
+
+_log = logging.getLogger(__name__)
+
+# ---------- CONFIG ----------
+RECONNECT_DELAY = 2.0  # seconds between attempts to reach the launcher
+STATS_INTERVAL = 15.0  # seconds between a cluster's stats reports
+REQUEST_TIMEOUT = 5.0
+MAX_LINE = 1 << 20  # longest message either side accepts
+MAX_BACKLOG = 4 << 20  # bytes buffered for a cluster that stopped reading before it is dropped
+# ----------------------------
+
+
+def owns_guild(client, guild_id: int) -> bool:
+    """Whether this process connects the shard ``guild_id`` is on; always true unless clustered."""
+    if client.shard_ids is None or not client.shard_count:
+        return True
+    return (guild_id >> 22) % client.shard_count in client.shard_ids
+
+
+def _encode(message) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+class IPCHub:
+    """
+    Runs in the cluster launcher: every cluster connects to one Unix socket and
+    sends newline-delimited JSON. ``publish`` messages are relayed to every
+    other cluster, ``stats`` reports are kept (with the event rate worked out
+    from consecutive reports) and handed back to whoever asks.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.clusters = {}  # cluster id -> StreamWriter
+        self.stats = {}  # cluster id -> latest report, plus "received" and "events_per_s"
+        self.relayed = 0
+        self.server = None
+        self._serving = set()
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = await asyncio.start_unix_server(self._serve, path=self.path, limit=MAX_LINE)
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+        for writer in list(self.clusters.values()):
+            writer.close()
+        await asyncio.gather(*self._serving, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _send(self, writer: asyncio.StreamWriter, message):
+        if writer.transport.get_write_buffer_size() > MAX_BACKLOG:
+            _log.warning("IPC: a cluster stopped reading, dropping its connection")
+            writer.close()
+            return
+        writer.write(_encode(message))
+
+    def _record(self, cluster: int, stats: dict):
+        now = time.time()
+        previous = self.stats.get(cluster)
+        stats["received"] = now
+        stats["events_per_s"] = 0.0
+        if previous and stats.get("events", 0) >= previous.get("events", 0):
+            stats["events_per_s"] = round((stats["events"] - previous["events"]) / max(now - previous["received"], 1e-9), 1)
+        self.stats[cluster] = stats
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        cluster = None
+        self._serving.add(asyncio.current_task())
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                op = message["op"]
+                if op == "hello":
+                    cluster = message["cluster"]
+                    self.clusters[cluster] = writer
+                    _log.info(f"IPC: cluster {cluster} connected")
+                elif op == "publish":
+                    self.relayed += 1
+                    for other, other_writer in list(self.clusters.items()):
+                        if other != cluster:
+                            self._send(other_writer, message)
+                elif op == "stats":
+                    self._record(cluster, message["stats"])
+                elif op == "cluster_stats":
+                    self._send(writer, {"op": "reply", "id": message["id"], "data": self.stats})
+        except (ConnectionError, ValueError, KeyError) as e:
+            _log.warning(f"IPC: dropping cluster {cluster}: {e}")
+        finally:
+            if cluster is not None and self.clusters.get(cluster) is writer:
+                del self.clusters[cluster]
+                _log.info(f"IPC: cluster {cluster} disconnected")
+            writer.close()
+            self._serving.discard(asyncio.current_task())
+
+
+class IPCClient:
+    """
+    A cluster's link to the launcher. ``publish`` sends to every other
+    cluster; handlers ``subscribe``d to a topic are plain callables run with
+    the published data. Messages published while the link is down are
+    dropped, so only use it to keep in-memory copies of state that lives on
+    disk (caches, lockdown flags) in step, never as the state itself, and
+    register a connect hook that reloads the copy: hooks are no-argument
+    coroutine functions awaited after every connect, before anything
+    published from then on is read.
+
+    Without a socket (a single-process bot) every call is a no-op.
+    """
+
+    def __init__(self):
+        self.path = None
+        self.cluster = None
+        self.writer = None
+        self.handlers = collections.defaultdict(list)
+        self.connect_hooks = []
+        self.pending = {}  # request id -> future
+        self.ids = itertools.count()
+        self.stats_source = None
+        self._task = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def start(self, path: str, cluster: int, stats_source):
+        """Connect (and keep reconnecting) to the launcher; ``stats_source()`` is reported every STATS_INTERVAL."""
+        self.path = path
+        self.cluster = cluster
+        self.stats_source = stats_source
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def subscribe(self, topic: str, handler):
+        self.handlers[topic].append(handler)
+
+    def unsubscribe(self, topic: str, handler):
+        if handler in self.handlers.get(topic, ()):
+            self.handlers[topic].remove(handler)
+
+    def add_connect_hook(self, hook):
+        self.connect_hooks.append(hook)
+
+    def remove_connect_hook(self, hook):
+        if hook in self.connect_hooks:
+            self.connect_hooks.remove(hook)
+
+    def _send(self, message) -> bool:
+        if self.writer is None or self.writer.is_closing():
+            return False
+        self.writer.write(_encode(message))
+        return True
+
+    def publish(self, topic: str, data) -> bool:
+        """Send ``data`` to the other clusters' ``topic`` handlers. False if it couldn't be sent."""
+        if not self.enabled:
+            return False
+        sent = self._send({"op": "publish", "topic": topic, "data": data, "from": self.cluster})
+        if not sent:
+            _log.warning(f"IPC: not connected, dropped a {topic} message")
+        return sent
+
+    async def cluster_stats(self):
+        """``{cluster id: latest stats}`` as the launcher last heard them, or None if it can't be reached."""
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            if not self._send({"op": "cluster_stats", "id": request_id}):
+                return None
+            return await asyncio.wait_for(future, REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self.pending.pop(request_id, None)
+
+    def _dispatch(self, message):
+        if message["op"] == "publish":
+            for handler in list(self.handlers.get(message["topic"], ())):
+                try:
+                    handler(message["data"])
+                except Exception:
+                    _log.exception(f"IPC: {message['topic']} handler failed")
+        elif message["op"] == "reply":
+            future = self.pending.get(message["id"])
+            if future is not None and not future.done():
+                future.set_result(message["data"])
+
+    async def _report(self):
+        while True:
+            self._send({"op": "stats", "stats": self.stats_source()})
+            await asyncio.sleep(STATS_INTERVAL)
+
+    async def _run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=MAX_LINE)
+            except OSError as e:
+                _log.warning(f"IPC: can't reach the launcher at {self.path}: {e}")
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+            self.writer = writer
+            self._send({"op": "hello", "cluster": self.cluster})
+            reporter = asyncio.create_task(self._report())
+            try:
+                for hook in list(self.connect_hooks):
+                    try:
+                        await hook()
+                    except Exception:
+                        _log.exception("IPC: connect hook failed")
+                while line := await reader.readline():
+                    self._dispatch(json.loads(line))
+            except (ConnectionError, ValueError) as e:
+                _log.warning(f"IPC: link to the launcher broke: {e}")
+            finally:
+                reporter.cancel()
+                self.writer = None
+                writer.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+
+ipc = IPCClient()
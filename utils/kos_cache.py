@@ -0,0 +1,73 @@
+import bisect
+import logging
+
+from utils.database import ConnectionPool
+
+_log = logging.getLogger(__name__)
+
+
+class KOSCache:
+    """
+    In-memory copy of the ``kos`` table.
+
+    Rows are kept as ``(username, timestamp, message_id, reason)`` tuples, the
+    same shape SQLite returns, keyed by the lower-cased username. A sorted list
+    of those keys doubles as the prefix index for autocomplete: a prefix query
+    is one bisect plus a walk over at most ``limit`` neighbours.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._keys = []
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, username: str):
+        return username.lower() in self._entries
+
+    async def load(self, pool: ConnectionPool):
+        rows = await pool.fetchall("SELECT username, timestamp, message_id, reason FROM kos")
+        self._entries = {row[0].lower(): tuple(row) for row in rows}
+        self._keys = sorted(self._entries)
+        self.loaded = True
+        _log.info(f"Loaded {len(self._entries)} KOS entries into cache")
+
+    def get(self, username: str):
+        return self._entries.get(username.lower())
+
+    def put(self, row):
+        key = row[0].lower()
+        if key not in self._entries:
+            bisect.insort(self._keys, key)
+        self._entries[key] = tuple(row)
+
+    def discard(self, username: str):
+        key = username.lower()
+        if self._entries.pop(key, None) is not None:
+            index = bisect.bisect_left(self._keys, key)
+            del self._keys[index]
+
+    def set_message_id(self, username: str, message_id: int):
+        key = username.lower()
+        row = self._entries.get(key)
+        if row is not None:
+            self._entries[key] = (row[0], row[1], message_id, row[3])
+
+    def rows(self):
+        return [self._entries[key] for key in self._keys]
+
+    def complete(self, prefix: str, limit: int = 25):
+        """Usernames starting with ``prefix`` (case-insensitive), in alphabetical order."""
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self._keys, prefix)
+        matches = []
+        for key in self._keys[start:start + limit]:
+            if not key.startswith(prefix):
+                break
+            matches.append(self._entries[key][0])
+        return matches
+
+
+kos_cache = KOSCache()
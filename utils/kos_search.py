@@ -0,0 +1,90 @@
+import difflib
+import re
+
+from utils.database import ConnectionPool, Session
+
+# ---------- CONFIG ----------
+FUZZY_CANDIDATES = 50  # trigram hits re-ranked in Python
+FUZZY_MIN_RATIO = 0.5
+# ----------------------------
+
+# kos_fts indexes username and reason for word search; kos_trigram indexes the
+# username alone for typo-tolerant matching. Both share the kos rowid, so they
+# must be rebuilt with rebuild_index() if kos is ever VACUUMed.
+INDEX_MIGRATION = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS kos_fts USING fts5(username, reason, tokenize='unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS kos_trigram USING fts5(username, tokenize='trigram')",
+    "INSERT INTO kos_fts (rowid, username, reason) SELECT rowid, username, reason FROM kos",
+    "INSERT INTO kos_trigram (rowid, username) SELECT rowid, username FROM kos",
+)
+
+_WORD = re.compile(r"\w+")
+
+
+def fts_query(text: str) -> str:
+    """Every word must match, each as a prefix: ``hack cli`` -> ``"hack"* "cli"*``."""
+    return " ".join(f'"{word}"*' for word in _WORD.findall(text))
+
+
+def trigram_query(text: str) -> str:
+    text = text.lower()
+    grams = {text[i:i + 3] for i in range(len(text) - 2)}
+    return " OR ".join(f'"{gram}"' for gram in sorted(grams) if '"' not in gram)
+
+
+# ---------- Index maintenance ----------
+async def unindex(tx: Session, username: str, nocase: bool = False):
+    """Drop index rows for the kos row(s) about to be replaced or deleted."""
+    where = "username = ? COLLATE NOCASE" if nocase else "username = ?"
+    await tx.execute(f"DELETE FROM kos_fts WHERE rowid IN (SELECT rowid FROM kos WHERE {where})", (username,))
+    await tx.execute(f"DELETE FROM kos_trigram WHERE rowid IN (SELECT rowid FROM kos WHERE {where})", (username,))
+
+
+async def index(tx: Session, rowid: int, username: str, reason: str):
+    await tx.execute("INSERT INTO kos_fts (rowid, username, reason) VALUES (?, ?, ?)", (rowid, username, reason))
+    await tx.execute("INSERT INTO kos_trigram (rowid, username) VALUES (?, ?)", (rowid, username))
+
+
+async def rebuild_index(pool: ConnectionPool):
+    async with pool.transaction() as tx:
+        await tx.execute("DELETE FROM kos_fts")
+        await tx.execute("DELETE FROM kos_trigram")
+        for statement in INDEX_MIGRATION[2:]:
+            await tx.execute(statement)
+
+
+# ---------- Queries ----------
+async def search(pool: ConnectionPool, text: str, limit: int = 10):
+    """Full-text search over username and reason, best bm25 match first. Rows are ``(username, timestamp, reason)``."""
+    query = fts_query(text)
+    if not query:
+        return []
+    return await pool.fetchall(
+        "SELECT kos.username, kos.timestamp, kos.reason FROM kos_fts "
+        "JOIN kos ON kos.rowid = kos_fts.rowid "
+        "WHERE kos_fts MATCH ? ORDER BY bm25(kos_fts, 2.0, 1.0) LIMIT ?",
+        (query, limit)
+    )
+
+
+async def fuzzy(pool: ConnectionPool, name: str, limit: int = 10):
+    """
+    Usernames that look like ``name``, most similar first, as ``(username, ratio)``.
+    Candidates sharing the most trigrams come from the index; the short list
+    is then re-ranked by edit similarity.
+    """
+    query = trigram_query(name)
+    if not query:
+        return []
+    rows = await pool.fetchall(
+        "SELECT username FROM kos_trigram WHERE kos_trigram MATCH ? ORDER BY rank LIMIT ?",
+        (query, FUZZY_CANDIDATES)
+    )
+    name = name.lower()
+    scored = []
+    for (username,) in rows:
+        ratio = difflib.SequenceMatcher(None, name, username.lower()).ratio()
+        if ratio >= FUZZY_MIN_RATIO:
+            scored.append((username, ratio))
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:limit]
@@ -0,0 +1,307 @@
+import asyncio
+import datetime
+import hashlib
+import json
+
+import discord
+import pytz
+
+from utils.database import db
+from utils.ipc import ipc
+from utils.kos_cache import kos_cache
+from utils import kos_search as kos_index
+
+# ---------- CONFIG ----------
+MOD_LOG_CHANNEL_ID = 1414435845615910933
+TIMEZONE = pytz.timezone("America/Boise")
+KOS_DATABASE = "kos.db"
+KOS_BOARD_MODE = False  # True: the KOS channel holds fixed board pages instead of one post per entry
+BOARD_PAGE_SIZE = 15  # entries per board message
+LIST_PAGE_SIZE = 10  # entries per /kos list page
+# ----------------------------
+
+
+# ---------- Embeds ----------
+def build_kos_embed(username: str, reason: str, timestamp: int) -> discord.Embed:
+    """The canonical KOS channel post for one entry."""
+    embed = discord.Embed(
+        title="⚔️ KOS Notice",
+        color=discord.Colour.red()
+    )
+    embed.add_field(name="Usernames", value=username, inline=True)
+    embed.add_field(name="Reason", value=reason, inline=True)
+    embed.add_field(name="Date", value=f"<t:{timestamp}:F>", inline=True)
+    embed.set_thumbnail(url=f"https://mineskin.eu/helm/{username}/100.png")
+    return embed
+
+
+def embed_hash(embed: discord.Embed) -> str:
+    """
+    Stable fingerprint of an embed, used to skip no-op edits. Only the fields we
+    render are hashed, so an embed read back from the channel (which Discord
+    decorates with proxy urls and sizes) hashes the same as the one we built.
+    """
+    payload = json.dumps({
+        "title": embed.title,
+        "description": embed.description,
+        "color": embed.colour.value if embed.colour else None,
+        "fields": [(f.name, f.value, f.inline) for f in embed.fields],
+        "thumbnail": embed.thumbnail.url,
+        "image": embed.image.url,
+    }, separators=(",", ":"))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+# ---------- Database Helpers ----------
+def apply_kos_update(data: dict):
+    """Mirror a KOS change another cluster made (published by KOSDB) into this process's cache."""
+    if "put" in data:
+        kos_cache.put(tuple(data["put"]))
+    for username in data.get("discard", ()):
+        kos_cache.discard(username)
+    for username, message_id in data.get("message_ids", ()):
+        kos_cache.set_message_id(username, message_id)
+
+
+async def reload_kos_cache():
+    """IPC connect hook: reload the cache, since changes published while the link was down never arrived."""
+    await kos_cache.load(db[KOS_DATABASE])
+
+
+class KOSDB:
+    # Held around every change to the KOS channel and its rows: adds, removes, board
+    # renders, refresh batches and reconciles, so none of them sees another half done.
+    # Shared by the kos and KOSRefresh cogs, and kept across their reloads, by living here.
+    lock = asyncio.Lock()
+
+    @staticmethod
+    async def add(username: str, reason: str, message_id: int, timestamp: int = None, embed_hash: str = None,
+                  board_page: int = None):
+        if timestamp is None:
+            timestamp = int(datetime.datetime.now(tz=TIMEZONE).timestamp())
+        async with db[KOS_DATABASE].transaction() as tx:
+            await kos_index.unindex(tx, username)
+            rowid = await tx.execute_lastrowid(
+                "INSERT OR REPLACE INTO kos (username, timestamp, message_id, reason, embed_hash, board_page) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (username, timestamp, message_id, reason, embed_hash, board_page)
+            )
+            await kos_index.index(tx, rowid, username, reason)
+        kos_cache.put((username, timestamp, message_id, reason))
+        ipc.publish("kos", {"put": [username, timestamp, message_id, reason]})
+
+    @staticmethod
+    async def remove(username: str):
+        async with db[KOS_DATABASE].transaction() as tx:
+            await kos_index.unindex(tx, username, nocase=True)
+            await tx.execute("DELETE FROM kos WHERE username = ? COLLATE NOCASE", (username,))
+        kos_cache.discard(username)
+        ipc.publish("kos", {"discard": [username]})
+
+    @staticmethod
+    async def set_message_ids(updates, tx=None):
+        """
+        Bulk-update posted messages from ``(message_id, embed_hash, username)`` tuples.
+        Pass ``tx`` to make the update part of a larger transaction; the cache
+        and the other clusters are then only told once the caller has
+        committed and calls ``cache_message_ids``.
+        """
+        sql = "UPDATE kos SET message_id = ?, embed_hash = ? WHERE username = ? COLLATE NOCASE"
+        if tx is None:
+            await db[KOS_DATABASE].executemany(sql, updates)
+            KOSDB.cache_message_ids(updates)
+        else:
+            await tx.executemany(sql, updates)
+
+    @staticmethod
+    def cache_message_ids(updates):
+        for message_id, _, username in updates:
+            kos_cache.set_message_id(username, message_id)
+        if updates:
+            ipc.publish("kos", {"message_ids": [[username, message_id] for message_id, _, username in updates]})
+
+    @staticmethod
+    async def get(username: str):
+        if kos_cache.loaded:
+            return kos_cache.get(username)
+        return await db[KOS_DATABASE].fetchone(
+            "SELECT username, timestamp, message_id, reason FROM kos WHERE username = ? COLLATE NOCASE",
+            (username,)
+        )
+
+    @staticmethod
+    async def create_request(username: str, reason: str, requester_id: int) -> int:
+        async with db[KOS_DATABASE].writer() as session:
+            return await session.execute_lastrowid(
+                "INSERT INTO kos_requests (username, reason, requester_id, created_at) VALUES (?, ?, ?, ?)",
+                (username, reason, requester_id, int(datetime.datetime.now(tz=TIMEZONE).timestamp()))
+            )
+
+    @staticmethod
+    async def set_request_message(request_id: int, channel_id: int, message_id: int):
+        await db[KOS_DATABASE].execute(
+            "UPDATE kos_requests SET channel_id = ?, message_id = ? WHERE id = ?", (channel_id, message_id, request_id)
+        )
+
+    @staticmethod
+    async def get_request(request_id: int):
+        return await db[KOS_DATABASE].fetchone(
+            "SELECT username, reason, requester_id, status FROM kos_requests WHERE id = ?", (request_id,)
+        )
+
+    @staticmethod
+    async def resolve_request(request_id: int, status: str, reviewer_id: int) -> bool:
+        """Atomically move a pending request to ``status``; False if someone already reviewed it."""
+        changed = await db[KOS_DATABASE].execute(
+            "UPDATE kos_requests SET status = ?, reviewer_id = ?, reviewed_at = ? WHERE id = ? AND status = 'pending'",
+            (status, reviewer_id, int(datetime.datetime.now(tz=TIMEZONE).timestamp()), request_id)
+        )
+        return changed == 1
+
+    @staticmethod
+    async def reopen_request(request_id: int):
+        """Put an accepted request back to pending when its entry couldn't be added, so it can be reviewed again."""
+        await db[KOS_DATABASE].execute(
+            "UPDATE kos_requests SET status = 'pending', reviewer_id = NULL, reviewed_at = NULL "
+            "WHERE id = ? AND status = 'accepted'",
+            (request_id,)
+        )
+
+    @staticmethod
+    async def page(after: str = None, before: str = None, limit: int = LIST_PAGE_SIZE):
+        """
+        Keyset page of entries in username order, starting after ``after`` or
+        ending before ``before``. Returns ``(rows, more)`` where ``more`` says
+        whether further rows exist in the direction of travel.
+        """
+        if before is not None:
+            rows = await db[KOS_DATABASE].fetchall(
+                "SELECT username, timestamp, message_id, reason FROM kos WHERE username < ? COLLATE NOCASE "
+                "ORDER BY username COLLATE NOCASE DESC LIMIT ?",
+                (before, limit + 1)
+            )
+            return list(reversed(rows[:limit])), len(rows) > limit
+        rows = await db[KOS_DATABASE].fetchall(
+            "SELECT username, timestamp, message_id, reason FROM kos WHERE username > ? COLLATE NOCASE "
+            "ORDER BY username COLLATE NOCASE LIMIT ?",
+            (after or "", limit + 1)
+        )
+        return rows[:limit], len(rows) > limit
+
+
+# ---------- Board ----------
+class KOSBoard:
+    """
+    Board mode: the KOS channel holds a fixed set of messages, one per page of
+    ``BOARD_PAGE_SIZE`` entries. Every entry remembers its page (``kos.board_page``),
+    new entries fill the first page with room, so adding or removing an entry
+    only re-renders that one page. Callers hold ``KOSDB.lock``.
+    """
+
+    @staticmethod
+    def render_page(page: int, rows) -> discord.Embed:
+        lines = [
+            f"**{username}** — {reason if len(reason) <= 100 else reason[:99] + '…'} • <t:{timestamp}:d>"
+            for username, timestamp, reason in rows
+        ]
+        return discord.Embed(
+            title=f"⚔️ KOS Board — Page {page + 1}",
+            description="\n".join(lines) or "*No entries on this page.*",
+            color=discord.Colour.red()
+        )
+
+    @staticmethod
+    async def _free_page() -> int:
+        page = await db[KOS_DATABASE].fetchval(
+            "SELECT board_page FROM kos WHERE board_page IS NOT NULL GROUP BY board_page "
+            "HAVING COUNT(*) < ? ORDER BY board_page LIMIT 1",
+            (BOARD_PAGE_SIZE,)
+        )
+        if page is not None:
+            return page
+        # Reuse a page that has been emptied before growing the board.
+        page = await db[KOS_DATABASE].fetchval(
+            "SELECT MIN(page) FROM kos_board WHERE page NOT IN "
+            "(SELECT board_page FROM kos WHERE board_page IS NOT NULL)"
+        )
+        if page is not None:
+            return page
+        return await db[KOS_DATABASE].fetchval(
+            "SELECT COALESCE(MAX(page), -1) + 1 FROM "
+            "(SELECT page FROM kos_board UNION SELECT board_page FROM kos WHERE board_page IS NOT NULL)"
+        )
+
+    @staticmethod
+    async def render(channel: discord.TextChannel, page: int, live_hashes: dict = None):
+        """
+        Re-render one page; returns ``(message_id, changed)``. The edit is skipped
+        when the content hash is unchanged, compared with ``live_hashes``
+        (message id -> hash from a channel scan) when given, else with the
+        stored hash.
+        """
+        rows = await db[KOS_DATABASE].fetchall(
+            "SELECT username, timestamp, reason FROM kos WHERE board_page = ? ORDER BY timestamp, username",
+            (page,)
+        )
+        embed = KOSBoard.render_page(page, rows)
+        new_hash = embed_hash(embed)
+        stored = await db[KOS_DATABASE].fetchone("SELECT message_id, content_hash FROM kos_board WHERE page = ?", (page,))
+        message_id, current_hash = stored if stored else (None, None)
+        if live_hashes is not None:
+            current_hash = live_hashes.get(message_id)
+            if current_hash is None:
+                message_id = None
+        if message_id and current_hash == new_hash:
+            return message_id, False
+
+        if message_id:
+            try:
+                await channel.get_partial_message(message_id).edit(embed=embed)
+            except discord.NotFound:
+                message_id = None
+        if not message_id:
+            message_id = (await channel.send(embed=embed)).id
+
+        async with db[KOS_DATABASE].transaction() as tx:
+            await tx.execute(
+                "INSERT OR REPLACE INTO kos_board (page, message_id, content_hash) VALUES (?, ?, ?)",
+                (page, message_id, new_hash)
+            )
+            await tx.execute("UPDATE kos SET message_id = ? WHERE board_page = ?", (message_id, page))
+        for username, _, _ in rows:
+            kos_cache.set_message_id(username, message_id)
+        ipc.publish("kos", {"message_ids": [[username, message_id] for username, _, _ in rows]})
+        return message_id, True
+
+    @staticmethod
+    async def add(channel: discord.TextChannel, username: str, reason: str, timestamp: int):
+        page = await KOSBoard._free_page()
+        await KOSDB.add(username, reason, 0, timestamp, board_page=page)
+        await KOSBoard.render(channel, page)
+
+    @staticmethod
+    async def remove(channel: discord.TextChannel, username: str):
+        page = await db[KOS_DATABASE].fetchval(
+            "SELECT board_page FROM kos WHERE username = ? COLLATE NOCASE", (username,)
+        )
+        await KOSDB.remove(username)
+        if page is not None:
+            await KOSBoard.render(channel, page)
+
+    @staticmethod
+    async def rebuild(channel: discord.TextChannel, live_hashes: dict = None) -> int:
+        """Place unassigned entries and re-render every page. Returns the number of pages that changed."""
+        unassigned = await db[KOS_DATABASE].fetchall(
+            "SELECT username FROM kos WHERE board_page IS NULL ORDER BY timestamp, username"
+        )
+        for (username,) in unassigned:
+            page = await KOSBoard._free_page()
+            await db[KOS_DATABASE].execute("UPDATE kos SET board_page = ? WHERE username = ?", (page, username))
+        pages = await db[KOS_DATABASE].fetchall(
+            "SELECT board_page FROM kos WHERE board_page IS NOT NULL UNION SELECT page FROM kos_board ORDER BY 1"
+        )
+        changed = 0
+        for (page,) in pages:
+            _, page_changed = await KOSBoard.render(channel, page, live_hashes)
+            changed += page_changed
+        return changed
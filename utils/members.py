@@ -0,0 +1,51 @@
+import discord
+
+
+def _intents(presences: bool) -> discord.Intents:
+    intents = discord.Intents.all()
+    intents.presences = presences
+    return intents
+
+
+# Each policy is the keyword arguments for the bot's constructor.
+POLICIES = {
+    # Every member and presence of every guild, chunked at startup. Memory grows with guild size.
+    "full": lambda: dict(intents=_intents(True), member_cache_flags=discord.MemberCacheFlags.all(),
+                         chunk_guilds_at_startup=True),
+    # No presences and no chunking. Only members seen joining while the bot runs are cached.
+    "lean": lambda: dict(intents=_intents(False), member_cache_flags=discord.MemberCacheFlags(voice=False),
+                         chunk_guilds_at_startup=False),
+    # No member cache at all beyond the bot itself. Every lookup goes through get_member/get_user below.
+    "minimal": lambda: dict(intents=_intents(False), member_cache_flags=discord.MemberCacheFlags.none(),
+                            chunk_guilds_at_startup=False),
+}
+
+
+def member_options(policy: str) -> dict:
+    """Constructor keyword arguments for ``policy`` (``full``, ``lean`` or ``minimal``)."""
+    try:
+        return POLICIES[policy]()
+    except KeyError:
+        raise ValueError(f"Unknown member cache policy {policy!r}, expected one of {', '.join(POLICIES)}") from None
+
+
+async def get_member(guild: discord.Guild, user_id: int):
+    """The member from the cache, or fetched over REST when the policy didn't keep them. None if they left."""
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    try:
+        return await guild.fetch_member(user_id)
+    except discord.NotFound:
+        return None
+
+
+async def get_user(client: discord.Client, user_id: int):
+    """Like ``get_member`` for users, e.g. to DM someone who isn't cached. None if the account is gone."""
+    user = client.get_user(user_id)
+    if user is not None:
+        return user
+    try:
+        return await client.fetch_user(user_id)
+    except discord.NotFound:
+        return None
@@ -0,0 +1,329 @@
+import asyncio
+import bisect
+import functools
+import logging
+import math
+import time
+
+import discord
+
+_log = logging.getLogger(__name__)
+
+# ---------- CONFIG ----------
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # seconds
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+LAG_INTERVAL = 0.5  # seconds between event-loop lag probes
+# ----------------------------
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """
+    One metric family. ``labels(*values)`` returns the child for those label
+    values, created on first use and kept, so call sites on a hot path can
+    hold on to it; updating a child is a plain attribute add, and the bot's
+    single event loop means no lock is needed. A ``collect`` callable makes
+    the family read its values at scrape time instead (``{label values: value}``).
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels=(), collect=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self.collect = collect
+        self.children = {}
+        self._default = None if self.labelnames else self.labels()
+
+    def _new(self):
+        return _Value()
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self._new()
+        return child
+
+    def samples(self):
+        if self.collect is not None:
+            for values, value in self.collect().items():
+                yield self.name, _labels(self.labelnames, values), value
+            return
+        for values, child in list(self.children.items()):
+            yield self.name, _labels(self.labelnames, values), child.value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {_number(value)}" for name, labels, value in self.samples()]
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1):
+        self._default.value += amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value):
+        self._default.value = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, labels)
+
+    def _new(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def samples(self):
+        for values, child in list(self.children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += count
+                yield f"{self.name}_bucket", _labels(self.labelnames, values, f'le="{_number(bound)}"'), cumulative
+            yield f"{self.name}_sum", _labels(self.labelnames, values), child.sum
+            yield f"{self.name}_count", _labels(self.labelnames, values), child.count
+
+
+class _RateLimitHandler(logging.Handler):
+    """Counts discord.py's 429 warnings; the library has no event for them."""
+
+    def __init__(self, counter: Counter):
+        super().__init__(logging.WARNING)
+        self.route = counter.labels("route")
+        self.global_ = counter.labels("global")
+
+    def emit(self, record: logging.LogRecord):
+        message = record.msg if isinstance(record.msg, str) else ""
+        if message.startswith("We are being rate limited"):
+            self.route.inc()
+        elif message.startswith("Global rate limit has been hit"):
+            self.global_.inc()
+
+
+class Metrics:
+    """
+    The bot's metrics registry and the small aiohttp server that exposes it
+    in Prometheus text format on ``/metrics``. ``start`` also wires up the
+    instrumentation that needs the bot: slash command completion and errors,
+    REST requests, rate limits, shard latency and event-loop lag.
+    """
+
+    def __init__(self):
+        self.families = []
+        self.bot = None
+        self.runner = None
+        self._lag_task = None
+        self._rate_limits = None
+        self.interaction_seconds = self.histogram(
+            "revelation_interaction_seconds", "Time from Discord creating an interaction to its handler finishing.",
+            ("handler", "outcome"))
+        self.interaction_ack_seconds = self.histogram(
+            "revelation_interaction_ack_seconds", "Time from Discord creating an interaction to our acknowledgement.",
+            ("handler",))
+        self.db_query_seconds = self.histogram(
+            "revelation_db_query_seconds", "SQLite statement time, including the aiosqlite thread hop.",
+            buckets=QUERY_BUCKETS)
+        self.rest_request_seconds = self.histogram(
+            "revelation_rest_request_seconds", "Discord REST request time, including rate limit waits.",
+            ("method", "route", "outcome"))
+        self.rate_limits = self.counter(
+            "revelation_rate_limits_total", "429 responses from Discord's REST API.", ("scope",))
+        self.loop_lag_seconds = self.histogram(
+            "revelation_event_loop_lag_seconds", "How late a timer on the event loop fired.")
+        self.gateway_latency = self.gauge(
+            "revelation_gateway_latency_seconds", "Heartbeat latency per shard.", ("shard",),
+            collect=self._shard_latencies)
+
+    def _register(self, family: Metric) -> Metric:
+        self.families.append(family)
+        return family
+
+    def counter(self, name: str, help: str, labels=(), collect=None) -> Counter:
+        return self._register(Counter(name, help, labels, collect))
+
+    def gauge(self, name: str, help: str, labels=(), collect=None) -> Gauge:
+        return self._register(Gauge(name, help, labels, collect))
+
+    def histogram(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for family in self.families:
+            lines += family.render()
+        return "\n".join(lines) + "\n"
+
+    def _shard_latencies(self):
+        if self.bot is None:
+            return {}
+        latencies = getattr(self.bot, "latencies", None) or [(self.bot.shard_id or 0, self.bot.latency)]
+        return {(shard,): latency for shard, latency in latencies if math.isfinite(latency)}
+
+    # ---------- Instrumentation ----------
+    @staticmethod
+    def claim(interaction: discord.Interaction) -> bool:
+        """
+        True only the first time it is called for ``interaction``. Whoever gets
+        it records the interaction's latency, so a handler that hands its work
+        to respond_first is observed once, when that job ends.
+        """
+        if interaction.extras.get("metrics_claimed"):
+            return False
+        interaction.extras["metrics_claimed"] = True
+        return True
+
+    def observe_interaction(self, interaction: discord.Interaction, handler: str, outcome: str = "ok"):
+        seconds = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        self.interaction_seconds.labels(handler, outcome).observe(seconds)
+
+    def timed(self, handler: str):
+        """Decorator for button and modal callbacks, observing the interaction when the callback returns."""
+        def decorator(callback):
+            @functools.wraps(callback)
+            async def wrapper(*args, **kwargs):
+                interaction = next(arg for arg in args if isinstance(arg, discord.Interaction))
+                try:
+                    result = await callback(*args, **kwargs)
+                except Exception:
+                    if self.claim(interaction):
+                        self.observe_interaction(interaction, handler, "error")
+                    raise
+                if self.claim(interaction):
+                    self.observe_interaction(interaction, handler)
+                return result
+            return wrapper
+        return decorator
+
+    def _instrument_http(self, http):
+        request = http.request
+        histogram = self.rest_request_seconds
+
+        async def timed_request(route, **kwargs):
+            start = time.perf_counter()
+            outcome = "ok"
+            try:
+                return await request(route, **kwargs)
+            except discord.HTTPException as e:
+                outcome = str(e.status)
+                raise
+            except Exception:
+                outcome = "error"
+                raise
+            finally:
+                histogram.labels(route.method, route.path, outcome).observe(time.perf_counter() - start)
+
+        http.request = timed_request
+
+    def _instrument_tree(self, tree):
+        default_on_error = tree.on_error
+
+        async def on_error(interaction: discord.Interaction, error):
+            name = interaction.command.qualified_name if interaction.command else "unknown"
+            if self.claim(interaction):
+                self.observe_interaction(interaction, f"/{name}", "error")
+            await default_on_error(interaction, error)
+
+        async def on_completion(interaction: discord.Interaction, command):
+            if self.claim(interaction):  # not when respond_first took over; its job records the time
+                self.observe_interaction(interaction, f"/{command.qualified_name}")
+
+        tree.on_error = on_error
+        self.bot.add_listener(on_completion, "on_app_command_completion")
+
+    async def _probe_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            self.loop_lag_seconds.observe(max(loop.time() - start - LAG_INTERVAL, 0.0))
+
+    async def start(self, bot, port: int, host: str = "127.0.0.1"):
+        """Instrument ``bot`` and serve ``/metrics`` on ``host:port``."""
+        from aiohttp import web  # only pulled in when metrics are enabled
+
+        self.bot = bot
+        self._instrument_http(bot.http)
+        self._instrument_tree(bot.tree)
+        self._rate_limits = _RateLimitHandler(self.rate_limits)
+        logging.getLogger("discord.http").addHandler(self._rate_limits)
+        self._lag_task = asyncio.create_task(self._probe_lag())
+
+        async def serve(request):
+            return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", serve)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        _log.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    async def close(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+        if self._rate_limits is not None:
+            logging.getLogger("discord.http").removeHandler(self._rate_limits)
+            self._rate_limits = None
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+metrics = Metrics()
@@ -0,0 +1,202 @@
+import logging
+import time
+
+from utils.database import ConnectionPool
+from utils.kos_search import INDEX_MIGRATION as KOS_SEARCH_INDEX
+
+_log = logging.getLogger(__name__)
+
+# Each migration is (version, name, statements). Versions only ever grow; never
+# edit a migration that has shipped, add a new one instead.
+KOS_MIGRATIONS = [
+    (1, "create kos table", (
+        """
+        CREATE TABLE IF NOT EXISTS kos (
+            username TEXT PRIMARY KEY,
+            timestamp INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            reason TEXT NOT NULL
+        )
+        """,
+    )),
+    (2, "case-insensitive username index", (
+        "CREATE INDEX IF NOT EXISTS idx_kos_username_nocase ON kos (username COLLATE NOCASE)",
+    )),
+    (3, "refresh pipeline state", (
+        "ALTER TABLE kos ADD COLUMN embed_hash TEXT",
+        """
+        CREATE TABLE IF NOT EXISTS kos_refresh_checkpoint (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_username TEXT NOT NULL,
+            started_at INTEGER NOT NULL,
+            skipped INTEGER NOT NULL DEFAULT 0,
+            edited INTEGER NOT NULL DEFAULT 0,
+            reposted INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+    )),
+    (4, "kos board pages", (
+        "ALTER TABLE kos ADD COLUMN board_page INTEGER",
+        "CREATE INDEX IF NOT EXISTS idx_kos_board_page ON kos (board_page)",
+        """
+        CREATE TABLE IF NOT EXISTS kos_board (
+            page INTEGER PRIMARY KEY,
+            message_id INTEGER,
+            content_hash TEXT
+        )
+        """,
+    )),
+    (5, "kos full-text and trigram search", KOS_SEARCH_INDEX),
+    (6, "persistent kos requests", (
+        """
+        CREATE TABLE IF NOT EXISTS kos_requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            requester_id INTEGER NOT NULL,
+            channel_id INTEGER,
+            message_id INTEGER,
+            status TEXT NOT NULL DEFAULT 'pending',
+            reviewer_id INTEGER,
+            created_at INTEGER NOT NULL,
+            reviewed_at INTEGER
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_kos_requests_status ON kos_requests (status)",
+    )),
+    (7, "count failed rows in the refresh checkpoint", (
+        "ALTER TABLE kos_refresh_checkpoint ADD COLUMN failed INTEGER NOT NULL DEFAULT 0",
+    )),
+]
+
+TICKET_MIGRATIONS = [
+    (1, "create tickets table", (
+        """
+        CREATE TABLE IF NOT EXISTS tickets (
+            channel_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            reason TEXT NOT NULL
+        )
+        """,
+    )),
+    (2, "index tickets by user", (
+        "CREATE INDEX IF NOT EXISTS idx_tickets_user_id ON tickets (user_id)",
+    )),
+    (3, "ticket transcripts", (
+        """
+        CREATE TABLE IF NOT EXISTS ticket_transcripts (
+            channel_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            reason TEXT NOT NULL,
+            path TEXT NOT NULL,
+            html_path TEXT,
+            message_count INTEGER NOT NULL,
+            compressed_bytes INTEGER NOT NULL,
+            closed_by INTEGER,
+            archived_at INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_ticket_transcripts_user_id ON ticket_transcripts (user_id)",
+    )),
+    (4, "ticket threads and overflow categories", (
+        "ALTER TABLE tickets ADD COLUMN kind TEXT NOT NULL DEFAULT 'channel'",
+        "ALTER TABLE tickets ADD COLUMN category_id INTEGER",
+        """
+        CREATE TABLE IF NOT EXISTS ticket_categories (
+            category_id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            channel_count INTEGER NOT NULL,
+            capacity INTEGER NOT NULL
+        )
+        """,
+    )),
+    (5, "ticket lifecycle", (
+        "ALTER TABLE tickets ADD COLUMN status TEXT NOT NULL DEFAULT 'open'",
+        "ALTER TABLE tickets ADD COLUMN opened_at INTEGER",
+        "ALTER TABLE tickets ADD COLUMN closed_at INTEGER",
+        "ALTER TABLE tickets ADD COLUMN last_activity_at INTEGER",
+        "ALTER TABLE tickets ADD COLUMN reminded_at INTEGER",
+        "ALTER TABLE tickets ADD COLUMN claimed_by INTEGER",
+        "UPDATE tickets SET opened_at = CAST(strftime('%s', 'now') AS INTEGER), last_activity_at = CAST(strftime('%s', 'now') AS INTEGER)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets (status, last_activity_at)",
+    )),
+    (6, "one open ticket per user", (
+        # Older rows could hold several open tickets per user; keep the newest open.
+        """
+        UPDATE tickets SET status = 'closed', closed_at = CAST(strftime('%s', 'now') AS INTEGER)
+        WHERE status = 'open' AND rowid NOT IN (SELECT MAX(rowid) FROM tickets WHERE status = 'open' GROUP BY user_id)
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_tickets_open_user ON tickets (user_id) WHERE status = 'open'",
+    )),
+]
+
+
+async def migrate(pool: ConnectionPool, migrations) -> int:
+    """Bring the database at ``pool`` up to the latest version in place. Returns the number of migrations applied."""
+    await pool.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at INTEGER NOT NULL
+        )
+        """
+    )
+    current = await pool.fetchval("SELECT MAX(version) FROM schema_migrations", default=None) or 0
+
+    applied = 0
+    for version, name, statements in migrations:
+        if version <= current:
+            continue
+        async with pool.transaction() as tx:
+            # Another process sharing the file may have applied it while we waited for the write lock.
+            if await tx.fetchval("SELECT 1 FROM schema_migrations WHERE version = ?", (version,)):
+                continue
+            for statement in statements:
+                await tx.execute(statement)
+            await tx.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (version, name, int(time.time()))
+            )
+        _log.info(f"{pool.path}: applied migration {version} ({name})")
+        applied += 1
+
+    if applied:
+        await pool.execute("PRAGMA optimize")
+    return applied
+
+
+BOT_MIGRATIONS = [
+    (1, "deployed panels", (
+        """
+        CREATE TABLE IF NOT EXISTS panels (
+            panel TEXT NOT NULL,
+            channel_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            deployed_at INTEGER NOT NULL,
+            PRIMARY KEY (panel, channel_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_panels_message_id ON panels (message_id)",
+    )),
+    (2, "verification challenges", (
+        """
+        CREATE TABLE IF NOT EXISTS verification_challenges (
+            user_id INTEGER PRIMARY KEY,
+            code_hash BLOB NOT NULL,
+            expires_at INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_verification_challenges_expires_at ON verification_challenges (expires_at)",
+    )),
+    (3, "command sync hashes", (
+        """
+        CREATE TABLE IF NOT EXISTS command_sync (
+            scope TEXT PRIMARY KEY,
+            payload_hash TEXT NOT NULL,
+            synced_at INTEGER NOT NULL
+        )
+        """,
+    )),
+]
@@ -0,0 +1,114 @@
+import asyncio
+import datetime
+import logging
+
+import discord
+
+_log = logging.getLogger(__name__)
+
+# ---------- CONFIG ----------
+MAX_QUEUE = 500  # pending log embeds held in memory
+BATCH_SIZE = 10  # Discord allows 10 embeds per message
+FLUSH_INTERVAL = 2.0  # seconds a partial batch may wait
+BACKPRESSURE_TIMEOUT = 1.0  # how long log() waits for room before dropping
+# ----------------------------
+
+
+class ModLogWriter:
+    """
+    Buffered mod-log sink. Callers enqueue embeds and return immediately; a
+    single background task packs them up to ten per message and sends them to
+    the mod-log channel (or a webhook), so a burst of moderation actions costs
+    a handful of requests instead of one per action.
+    """
+
+    def __init__(self):
+        self.bot = None
+        self.channel_id = None
+        self.webhook = None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_QUEUE)
+        self.sent = 0
+        self.dropped = 0
+        self._pending = []  # the batch being assembled or sent, so close() can still flush it
+        self._task = None
+
+    def start(self, bot: discord.Client, channel_id: int, webhook_url: str = None):
+        self.bot = bot
+        self.channel_id = channel_id
+        if webhook_url:
+            self.webhook = discord.Webhook.from_url(webhook_url, client=bot)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def log(self, title: str, description: str, color=discord.Color.blurple()) -> bool:
+        """Queue one entry. Waits briefly when the buffer is full; returns False if it had to drop the entry."""
+        embed = discord.Embed(
+            title=title, description=description,
+            color=color, timestamp=datetime.datetime.now(datetime.timezone.utc)
+        )
+        try:
+            self.queue.put_nowait(embed)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self.queue.put(embed), BACKPRESSURE_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.dropped += 1
+                _log.warning(f"Mod log buffer full, dropped entry: {title}")
+                return False
+        return True
+
+    async def _fill_batch(self):
+        self._pending.append(await self.queue.get())
+        deadline = asyncio.get_running_loop().time() + FLUSH_INTERVAL
+        while len(self._pending) < BATCH_SIZE:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                self._pending.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def _send(self, batch):
+        try:
+            if self.webhook:
+                await self.webhook.send(embeds=batch, username="Mod Log")
+            else:
+                channel = self.bot.get_channel(self.channel_id)
+                if channel is None:
+                    _log.warning(f"Mod log channel {self.channel_id} not found, dropped {len(batch)} entries")
+                    self.dropped += len(batch)
+                    return
+                await channel.send(embeds=batch)
+            self.sent += len(batch)
+        except discord.HTTPException as e:
+            self.dropped += len(batch)
+            _log.warning(f"Failed to send {len(batch)} mod log entries: {e}")
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        while True:
+            await self._fill_batch()
+            await self._send(self._pending)
+            self._pending = []
+
+    async def close(self):
+        """Stop the background task and flush everything still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        batch, self._pending = self._pending, []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+            if len(batch) >= BATCH_SIZE:
+                await self._send(batch[:BATCH_SIZE])
+                batch = batch[BATCH_SIZE:]
+        if batch:
+            await self._send(batch)
+
+
+modlog = ModLogWriter()
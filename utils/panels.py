@@ -0,0 +1,108 @@
+import hashlib
+import json
+import logging
+import time
+
+import discord
+
+from utils.database import ConnectionPool
+
+_log = logging.getLogger(__name__)
+
+
+class Panel:
+    """
+    A static panel (one or more embeds plus an optional view), built once and
+    kept as serialized embed dicts. Timestamps are stripped before hashing and
+    stamped back on at send time, so the hash only changes with the content.
+    """
+
+    def __init__(self, key: str, label: str, embeds, view=None):
+        self.key = key
+        self.label = label
+        self.view = view  # no-argument callable returning a fresh View, or None
+        self.embeds = []
+        self.stamped = []
+        for embed in embeds:
+            data = embed.to_dict()
+            self.stamped.append(data.pop("timestamp", None) is not None)
+            self.embeds.append(data)
+        payload = json.dumps({"embeds": self.embeds, "view": view is not None}, sort_keys=True, separators=(",", ":"))
+        self.content_hash = hashlib.sha1(payload.encode()).hexdigest()
+
+    def render(self):
+        """``send``/``edit`` keyword arguments with fresh embed objects and view."""
+        now = discord.utils.utcnow()
+        embeds = []
+        for data, stamped in zip(self.embeds, self.stamped):
+            embed = discord.Embed.from_dict(data)
+            if stamped:
+                embed.timestamp = now
+            embeds.append(embed)
+        kwargs = {"embeds": embeds}
+        if self.view is not None:
+            kwargs["view"] = self.view()
+        return kwargs
+
+
+class PanelRegistry:
+    """
+    The deployable panels and where each one is posted. Deploying a panel to a
+    channel it already lives in edits that message in place, or does nothing
+    at all when the stored content hash still matches.
+    """
+
+    def __init__(self):
+        self.pool = None
+        self.panels = {}
+        self.deployed = {}  # (key, channel_id) -> (message_id, content_hash)
+        self.message_ids = {}  # message_id -> (key, channel_id)
+
+    def register(self, key: str, label: str, embeds, view=None):
+        self.panels[key] = Panel(key, label, embeds, view)
+
+    async def load(self, pool: ConnectionPool):
+        self.pool = pool
+        rows = await pool.fetchall("SELECT panel, channel_id, message_id, content_hash FROM panels")
+        self.deployed = {(key, channel_id): (message_id, content_hash) for key, channel_id, message_id, content_hash in rows}
+        self.message_ids = {message_id: (key, channel_id) for key, channel_id, message_id, _ in rows}
+
+    async def _save(self, panel: Panel, channel_id: int, message_id: int):
+        old = self.deployed.get((panel.key, channel_id))
+        if old:
+            self.message_ids.pop(old[0], None)
+        self.deployed[(panel.key, channel_id)] = (message_id, panel.content_hash)
+        self.message_ids[message_id] = (panel.key, channel_id)
+        await self.pool.execute(
+            "INSERT OR REPLACE INTO panels (panel, channel_id, message_id, content_hash, deployed_at) VALUES (?, ?, ?, ?, ?)",
+            (panel.key, channel_id, message_id, panel.content_hash, int(time.time()))
+        )
+
+    async def deploy(self, key: str, channel) -> str:
+        """Post, edit or skip ``key`` in ``channel``. Returns ``"posted"``, ``"edited"`` or ``"unchanged"``."""
+        panel = self.panels[key]
+        current = self.deployed.get((key, channel.id))
+        if current:
+            message_id, content_hash = current
+            if content_hash == panel.content_hash:
+                return "unchanged"
+            try:
+                await channel.get_partial_message(message_id).edit(**panel.render())
+                await self._save(panel, channel.id, message_id)
+                return "edited"
+            except discord.NotFound:
+                _log.info(f"Panel {key} message {message_id} is gone, posting a new one")
+        message = await channel.send(**panel.render())
+        await self._save(panel, channel.id, message.id)
+        return "posted"
+
+    async def forget(self, message_id: int):
+        """Drop a panel message that was deleted, so the next deploy posts it again."""
+        placement = self.message_ids.pop(message_id, None)
+        if placement is None:
+            return
+        self.deployed.pop(placement, None)
+        await self.pool.execute("DELETE FROM panels WHERE message_id = ?", (message_id,))
+
+
+panels = PanelRegistry()
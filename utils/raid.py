@@ -0,0 +1,150 @@
+import collections
+import re
+
+# ---------- CONFIG ----------
+WINDOW = 60.0  # seconds of history each score looks at
+RING_SIZE = 4096  # events kept per ring; a window holding more only counts the newest RING_SIZE
+JOIN_RATE_LIMIT = 15  # joins per window that count as full pressure on their own
+ATTEMPT_RATE_LIMIT = 30  # verification attempts per window that count as full pressure
+NEW_ACCOUNT_AGE = 7 * 86400  # accounts younger than this (seconds) count as suspicious
+LOCKDOWN_SCORE = 1.0
+# ----------------------------
+
+_SEPARATORS = re.compile(r"[\d_.\-]+")
+
+
+def name_shape(name: str) -> str:
+    """
+    Cheap similarity key: ``Raider_123`` and ``raider.4567`` both become
+    ``raider``. Raid waves reuse a stem with a counter far more often than
+    organic joins share one, and a dict keyed on the stem keeps it O(1).
+    """
+    return _SEPARATORS.sub("", name.lower())[:8]
+
+
+class RingWindow:
+    """
+    Fixed-size ring of ``(timestamp, tag)`` events. ``count`` is the number of
+    events inside the trailing ``window``; each push expires old events from
+    the tail, so the cost per event is O(1) amortised. ``on_evict(tag)`` is
+    called for every event that leaves the window.
+    """
+
+    __slots__ = ("size", "window", "times", "tags", "head", "count", "on_evict")
+
+    def __init__(self, size: int, window: float, on_evict=None):
+        self.size = size
+        self.window = window
+        self.times = [0.0] * size
+        self.tags = [None] * size
+        self.head = 0  # next slot to write
+        self.count = 0
+        self.on_evict = on_evict
+
+    def expire(self, now: float):
+        cutoff = now - self.window
+        while self.count:
+            tail = (self.head - self.count) % self.size
+            if self.times[tail] > cutoff:
+                break
+            self._evict(tail)
+
+    def _evict(self, slot: int):
+        self.count -= 1
+        if self.on_evict is not None:
+            self.on_evict(self.tags[slot])
+        self.tags[slot] = None
+
+    def push(self, now: float, tag=None):
+        self.expire(now)
+        if self.count == self.size:
+            self._evict(self.head)  # the oldest event lives in the slot we're about to reuse
+        self.times[self.head] = now
+        self.tags[self.head] = tag
+        self.head = (self.head + 1) % self.size
+        self.count += 1
+
+
+class RaidDetector:
+    """
+    Scores one guild's recent joins and verification attempts.
+
+    ``score = pressure * (0.25 + suspicion)`` where pressure is the busier of
+    joins and attempts relative to their limits, and suspicion averages the
+    share of young accounts with the share of joins matching the newest
+    joiner's name shape. Organic traffic needs four times the join limit to
+    reach 1.0; a wave of fresh, look-alike accounts needs four fifths of it.
+    """
+
+    def __init__(self):
+        self.young = 0
+        self.shapes = collections.Counter()
+        self.joins = RingWindow(RING_SIZE, WINDOW, self._forget_join)
+        self.attempts = RingWindow(RING_SIZE, WINDOW)
+        self.last_shape = None
+        self.score = 0.0
+        self.peak = 0.0
+        self.events = 0
+
+    def _forget_join(self, tag):
+        young, shape = tag
+        self.young -= young
+        self.shapes[shape] -= 1
+        if not self.shapes[shape]:
+            del self.shapes[shape]
+
+    def join(self, now: float, created_at: float, name: str) -> float:
+        young = now - created_at < NEW_ACCOUNT_AGE
+        shape = name_shape(name)
+        self.joins.push(now, (young, shape))
+        self.young += young
+        self.shapes[shape] += 1
+        self.last_shape = shape
+        return self._rescore(now)
+
+    def attempt(self, now: float) -> float:
+        self.attempts.push(now)
+        return self._rescore(now)
+
+    def _rescore(self, now: float) -> float:
+        self.joins.expire(now)
+        self.attempts.expire(now)
+        self.events += 1
+        joins = self.joins.count
+        pressure = max(joins / JOIN_RATE_LIMIT, self.attempts.count / ATTEMPT_RATE_LIMIT)
+        suspicion = 0.0
+        if joins:
+            similar = self.shapes.get(self.last_shape, 0) if self.last_shape else 0
+            suspicion = (self.young / joins + similar / joins) / 2
+        self.score = pressure * (0.25 + suspicion)
+        self.peak = max(self.peak, self.score)
+        return self.score
+
+    @property
+    def tripped(self) -> bool:
+        return self.score >= LOCKDOWN_SCORE
+
+
+class RaidMonitor:
+    """Per-guild detectors plus which guilds are currently locked down."""
+
+    def __init__(self):
+        self.detectors = collections.defaultdict(RaidDetector)
+        self.locked = {}  # guild_id -> verification level to restore when lifted
+
+    def join(self, guild_id: int, now: float, created_at: float, name: str) -> bool:
+        """Record a join; True the moment it should trigger a lockdown."""
+        detector = self.detectors[guild_id]
+        detector.join(now, created_at, name)
+        return detector.tripped and guild_id not in self.locked
+
+    def attempt(self, guild_id: int, now: float) -> bool:
+        detector = self.detectors[guild_id]
+        detector.attempt(now)
+        return detector.tripped and guild_id not in self.locked
+
+    def is_locked(self, guild_id: int) -> bool:
+        return guild_id in self.locked
+
+
+raid_monitor = RaidMonitor()
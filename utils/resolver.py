@@ -0,0 +1,111 @@
+import logging
+
+import discord
+
+_log = logging.getLogger(__name__)
+
+
+class Resolver:
+    """
+    Maps the roles and channels the bot is configured with (by id or by name)
+    to the live objects for each guild. A guild's map is built once, the first
+    time it is used or becomes available, and kept current from the
+    role/channel events, so lookups are a dict hit with no scans or REST calls.
+    """
+
+    def __init__(self):
+        self.bot = None
+        self.specs = {"role": {}, "channel": {}}  # kind -> {key: (id, name)}
+        self.guilds = {}  # guild_id -> {(kind, key): object or None}
+        self.rebuilds = 0
+
+    def add_role(self, key: str, id: int = None, name: str = None):
+        self.specs["role"][key] = (id, name)
+        self.guilds.clear()
+
+    def add_channel(self, key: str, id: int = None, name: str = None):
+        self.specs["channel"][key] = (id, name)
+        self.guilds.clear()
+
+    # ---------- Lookups ----------
+    def guild(self, guild_id: int):
+        return self.bot.get_guild(guild_id)
+
+    def _entries(self, guild: discord.Guild):
+        entries = self.guilds.get(guild.id)
+        if entries is None:
+            entries = self.build(guild)
+        return entries
+
+    def role(self, guild: discord.Guild, key: str):
+        return self._entries(guild).get(("role", key))
+
+    def channel(self, guild: discord.Guild, key: str):
+        return self._entries(guild).get(("channel", key))
+
+    def has_role(self, member: discord.Member, key: str) -> bool:
+        role = self.role(member.guild, key)
+        return role is not None and member.get_role(role.id) is not None
+
+    # ---------- Building ----------
+    @staticmethod
+    def _resolve(guild: discord.Guild, kind: str, id: int, name: str):
+        if kind == "role":
+            return guild.get_role(id) if id else discord.utils.get(guild.roles, name=name)
+        return guild.get_channel(id) if id else discord.utils.get(guild.text_channels, name=name)
+
+    def build(self, guild: discord.Guild):
+        entries = {}
+        for kind, specs in self.specs.items():
+            for key, (id, name) in specs.items():
+                entries[(kind, key)] = self._resolve(guild, kind, id, name)
+                if entries[(kind, key)] is None:
+                    _log.warning(f"{guild.name}: configured {kind} {key!r} ({id or name}) not found")
+        self.guilds[guild.id] = entries
+        self.rebuilds += 1
+        return entries
+
+    def _refresh(self, guild: discord.Guild, kind: str, *objects):
+        """Re-resolve only the keys that point at one of ``objects`` by id or name."""
+        entries = self.guilds.get(guild.id)
+        if entries is None:
+            return
+        ids = {obj.id for obj in objects}
+        names = {obj.name for obj in objects}
+        for key, (id, name) in self.specs[kind].items():
+            if id in ids or (not id and name in names):
+                entries[(kind, key)] = self._resolve(guild, kind, id, name)
+
+    # ---------- Events ----------
+    def attach(self, bot: discord.Client):
+        self.bot = bot
+        bot.add_listener(self.on_guild_available, "on_guild_available")
+        bot.add_listener(self.on_guild_available, "on_guild_join")
+        bot.add_listener(self.on_guild_remove, "on_guild_remove")
+        bot.add_listener(self.on_guild_role_create, "on_guild_role_create")
+        bot.add_listener(self.on_guild_role_create, "on_guild_role_delete")
+        bot.add_listener(self.on_guild_role_update, "on_guild_role_update")
+        bot.add_listener(self.on_guild_channel_create, "on_guild_channel_create")
+        bot.add_listener(self.on_guild_channel_create, "on_guild_channel_delete")
+        bot.add_listener(self.on_guild_channel_update, "on_guild_channel_update")
+
+    async def on_guild_available(self, guild: discord.Guild):
+        self.build(guild)
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.guilds.pop(guild.id, None)
+
+    async def on_guild_role_create(self, role: discord.Role):
+        self._refresh(role.guild, "role", role)
+
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        self._refresh(after.guild, "role", before, after)
+
+    async def on_guild_channel_create(self, channel):
+        self._refresh(channel.guild, "channel", channel)
+
+    async def on_guild_channel_update(self, before, after):
+        self._refresh(after.guild, "channel", before, after)
+
+
+resolver = Resolver()
@@ -0,0 +1,145 @@
+import importlib.abc
+import json
+import logging
+import os
+import sys
+import time
+
+_log = logging.getLogger(__name__)
+
+# ---------- CONFIG ----------
+TOP_IMPORTS = 15  # slowest modules listed in the logged report
+# ----------------------------
+
+STARTED = time.perf_counter()
+
+
+def _setting():
+    for arg in sys.argv[1:]:
+        if arg == "--startup-report":
+            return "1"
+        if arg.startswith("--startup-report="):
+            return arg.split("=", 1)[1]
+    return os.getenv("STARTUP_REPORT")
+
+
+class _TimedLoader:
+    """Wraps a module's loader so its ``exec_module`` is timed; everything else passes through."""
+
+    def __init__(self, loader, timer):
+        self._loader = loader
+        self._timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._timer.enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer.exit(module.__name__)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Meta path finder that asks the real finders for each spec and wraps the
+    loader. Nested imports run inside their parent's ``exec_module``, so a
+    stack of child totals turns cumulative times into self times, like
+    ``python -X importtime``.
+    """
+
+    def __init__(self):
+        self.modules = {}  # name -> (self seconds, cumulative seconds)
+        self._stack = []  # [start, seconds spent in child imports]
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+    def enter(self):
+        self._stack.append([time.perf_counter(), 0.0])
+
+    def exit(self, name: str):
+        start, children = self._stack.pop()
+        cumulative = time.perf_counter() - start
+        self.modules[name] = (cumulative - children, cumulative)
+        if self._stack:
+            self._stack[-1][1] += cumulative
+
+
+class StartupReport:
+    """
+    Opt-in startup profiling: how long each module took to import and how long
+    the bot took to reach each startup phase. Enabled with ``--startup-report``
+    (log the report) or ``--startup-report=<path>`` / ``STARTUP_REPORT=<path>``
+    (also write it as JSON); ``STARTUP_REPORT=1`` just logs it. Phases are
+    measured from when this module was imported, so import it first.
+    """
+
+    def __init__(self):
+        self.setting = _setting()
+        self.timer = None
+        self.phases = {}  # phase -> seconds since this module was imported
+        self.extra = {}
+        self.reported = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.setting)
+
+    def install(self):
+        if self.enabled and self.timer is None:
+            self.timer = ImportTimer()
+            sys.meta_path.insert(0, self.timer)
+
+    def mark(self, phase: str, **extra):
+        """Record that ``phase`` finished now, with any numbers worth reporting alongside it."""
+        self.phases.setdefault(phase, time.perf_counter() - STARTED)
+        self.extra.update(extra)
+
+    def uninstall(self):
+        if self.timer is not None and self.timer in sys.meta_path:
+            sys.meta_path.remove(self.timer)
+
+    def as_dict(self):
+        modules = self.timer.modules if self.timer else {}
+        return {
+            "phases_ms": {phase: round(seconds * 1000, 1) for phase, seconds in self.phases.items()},
+            "imports_ms": {
+                name: {"self": round(own * 1000, 2), "cumulative": round(total * 1000, 2)}
+                for name, (own, total) in sorted(modules.items(), key=lambda item: item[1][0], reverse=True)
+            },
+            "modules_imported": len(modules),
+            **self.extra,
+        }
+
+    def report(self):
+        """Log the report (and write it if a path was given) once, the first time the bot is ready."""
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        self.uninstall()
+        data = self.as_dict()
+        lines = ["Startup report: " + ", ".join(f"{phase} {ms:.0f} ms" for phase, ms in data["phases_ms"].items())]
+        lines += [f"  {key}: {value}" for key, value in self.extra.items()]
+        lines.append(f"  {data['modules_imported']} modules imported; slowest by self time:")
+        for name, times in list(data["imports_ms"].items())[:TOP_IMPORTS]:
+            lines.append(f"    {times['self']:8.1f} ms self {times['cumulative']:8.1f} ms total  {name}")
+        _log.info("\n".join(lines))
+        if self.setting not in ("1", "true", "yes"):
+            with open(self.setting, "w", encoding="utf-8") as file:
+                json.dump(data, file, indent=2)
+
+
+startup = StartupReport()
@@ -0,0 +1,121 @@
+import collections
+import logging
+
+import discord
+
+from utils.database import ConnectionPool
+
+_log = logging.getLogger(__name__)
+
+# ---------- CONFIG ----------
+CATEGORY_CAPACITY = 50  # Discord's per-category channel limit
+# ----------------------------
+
+
+class CategoryPool:
+    """
+    Spreads ticket channels over a list of overflow categories.
+
+    ``available`` is an insertion-ordered set of categories believed to have
+    room, so picking a slot is a constant-time look at its first element. A
+    category found full is dropped from the set and re-added when one of its
+    channels is deleted or moved out. ``reserved`` covers channels we have
+    asked Discord to create but haven't seen in the guild cache yet.
+
+    Every category used is recorded in tickets.db's ``ticket_categories``
+    with its occupancy, and ``start`` adds the recorded ones back after the
+    configured ones, so the pool survives a restart; ``sync`` and
+    ``forget`` drop categories that have been deleted.
+    """
+
+    def __init__(self, kind: str, category_ids, capacity: int = CATEGORY_CAPACITY):
+        self.kind = kind
+        self.category_ids = list(category_ids)
+        self.capacity = capacity
+        self.available = {}
+        self.reserved = collections.Counter()
+        self.loaded = False
+        self.pool = None
+
+    async def start(self, pool: ConnectionPool):
+        self.pool = pool
+        rows = await pool.fetchall(
+            "SELECT category_id FROM ticket_categories WHERE kind = ? ORDER BY category_id", (self.kind,)
+        )
+        self.category_ids += [category_id for category_id, in rows if category_id not in self.category_ids]
+        self.loaded = False
+
+    async def sync(self, guild: discord.Guild):
+        """Forget categories that no longer exist in ``guild``, then rebuild the free list."""
+        for category_id in [category_id for category_id in self.category_ids if guild.get_channel(category_id) is None]:
+            _log.warning(f"{self.kind} ticket category {category_id} no longer exists, dropping it")
+            await self.forget(category_id)
+        self.load(guild)
+
+    async def forget(self, category_id: int):
+        """Stop using a deleted category and drop its row."""
+        if category_id in self.category_ids:
+            self.category_ids.remove(category_id)
+        self.available.pop(category_id, None)
+        self.reserved.pop(category_id, None)
+        if self.pool is not None:
+            await self.pool.execute(
+                "DELETE FROM ticket_categories WHERE category_id = ? AND kind = ?", (category_id, self.kind)
+            )
+
+    def load(self, guild: discord.Guild):
+        self.available = {}
+        for category_id in self.category_ids:
+            category = guild.get_channel(category_id)
+            if category is None:
+                _log.warning(f"{self.kind} ticket category {category_id} not found")
+            elif self.room(category) > 0:
+                self.available[category_id] = None
+        self.loaded = True
+
+    def room(self, category: discord.CategoryChannel) -> int:
+        return self.capacity - len(category.channels) - self.reserved[category.id]
+
+    def acquire(self, guild: discord.Guild):
+        """Reserve a slot and return its category, or None when every category is full."""
+        if not self.loaded:
+            self.load(guild)
+        while self.available:
+            category_id = next(iter(self.available))
+            category = guild.get_channel(category_id)
+            if category is None or self.room(category) <= 0:
+                del self.available[category_id]
+                continue
+            self.reserved[category_id] += 1
+            return category
+        return None
+
+    def settle(self, category_id: int, full: bool = False):
+        """Drop a reservation once the channel exists (or creation failed); ``full`` if Discord said no room."""
+        if self.reserved[category_id] > 0:
+            self.reserved[category_id] -= 1
+        if full:
+            self.available.pop(category_id, None)
+
+    async def channel_removed(self, guild: discord.Guild, category_id: int):
+        """One of our categories lost a channel (deleted or moved out): it has room again."""
+        if category_id not in self.category_ids:
+            return
+        self.available.setdefault(category_id, None)
+        category = guild.get_channel(category_id)
+        if category is not None:
+            await self.record(category)
+
+    async def record(self, category: discord.CategoryChannel):
+        """Persist the category's current occupancy to tickets.db."""
+        if self.pool is None:
+            return
+        await self.pool.execute(
+            "INSERT OR REPLACE INTO ticket_categories (category_id, kind, channel_count, capacity) VALUES (?, ?, ?, ?)",
+            (category.id, self.kind, len(category.channels) + self.reserved[category.id], self.capacity)
+        )
+
+
+def is_category_full(error: discord.HTTPException) -> bool:
+    # 50035 "Invalid Form Body" with "Maximum number of channels in category reached"
+    return error.code == 50035 and "Maximum number of channels" in str(error)
@@ -0,0 +1,282 @@
+import asyncio
+import contextlib
+import heapq
+import logging
+import sqlite3
+import time
+
+from discord.ext import tasks
+
+from utils.database import ConnectionPool, Session
+
+_log = logging.getLogger(__name__)
+
+# ---------- CONFIG ----------
+ACTIVITY_FLUSH_INTERVAL = 30.0  # seconds between write-behind flushes of last_activity_at
+REMIND_AFTER = 24 * 3600  # idle seconds before the ticket gets a reminder
+AUTO_CLOSE_AFTER = 72 * 3600  # idle seconds before the ticket is closed; counted from the last activity
+SCHEDULER_TICK = 60  # seconds between looks at the earliest deadline
+# ----------------------------
+
+STATUS_OPEN = "open"
+STATUS_CLOSED = "closed"
+
+
+class TicketStore:
+    """
+    Ticket lifecycle rows in tickets.db plus an in-memory mirror of the open
+    ones. Message activity only touches the mirror; a background task writes
+    the newest timestamp per ticket every ``ACTIVITY_FLUSH_INTERVAL`` seconds,
+    so a busy ticket costs one UPDATE per flush rather than one per message.
+    """
+
+    def __init__(self):
+        self.pool = None
+        self.owners = {}  # channel_id -> user_id, open tickets only
+        self.open_by_user = {}  # user_id -> channel_id of their open ticket
+        self.pending = set()  # users whose ticket is queued or being created
+        self.locks = {}  # user_id -> [lock, tasks holding or waiting for it]
+        self.duplicates_blocked = 0
+        self.last_activity = {}  # channel_id -> unix time, open tickets only
+        self.reminded = {}  # channel_id -> unix time of the last idle reminder
+        self.dirty = {}  # channel_id -> unix time not yet written
+        self.touches = 0
+        self.writes = 0
+        self._task = None
+
+    async def start(self, pool: ConnectionPool):
+        self.pool = pool
+        rows = await pool.fetchall(
+            "SELECT channel_id, user_id, last_activity_at, reminded_at FROM tickets WHERE status = ?", (STATUS_OPEN,)
+        )
+        now = int(time.time())
+        self.owners = {channel_id: user_id for channel_id, user_id, _, _ in rows}
+        self.open_by_user = {user_id: channel_id for channel_id, user_id, _, _ in rows}
+        self.last_activity = {channel_id: last or now for channel_id, _, last, _ in rows}
+        self.reminded = {channel_id: reminded for channel_id, _, _, reminded in rows if reminded}
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def is_open(self, channel_id: int) -> bool:
+        return channel_id in self.last_activity
+
+    def reserve(self, user_id: int) -> bool:
+        """
+        Synchronous pre-check for a ticket button: False if the user already has
+        an open ticket or one on the way, otherwise mark one as on the way.
+        Being synchronous, two clicks handled back to back can't both pass.
+        """
+        if user_id in self.open_by_user or user_id in self.pending:
+            self.duplicates_blocked += 1
+            return False
+        self.pending.add(user_id)
+        return True
+
+    @contextlib.asynccontextmanager
+    async def creating(self, user_id: int):
+        """
+        Hold the user's creation lock. Yields the channel id of their open
+        ticket if they already have one (the caller should link it instead of
+        creating another), else None.
+        """
+        entry = self.locks.setdefault(user_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                existing = self.open_by_user.get(user_id)
+                if existing is not None:
+                    self.duplicates_blocked += 1
+                yield existing
+        finally:
+            self.pending.discard(user_id)
+            entry[1] -= 1
+            if not entry[1]:
+                del self.locks[user_id]
+
+    async def open(self, channel_id: int, user_id: int, reason: str, kind: str, category_id: int = None) -> bool:
+        """
+        Insert the ticket row. False if the one-open-ticket-per-user index
+        rejected it (another process got there first); ``open_by_user`` then
+        holds the ticket that won.
+        """
+        now = int(time.time())
+        try:
+            await self.pool.execute(
+                "INSERT INTO tickets (channel_id, user_id, reason, kind, category_id, status, opened_at, last_activity_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (channel_id, user_id, reason, kind, category_id, STATUS_OPEN, now, now)
+            )
+        except sqlite3.IntegrityError:
+            self.duplicates_blocked += 1
+            existing = await self.pool.fetchval(
+                "SELECT channel_id FROM tickets WHERE user_id = ? AND status = ?", (user_id, STATUS_OPEN)
+            )
+            if existing is not None:
+                self._track(existing, user_id, now)
+            return False
+        self._track(channel_id, user_id, now)
+        return True
+
+    def _track(self, channel_id: int, user_id: int, now: int):
+        self.owners[channel_id] = user_id
+        self.open_by_user[user_id] = channel_id
+        self.last_activity.setdefault(channel_id, now)
+
+    async def close(self, tx: Session, channel_id: int):
+        """Mark the ticket closed inside the caller's transaction, writing its final activity time."""
+        last = self.dirty.pop(channel_id, None) or self.last_activity.get(channel_id)
+        await tx.execute(
+            "UPDATE tickets SET status = ?, closed_at = ?, last_activity_at = COALESCE(?, last_activity_at) "
+            "WHERE channel_id = ?",
+            (STATUS_CLOSED, int(time.time()), last, channel_id)
+        )
+        user_id = self.owners.pop(channel_id, None)
+        if self.open_by_user.get(user_id) == channel_id:
+            del self.open_by_user[user_id]
+        self.last_activity.pop(channel_id, None)
+        self.reminded.pop(channel_id, None)
+
+    async def claim(self, channel_id: int, staff_id: int) -> bool:
+        """Claim an open, unclaimed ticket. False if it is closed or someone already claimed it."""
+        return await self.pool.execute(
+            "UPDATE tickets SET claimed_by = ? WHERE channel_id = ? AND status = ? AND claimed_by IS NULL",
+            (staff_id, channel_id, STATUS_OPEN)
+        ) > 0
+
+    async def mark_reminded(self, channel_id: int):
+        now = max(int(time.time()), self.last_activity.get(channel_id, 0))  # message clocks can run ahead of ours
+        self.reminded[channel_id] = now
+        await self.pool.execute("UPDATE tickets SET reminded_at = ? WHERE channel_id = ?", (now, channel_id))
+
+    def seen(self, channel_id: int, at: int):
+        """Take in an activity time read back from tickets.db if it is newer; unlike ``touch`` it isn't written back."""
+        if at and at > self.last_activity.get(channel_id, at):
+            self.last_activity[channel_id] = at
+
+    def touch(self, channel_id: int, at: float = None):
+        """Record activity in an open ticket. Costs a dict write; persisted on the next flush."""
+        if channel_id not in self.last_activity:
+            return
+        at = int(at or time.time())
+        self.last_activity[channel_id] = at
+        self.dirty[channel_id] = at
+        self.touches += 1
+
+    async def flush(self):
+        if not self.dirty:
+            return
+        batch, self.dirty = self.dirty, {}
+        await self.pool.executemany(
+            "UPDATE tickets SET last_activity_at = MAX(COALESCE(last_activity_at, 0), ?) WHERE channel_id = ? AND status = ?",
+            [(at, channel_id, STATUS_OPEN) for channel_id, at in batch.items()]
+        )
+        self.writes += len(batch)
+
+    async def counts(self):
+        """``{status: count}`` straight from the status index."""
+        return dict(await self.pool.fetchall("SELECT status, COUNT(*) FROM tickets GROUP BY status"))
+
+    async def stale(self, idle_seconds: int, limit: int = 10):
+        """Open tickets idle for at least ``idle_seconds``, longest idle first, as ``(channel_id, user_id, last_activity_at)``."""
+        await self.flush()
+        return await self.pool.fetchall(
+            "SELECT channel_id, user_id, last_activity_at FROM tickets "
+            "WHERE status = ? AND last_activity_at <= ? ORDER BY last_activity_at LIMIT ?",
+            (STATUS_OPEN, int(time.time()) - idle_seconds, limit)
+        )
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(ACTIVITY_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception:
+                _log.exception("Failed to flush ticket activity")
+
+    async def stop(self):
+        """Cancel the flush task and write out whatever activity is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+class IdleScheduler:
+    """
+    One heap entry per open ticket, keyed by its next deadline: the reminder
+    if it hasn't been reminded since its last activity, otherwise the
+    auto-close. Activity doesn't touch the heap; when an entry comes due its
+    deadline is recomputed from the store and pushed back if the ticket has
+    been active since, so the loop only ever looks at the top of the heap.
+    """
+
+    def __init__(self, store: TicketStore, remind_after: int = REMIND_AFTER, close_after: int = AUTO_CLOSE_AFTER):
+        self.store = store
+        self.remind_after = remind_after
+        self.close_after = close_after
+        self.heap = []
+        self.bot = None
+        self.on_remind = None  # async (channel_id) -> None
+        self.on_close = None  # async (channel_id) -> None
+
+    def deadline(self, channel_id: int):
+        """``(when, action)`` for the ticket's next step, or None once it is closed."""
+        last = self.store.last_activity.get(channel_id)
+        if last is None:
+            return None
+        if self.store.reminded.get(channel_id, 0) < last:
+            return last + self.remind_after, "remind"
+        return last + self.close_after, "close"
+
+    def schedule(self, channel_id: int):
+        due = self.deadline(channel_id)
+        if due is not None:
+            heapq.heappush(self.heap, (due[0], channel_id))
+
+    def start(self, bot, on_remind, on_close):
+        self.bot = bot
+        self.on_remind = on_remind
+        self.on_close = on_close
+        self.heap = []
+        for channel_id in self.store.last_activity:
+            self.schedule(channel_id)
+        if not self.run.is_running():
+            self.run.start()
+
+    def stop(self):
+        self.run.cancel()
+
+    @tasks.loop(seconds=SCHEDULER_TICK)
+    async def run(self):
+        now = time.time()
+        while self.heap and self.heap[0][0] <= now:
+            _, channel_id = heapq.heappop(self.heap)
+            due = self.deadline(channel_id)
+            if due is None:
+                continue  # closed since it was scheduled
+            when, action = due
+            if when > now:
+                heapq.heappush(self.heap, (when, channel_id))
+                continue
+            try:
+                if action == "remind":
+                    await self.on_remind(channel_id)
+                    await self.store.mark_reminded(channel_id)
+                    self.schedule(channel_id)
+                else:
+                    await self.on_close(channel_id)
+            except Exception:
+                _log.exception(f"Idle ticket {action} failed for {channel_id}")
+                heapq.heappush(self.heap, (now + SCHEDULER_TICK * 5, channel_id))
+
+    @run.before_loop
+    async def before_run(self):
+        await self.bot.wait_until_ready()
+
+
+ticket_store = TicketStore()
+idle_scheduler = IdleScheduler(ticket_store)
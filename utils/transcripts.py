@@ -0,0 +1,118 @@
+import asyncio
+import gzip
+import html
+import json
+import os
+import time
+
+# ---------- CONFIG ----------
+TRANSCRIPT_DIR = "transcripts"
+# ----------------------------
+
+HTML_HEAD = (
+    "<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title><style>"
+    "body{{font-family:sans-serif;background:#313338;color:#dbdee1}}"
+    ".m{{margin:6px 0}}.a{{font-weight:bold;color:#fff}}.t{{color:#949ba4;font-size:12px;margin-left:6px}}"
+    "</style></head><body><h2>{title}</h2>\n"
+)
+HTML_TAIL = "</body></html>\n"
+
+
+def serialize(message) -> dict:
+    return {
+        "id": message.id,
+        "author_id": message.author.id,
+        "author": message.author.name,
+        "created_at": message.created_at.isoformat(),
+        "edited_at": message.edited_at.isoformat() if message.edited_at else None,
+        "content": message.content,
+        "attachments": [attachment.url for attachment in message.attachments],
+        "embeds": [embed.to_dict() for embed in message.embeds],
+    }
+
+
+def render_html(record: dict) -> str:
+    body = html.escape(record["content"]).replace("\n", "<br>")
+    for url in record["attachments"]:
+        body += f"<br><a href='{html.escape(url)}'>{html.escape(url)}</a>"
+    if record["embeds"]:
+        body += f"<br><i>[{len(record['embeds'])} embed(s)]</i>"
+    return (
+        f"<div class='m'><span class='a'>{html.escape(record['author'])}</span>"
+        f"<span class='t'>{record['created_at']}</span><div>{body}</div></div>\n"
+    )
+
+
+class _Sink:
+    """
+    Gzip file that is only ever written from a worker thread, one page at a
+    time. It is written as ``<path>.part`` and only renamed into place by a
+    successful ``close``, so an interrupted archive leaves nothing behind.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = gzip.open(path + ".part", "wt", encoding="utf-8", compresslevel=6)
+
+    async def write(self, chunk: str):
+        await asyncio.to_thread(self.file.write, chunk)
+
+    async def close(self, keep: bool = True):
+        await asyncio.to_thread(self.file.close)
+        if keep:
+            os.replace(self.path + ".part", self.path)
+        else:
+            os.remove(self.path + ".part")
+
+
+async def archive_channel(channel, name: str, with_html: bool = False, directory: str = TRANSCRIPT_DIR) -> dict:
+    """
+    Stream ``channel``'s full history, oldest first, into ``<name>.jsonl.gz``
+    (and ``<name>.html.gz`` if ``with_html``). Only one page of messages is
+    held in memory at a time, however long the channel is.
+    """
+    os.makedirs(directory, exist_ok=True)
+    jsonl = _Sink(os.path.join(directory, f"{name}.jsonl.gz"))
+    html_sink = _Sink(os.path.join(directory, f"{name}.html.gz")) if with_html else None
+    if html_sink:
+        await html_sink.write(HTML_HEAD.format(title=html.escape(name)))
+
+    start = time.perf_counter()
+    count = 0
+    lines, rendered = [], []
+
+    async def flush():
+        await jsonl.write("".join(lines))
+        lines.clear()
+        if html_sink:
+            await html_sink.write("".join(rendered))
+            rendered.clear()
+
+    complete = False
+    try:
+        async for message in channel.history(limit=None, oldest_first=True):
+            record = serialize(message)
+            lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+            if html_sink:
+                rendered.append(render_html(record))
+            count += 1
+            if len(lines) == 100:
+                await flush()
+        await flush()
+        if html_sink:
+            await html_sink.write(HTML_TAIL)
+        complete = True
+    finally:
+        await jsonl.close(keep=complete)
+        if html_sink:
+            await html_sink.close(keep=complete)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "path": jsonl.path,
+        "html_path": html_sink.path if html_sink else None,
+        "messages": count,
+        "bytes": os.path.getsize(jsonl.path),
+        "seconds": elapsed,
+        "rate": count / elapsed if elapsed else 0.0,
+    }